@@ -0,0 +1,147 @@
+"""比較快取值序列化格式在各個實際快取鍵上的大小與編碼 / 解碼時間
+
+樣本取自 benchmarks/fixtures/ 中錄製的 OpenWeather 與 CWA 回應（以
+benchmarks/record_fixtures.py 更新），依應用程式寫入快取的方式整理成各鍵的值：
+
+- swr:get_current_weather / swr:get_forecast / swr:get_air_pollution：
+  stale-while-revalidate 快取項目（精簡後的回應）
+- swr:get_cwa_snapshot：全台快照索引（版本、取得時間與各縣市摘要）
+- cwa:<version>:<code>：單一縣市的 36 小時預報，共 22 個鍵，列出最小 / 中位數 / 最大
+- cwa:digests:<version>：各縣市摘要
+- view:forecast：整理好的預報檢視模型
+
+比較 cachelib 預設的 pickle（RedisCache 目前的儲存格式）與 CacheSerializer
+的 JSON / msgpack 搭配 zlib / zstd 壓縮；未安裝的套件會略過。
+
+用法::
+
+    python benchmarks/cache_serialization.py --rounds 2000 --min-size 256
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCHMARKS, "fixtures")
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+from cachelib.serializers import RedisSerializer  # noqa: E402
+
+from flask_weather.serialization import (  # noqa: E402
+    CacheSerializer,
+    msgpack,
+    zstandard,
+)
+from flask_weather.utils import (  # noqa: E402
+    _digest,
+    _format_cwa_snapshot,
+    format_forecast_data,
+    prepare_chart_data,
+    trim_forecast_data,
+    trim_weather_data,
+)
+
+FETCHED_AT = 1768370400.123456
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def entry(value):
+    """CachedFetcher 寫入快取的項目結構"""
+    return {
+        "value": value,
+        "fetched_at": FETCHED_AT,
+        "generation": 3,
+        "stale": False,
+        "digest": _digest(value),
+    }
+
+
+def stored_values():
+    """
+    依應用程式寫入快取的方式產生各鍵的值
+    :return: {鍵名稱: [值, ...]}，cwa:<version>:<code> 每個縣市一個值
+    """
+    forecast = trim_forecast_data(load_fixture("openweather_forecast.json"))
+    cities = _format_cwa_snapshot(load_fixture("cwa_F-C0032-001.json"))
+    digests = {code: _digest(data) for code, data in cities.items()}
+    days = format_forecast_data(forecast, "metric")
+
+    return {
+        "swr:get_current_weather": [
+            entry(trim_weather_data(load_fixture("openweather_weather.json")))
+        ],
+        "swr:get_forecast": [entry(forecast)],
+        "swr:get_air_pollution": [
+            entry(load_fixture("openweather_air_pollution.json"))
+        ],
+        "swr:get_cwa_snapshot": [
+            entry(
+                {
+                    "version": _digest(digests),
+                    "fetched_at": FETCHED_AT,
+                    "digests": digests,
+                }
+            )
+        ],
+        "cwa:<version>:<code>": list(cities.values()),
+        "cwa:digests:<version>": [digests],
+        "view:forecast": [{"forecast": days, "chart": prepare_chart_data(days)}],
+    }
+
+
+def serializers(min_size):
+    yield "pickle (cachelib)", RedisSerializer()
+    codecs = ["json"] + (["msgpack"] if msgpack is not None else [])
+    compressions = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    for fmt in codecs:
+        for compression in compressions:
+            yield f"{fmt} + {compression}", CacheSerializer(fmt, compression, min_size)
+
+
+def per_call(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def describe(sizes):
+    if len(sizes) == 1:
+        return f"{sizes[0]:,}"
+    return (
+        f"{min(sizes):,} / {int(statistics.median(sizes)):,} / {max(sizes):,}"
+        f"（合計 {sum(sizes):,}）"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument(
+        "--min-size", type=int, default=256, help="CACHE_COMPRESSION_MIN_SIZE"
+    )
+    args = parser.parse_args()
+
+    for key, values in stored_values().items():
+        print(f"\n{key}（{len(values)} 個鍵）" if len(values) > 1 else f"\n{key}")
+        print(f"  {'格式':<18}{'大小 (B)':<36}{'編碼 µs':>10}{'解碼 µs':>10}")
+        for name, serializer in serializers(args.min_size):
+            dumped = [serializer.dumps(value) for value in values]
+            assert [serializer.loads(data) for data in dumped] == values
+            value, data = values[0], dumped[0]
+            encode = per_call(lambda: serializer.dumps(value), args.rounds)
+            decode = per_call(lambda: serializer.loads(data), args.rounds)
+            sizes = describe([len(data) for data in dumped])
+            print(f"  {name:<18}{sizes:<36}{encode:>10.1f}{decode:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""從 OpenWeather 與 CWA 錄製 benchmarks/fixtures/ 中的回應樣本
+
+以應用程式呼叫上游時相同的參數（公制、zh_tw）取得臺北市的即時天氣、
+5 天預報與空氣品質，以及 CWA 全台 36 小時預報，原樣寫成 JSON 檔案，
+供 benchmarks/cache_serialization.py 量測實際快取值的大小。
+
+需要 OPENWEATHER_API_KEY 與 CWA_API_KEY 環境變數（或 .env）。
+
+用法::
+
+    python benchmarks/record_fixtures.py --city Taipei
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import requests
+from dotenv import load_dotenv
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCHMARKS, "fixtures")
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+from flask_weather.utils import (  # noqa: E402
+    CWA_API_BASE_URL,
+    OPENWEATHER_API_BASE_URL,
+)
+
+TIMEOUT = 15
+
+
+def fetch(url, params):
+    response = requests.get(url, params=params, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def save(name, data):
+    path = os.path.join(FIXTURES, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"已寫入 {path}（{os.path.getsize(path):,} 位元組）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--city", default="Taipei")
+    args = parser.parse_args()
+
+    load_dotenv()
+    openweather_key = os.environ.get("OPENWEATHER_API_KEY")
+    cwa_key = os.environ.get("CWA_API_KEY")
+    if not openweather_key or not cwa_key:
+        sys.exit("請設定 OPENWEATHER_API_KEY 與 CWA_API_KEY")
+
+    params = {
+        "q": args.city,
+        "appid": openweather_key,
+        "units": "metric",
+        "lang": "zh_tw",
+    }
+    weather = fetch(f"{OPENWEATHER_API_BASE_URL}/weather", params)
+    save("openweather_weather.json", weather)
+    save(
+        "openweather_forecast.json",
+        fetch(f"{OPENWEATHER_API_BASE_URL}/forecast", params),
+    )
+    save(
+        "openweather_air_pollution.json",
+        fetch(
+            f"{OPENWEATHER_API_BASE_URL}/air_pollution",
+            {**weather["coord"], "appid": openweather_key},
+        ),
+    )
+    save("cwa_F-C0032-001.json", fetch(CWA_API_BASE_URL, {"Authorization": cwa_key}))
+
+
+if __name__ == "__main__":
+    main()
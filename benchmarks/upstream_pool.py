@@ -0,0 +1,105 @@
+"""比較冷連線與連線池化 Session 對上游請求延遲的影響
+
+啟動一個本機 HTTP stub server，分別以 ``requests.get``（每次新連線）與
+``UpstreamClient``（連線重複使用）發送相同數量的請求並統計延遲。
+
+用法::
+
+    python benchmarks/upstream_pool.py --requests 200 --handshake-delay 0.02
+
+``--handshake-delay`` 會在每條新連線建立時延遲指定秒數，用來模擬
+TCP + TLS 交握到遠端 API 的往返時間。
+
+``UpstreamClient`` 的斷路器狀態存放在 Flask 快取中，因此連線池的量測在
+測試設定（FLASK_ENV=testing）的 app context 內執行。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_weather import create_app  # noqa: E402
+from flask_weather.upstream import OPENWEATHER, UpstreamClient  # noqa: E402
+
+PAYLOAD = json.dumps({"name": "Taipei", "main": {"temp": 25.3}}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支援 keep-alive
+    disable_nagle_algorithm = True
+    handshake_delay = 0.0
+
+    def setup(self):
+        super().setup()
+        if self.handshake_delay:
+            time.sleep(self.handshake_delay)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _measure(fetch, url, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = fetch(url)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _report(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<8} mean={statistics.mean(latencies):7.2f}ms "
+        f"p50={statistics.median(latencies):7.2f}ms p95={p95:7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--handshake-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    StubHandler.handshake_delay = args.handshake_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/data/2.5/weather"
+
+    os.environ.setdefault("FLASK_ENV", "testing")
+    app = create_app()
+    client = UpstreamClient({"UPSTREAM_MAX_RETRIES": 0})
+    try:
+        cold = _measure(lambda u: requests.get(u, timeout=5), url, args.requests)
+        with app.app_context():
+            pooled = _measure(lambda u: client.get(OPENWEATHER, u), url, args.requests)
+    finally:
+        client.close()
+        server.shutdown()
+
+    print(f"{args.requests} requests, handshake delay {args.handshake_delay}s")
+    _report("cold", cold)
+    _report("pooled", pooled)
+    print(f"speedup  {statistics.mean(cold) / statistics.mean(pooled):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
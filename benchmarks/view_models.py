@@ -0,0 +1,119 @@
+"""比較快取原始預報、精簡後預報與已整理檢視模型的大小與每次渲染的 CPU 成本
+
+以一份欄位完整的 OpenWeather /forecast 回應（40 筆、3 小時間隔）為樣本：
+- 大小：以 pickle（Flask-Caching 預設序列化方式）計算每個快取項目的位元組數
+- CPU：模擬每次頁面瀏覽從快取讀出資料（pickle.loads）並整理成頁面所需格式
+
+用法::
+
+    python benchmarks/view_models.py --renders 2000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_weather.utils import (  # noqa: E402
+    format_forecast_data,
+    prepare_chart_data,
+    trim_forecast_data,
+)
+
+START = 1768370400
+
+
+def sample_forecast(entries=40):
+    """產生與 OpenWeather /forecast 回應結構相同的樣本"""
+    items = []
+    for i in range(entries):
+        dt = START + i * 10800
+        items.append(
+            {
+                "dt": dt,
+                "main": {
+                    "temp": 20.5 + i % 7,
+                    "feels_like": 20.9 + i % 7,
+                    "temp_min": 19.8 + i % 7,
+                    "temp_max": 21.3 + i % 7,
+                    "pressure": 1015,
+                    "sea_level": 1015,
+                    "grnd_level": 1009,
+                    "humidity": 78,
+                    "temp_kf": 0.5,
+                },
+                "weather": [
+                    {"id": 500, "main": "Rain", "description": "小雨", "icon": "10d"}
+                ],
+                "clouds": {"all": 75},
+                "wind": {"speed": 3.6, "deg": 80, "gust": 6.1},
+                "visibility": 10000,
+                "pop": 0.42,
+                "rain": {"3h": 0.55},
+                "sys": {"pod": "d"},
+                "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt)),
+            }
+        )
+    return {
+        "cod": "200",
+        "message": 0,
+        "cnt": entries,
+        "list": items,
+        "city": {
+            "id": 1668341,
+            "name": "Taipei",
+            "coord": {"lat": 25.0478, "lon": 121.5319},
+            "country": "TW",
+            "population": 7871900,
+            "timezone": 28800,
+            "sunrise": 1768341600,
+            "sunset": 1768381200,
+        },
+    }
+
+
+def build_view(data, units="metric"):
+    forecast = format_forecast_data(data, units)
+    return {"forecast": forecast, "chart": prepare_chart_data(forecast)}
+
+
+def per_render(fn, renders):
+    start = time.perf_counter()
+    for _ in range(renders):
+        fn()
+    return (time.perf_counter() - start) / renders * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=2000)
+    args = parser.parse_args()
+
+    raw = sample_forecast()
+    trimmed = trim_forecast_data(raw)
+    view = build_view(trimmed)
+
+    blobs = {
+        "原始回應": pickle.dumps(raw),
+        "精簡後": pickle.dumps(trimmed),
+        "檢視模型": pickle.dumps(view),
+    }
+    print("每個快取項目的大小（pickle）")
+    for name, blob in blobs.items():
+        print(f"  {name:<8} {len(blob):>7,} bytes")
+
+    print(f"\n每次渲染的 CPU 時間（{args.renders} 次平均）")
+    timings = {
+        "原始回應 + 整理": lambda: build_view(pickle.loads(blobs["原始回應"])),
+        "精簡後 + 整理": lambda: build_view(pickle.loads(blobs["精簡後"])),
+        "讀取檢視模型": lambda: pickle.loads(blobs["檢視模型"]),
+    }
+    for name, fn in timings.items():
+        print(f"  {name:<12} {per_render(fn, args.renders):>8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
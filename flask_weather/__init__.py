@@ -1,5 +1,5 @@
 from flask import Flask
-from flask_weather.config import get_config, Config
+from flask_weather.config import get_config, load_cache_group_budgets, Config
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
@@ -43,12 +43,30 @@ def create_app():
     login.init_app(app)
 
     # 初始化快取
-    # 設定快取類型為 SimpleCache (開發用，存在記憶體中)
-    # 生產環境建議使用 RedisCache
-    app.config.setdefault("CACHE_TYPE", "SimpleCache")
+    # 未指定時使用依位元組數限制大小的 process 內快取 (開發與測試用)
+    # 生產環境使用 Redis 或 worker 共用的記憶體快取 (見 ProductionConfig)
+    app.config.setdefault(
+        "CACHE_TYPE", "flask_weather.cache_backends.BoundedMemoryCache"
+    )
     app.config.setdefault("CACHE_DEFAULT_TIMEOUT", 300)  # 預設快取 5 分鐘
+    load_cache_group_budgets(app)
     cache.init_app(app)
 
+    # 每個 worker 內的 L1 快取 (放在共用快取前面)
+    from .local_cache import init_local_cache
+
+    init_local_cache(app)
+
+    # 載入暖快取快照，新 worker 啟動時即有天氣資料
+    from .warm_cache import init_warm_cache
+
+    init_warm_cache(app)
+
+    # 初始化上游 API 連線池
+    from .upstream import init_upstream
+
+    init_upstream(app)
+
     # 自訂 Jinja2 過濾器 icon 和 datetimeformat
     from .utils import get_weather_icon_class, datetimeformat
 
@@ -63,16 +81,28 @@ def create_app():
     if app.config.get("TALISMAN_ENABLED", True):
         Talisman(app, content_security_policy=None)
 
+    # 回應壓縮 (gzip，安裝 brotli 時另支援 br)
+    from .compression import init_compression
+
+    init_compression(app)
+
     # 從子模組導入並註冊藍圖
     from .main import main_bp
     from .weather import weather_bp
     from .taiwan_weather import taiwan_weather_bp
     from .auth import auth_bp
+    from .ops import ops_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(weather_bp, url_prefix="/weather")
     app.register_blueprint(taiwan_weather_bp)
     app.register_blueprint(auth_bp, url_prefix="/auth")
+    app.register_blueprint(ops_bp, url_prefix="/ops")
+
+    # 註冊 CLI 指令
+    from .commands import register_commands
+
+    register_commands(app)
 
     # 錯誤處理
     @app.errorhandler(404)
@@ -0,0 +1,557 @@
+"""Custom Flask-Caching backends
+
+以 CACHE_TYPE 設定完整匯入路徑使用，例如::
+
+    CACHE_TYPE = "flask_weather.cache_backends.CompactRedisCache"
+    CACHE_TYPE = "flask_weather.cache_backends.SharedMemoryCache"
+    CACHE_TYPE = "flask_weather.cache_backends.BoundedMemoryCache"
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+from flask_weather import metrics
+from flask_weather.serialization import FORMAT_VERSION, CacheSerializer
+
+# 共用記憶體檔案標頭：magic、格式版本、bucket 數、slot 大小
+SHM_MAGIC = b"FWSHM\x00"
+SHM_HEADER = struct.Struct("<6sHII")
+SHM_HEADER_SIZE = 64
+# 每個 bucket 的 slot 數（set-associative），CLOCK 在 bucket 內挑選要淘汰的 slot
+SHM_WAYS = 8
+# process 內的執行緒鎖分段數（fcntl 鎖只在 process 之間互斥）
+SHM_LOCK_STRIPES = 64
+# slot 標頭：使用中、最近被讀取 (CLOCK 參考位元)、鍵長度、值長度、鍵雜湊、到期時間
+SLOT_HEADER = struct.Struct("<BBHIQd")
+
+
+# 每個快取項目除了值以外的估計額外記憶體（鍵、tuple 與 dict 節點）
+ENTRY_OVERHEAD = 120
+
+
+def cache_group(key):
+    """
+    快取鍵所屬的群組，用於記憶體統計與預算
+    stale-while-revalidate 的鍵（swr:<函式>:...）為函式名稱，其他為第一段前綴，
+    例如 cwa（get_cwa_weather 讀取的各縣市資料）、view、compressed
+    """
+    prefix, _, rest = key.partition(":")
+    if prefix == "swr" and rest:
+        return rest.partition(":")[0]
+    return prefix
+
+
+def memory_report(backend):
+    """快取後端的記憶體報告；不支援的後端（例如 Redis）回傳 None"""
+    report = getattr(backend, "report", None)
+    if report is None:
+        return None
+    return {"backend": type(backend).__name__, **report()}
+
+
+def _serializer(config):
+    return CacheSerializer(
+        fmt=config.get("CACHE_SERIALIZER"),
+        compression=config.get("CACHE_COMPRESSION"),
+        min_size=config.get("CACHE_COMPRESSION_MIN_SIZE", 256),
+    )
+
+
+class CompactRedisCache(RedisCache):
+    """
+    以 CacheSerializer（msgpack / JSON，超過門檻時壓縮）儲存值的 RedisCache
+
+    鍵前綴會加上格式版本，新舊格式的 worker 在部署期間各自使用獨立的命名空間，
+    尚未更新的 worker 不會讀到看不懂的值；舊命名空間的項目隨 TTL 自然過期。
+    """
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        cache = super().factory(app, config, args, kwargs)
+        cache.serializer = _serializer(config)
+        cache.key_prefix = f"{cache.key_prefix or ''}v{FORMAT_VERSION}:"
+        return cache
+
+
+def default_shm_path():
+    """/dev/shm 存在時放在記憶體檔案系統，否則放在暫存目錄"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "flask_weather_cache")
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    同一台主機上所有 worker 共用的快取，不需要 Redis
+
+    資料放在以 mmap 對映的檔案中，是固定大小的雜湊表：鍵的雜湊決定 bucket，
+    每個 bucket 有 SHM_WAYS 個固定大小的 slot，bucket 滿時以 CLOCK 淘汰最近
+    沒有被讀取的項目。讀寫時以 fcntl 鎖住該 bucket，跨 process 互斥。
+
+    - 值以 CacheSerializer 編碼，超過 slot 大小的值不寫入（set 回傳 False）
+    - 檔名包含格式版本與表格尺寸，調整設定後新 worker 使用新檔案，
+      部署期間仍在執行的舊 worker 不受影響
+    - 檔案在 worker 重啟後仍然保留，新 worker 直接沿用已取得的資料
+    """
+
+    def __init__(
+        self,
+        path=None,
+        slots=4096,
+        slot_size=4096,
+        default_timeout=300,
+        serializer=None,
+    ):
+        BaseCache.__init__(self, default_timeout=default_timeout)
+        self.serializer = serializer or CacheSerializer()
+        self.buckets = max(1, slots // SHM_WAYS)
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT_HEADER.size
+        self._hands_offset = SHM_HEADER_SIZE
+        # 標頭之後是各 bucket 的 CLOCK 指針（各 1 位元組），表格從 64 位元組邊界開始
+        self._table_offset = SHM_HEADER_SIZE + (self.buckets + 63) // 64 * 64
+        size = self._table_offset + self.buckets * SHM_WAYS * slot_size
+
+        base = path or default_shm_path()
+        self.path = f"{base}-v{FORMAT_VERSION}-{self.buckets * SHM_WAYS}x{slot_size}"
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._init_file(size)
+        self._map = mmap.mmap(self._fd, size)
+        self._locks = [threading.Lock() for _ in range(SHM_LOCK_STRIPES)]
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            dict(
+                path=config.get("CACHE_SHM_PATH"),
+                slots=config.get("CACHE_SHM_SLOTS", 4096),
+                slot_size=config.get("CACHE_SHM_SLOT_SIZE", 4096),
+                serializer=_serializer(config),
+            )
+        )
+        return cls(*args, **kwargs)
+
+    def _init_file(self, size):
+        """第一個開啟檔案的 process 建立表格；標頭不符時重新初始化"""
+        header = SHM_HEADER.pack(
+            SHM_MAGIC, FORMAT_VERSION, self.buckets, self.slot_size
+        )
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if (
+                os.fstat(self._fd).st_size != size
+                or os.pread(self._fd, SHM_HEADER.size, 0) != header
+            ):
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self, bucket, exclusive=True):
+        with self._locks[bucket % SHM_LOCK_STRIPES]:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            fcntl.lockf(self._fd, mode, 1, bucket)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, bucket)
+
+    def _locate(self, key):
+        key_bytes = key.encode("utf-8")
+        digest = hashlib.blake2b(key_bytes, digest_size=8).digest()
+        key_hash = int.from_bytes(digest, "little")
+        return key_bytes, key_hash, key_hash % self.buckets
+
+    def _offset(self, bucket, way):
+        return self._table_offset + (bucket * SHM_WAYS + way) * self.slot_size
+
+    def _scan(self, key_bytes, key_hash, bucket):
+        """
+        在 bucket 中尋找此鍵
+        :return: (相符的 slot, 是否未過期, 可直接使用的空 slot 或已過期的 slot)
+        """
+        now = time.time()
+        free = None
+        for way in range(SHM_WAYS):
+            offset = self._offset(bucket, way)
+            used, _, key_len, _, slot_hash, expires_at = SLOT_HEADER.unpack_from(
+                self._map, offset
+            )
+            expired = expires_at and expires_at <= now
+            if not used or expired:
+                free = way if free is None else free
+            if not used or slot_hash != key_hash or key_len != len(key_bytes):
+                continue
+            start = offset + SLOT_HEADER.size
+            if self._map[start : start + key_len] == key_bytes:
+                return way, not expired, free
+        return None, False, free
+
+    def _read_value(self, bucket, way):
+        offset = self._offset(bucket, way)
+        _, _, key_len, value_len, _, _ = SLOT_HEADER.unpack_from(self._map, offset)
+        start = offset + SLOT_HEADER.size + key_len
+        return bytes(self._map[start : start + value_len])
+
+    def _victim(self, bucket):
+        """CLOCK：略過並清除最近被讀取過的 slot，回傳第一個未被讀取的 slot"""
+        hand = self._map[self._hands_offset + bucket] % SHM_WAYS
+        for _ in range(2 * SHM_WAYS):
+            referenced = self._offset(bucket, hand) + 1
+            if not self._map[referenced]:
+                break
+            self._map[referenced] = 0
+            hand = (hand + 1) % SHM_WAYS
+        self._map[self._hands_offset + bucket] = (hand + 1) % SHM_WAYS
+        metrics.incr("shm_cache.evictions")
+        return hand
+
+    def _write(self, bucket, way, key_bytes, key_hash, data, expires_at):
+        offset = self._offset(bucket, way)
+        SLOT_HEADER.pack_into(
+            self._map,
+            offset,
+            1,
+            1,
+            len(key_bytes),
+            len(data),
+            key_hash,
+            expires_at,
+        )
+        start = offset + SLOT_HEADER.size
+        self._map[start : start + len(key_bytes)] = key_bytes
+        start += len(key_bytes)
+        self._map[start : start + len(data)] = data
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0.0
+
+    def _store(self, key, value, timeout, only_if_missing=False):
+        data = self.serializer.dumps(value)
+        key_bytes, key_hash, bucket = self._locate(key)
+        if len(key_bytes) + len(data) > self.capacity:
+            metrics.incr("shm_cache.too_large")
+            return False
+
+        expires_at = self._expires_at(timeout)
+        with self._locked(bucket):
+            way, live, free = self._scan(key_bytes, key_hash, bucket)
+            if live and only_if_missing:
+                return False
+            if way is None:
+                way = free if free is not None else self._victim(bucket)
+            self._write(bucket, way, key_bytes, key_hash, data, expires_at)
+        return True
+
+    def get(self, key):
+        key_bytes, key_hash, bucket = self._locate(key)
+        with self._locked(bucket, exclusive=False):
+            way, live, _ = self._scan(key_bytes, key_hash, bucket)
+            if not live:
+                return None
+            data = self._read_value(bucket, way)
+            self._map[self._offset(bucket, way) + 1] = 1
+        return self.serializer.loads(data)
+
+    def has(self, key):
+        key_bytes, key_hash, bucket = self._locate(key)
+        with self._locked(bucket, exclusive=False):
+            return self._scan(key_bytes, key_hash, bucket)[1]
+
+    def set(self, key, value, timeout=None):
+        return self._store(key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._store(key, value, timeout, only_if_missing=True)
+
+    def delete(self, key):
+        key_bytes, key_hash, bucket = self._locate(key)
+        with self._locked(bucket):
+            way, live, _ = self._scan(key_bytes, key_hash, bucket)
+            if way is None:
+                return False
+            self._map[self._offset(bucket, way)] = 0
+            return live
+
+    def inc(self, key, delta=1):
+        """在 bucket 鎖內讀取並寫回，跨 process 的累加不會遺失"""
+        key_bytes, key_hash, bucket = self._locate(key)
+        with self._locked(bucket):
+            way, live, free = self._scan(key_bytes, key_hash, bucket)
+            if live:
+                current = self.serializer.loads(self._read_value(bucket, way))
+                offset = self._offset(bucket, way)
+                expires_at = SLOT_HEADER.unpack_from(self._map, offset)[5]
+            else:
+                current, expires_at = 0, self._expires_at(None)
+                if way is None:
+                    way = free if free is not None else self._victim(bucket)
+            value = (current or 0) + delta
+            self._write(
+                bucket,
+                way,
+                key_bytes,
+                key_hash,
+                self.serializer.dumps(value),
+                expires_at,
+            )
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
+
+    def clear(self):
+        with ExitStack() as stack:
+            for lock in self._locks:
+                stack.enter_context(lock)
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                for bucket in range(self.buckets):
+                    for way in range(SHM_WAYS):
+                        self._map[self._offset(bucket, way)] = 0
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return True
+
+    def entries(self, groups):
+        """
+        列出指定群組中未過期的項目（掃描整個表格，供暖快取快照使用）
+        :return: [(鍵, 值, 到期時間)]，到期時間 0 表示不會過期
+        """
+        now = time.time()
+        found = []
+        for bucket in range(self.buckets):
+            with self._locked(bucket, exclusive=False):
+                for way in range(SHM_WAYS):
+                    offset = self._offset(bucket, way)
+                    used, _, key_len, _, _, expires_at = SLOT_HEADER.unpack_from(
+                        self._map, offset
+                    )
+                    if not used or (expires_at and expires_at <= now):
+                        continue
+                    start = offset + SLOT_HEADER.size
+                    key = bytes(self._map[start : start + key_len]).decode("utf-8")
+                    if cache_group(key) in groups:
+                        found.append((key, self._read_value(bucket, way), expires_at))
+        return [
+            (key, self.serializer.loads(data), expires_at)
+            for key, data, expires_at in found
+        ]
+
+    def report(self):
+        """各群組的筆數與位元組數（掃描整個表格且不加鎖，僅供監控參考）"""
+        now = time.time()
+        groups = {}
+        for bucket in range(self.buckets):
+            for way in range(SHM_WAYS):
+                offset = self._offset(bucket, way)
+                used, _, key_len, value_len, _, expires_at = SLOT_HEADER.unpack_from(
+                    self._map, offset
+                )
+                if not used or (expires_at and expires_at <= now):
+                    continue
+                start = offset + SLOT_HEADER.size
+                key = bytes(self._map[start : start + key_len]).decode(
+                    "utf-8", "replace"
+                )
+                group = groups.setdefault(cache_group(key), {"entries": 0, "bytes": 0})
+                group["entries"] += 1
+                group["bytes"] += key_len + value_len
+        return {
+            "path": self.path,
+            "slots": self.buckets * SHM_WAYS,
+            "slot_size": self.slot_size,
+            "entries": sum(group["entries"] for group in groups.values()),
+            "bytes": sum(group["bytes"] for group in groups.values()),
+            "groups": dict(sorted(groups.items())),
+        }
+
+
+class BoundedMemoryCache(BaseCache):
+    """
+    依位元組數限制大小的 process 內快取（取代以筆數限制的 SimpleCache）
+
+    值以 pickle 儲存（與 SimpleCache 相同，取得的是複本），以序列化後的大小
+    加上固定額外負擔估計每個項目佔用的記憶體：
+    - 群組（見 cache_group）超過自己的預算時，淘汰該群組最久未使用的項目
+    - 全部項目超過 max_bytes 時，淘汰全部之中最久未使用的項目
+    - 單一項目大於所屬預算時不寫入（set 回傳 False）
+    report() 列出各群組的筆數、位元組數、預算與淘汰次數。
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, budgets=None, default_timeout=300):
+        BaseCache.__init__(self, default_timeout=default_timeout)
+        self.max_bytes = max_bytes
+        self.budgets = dict(budgets or {})
+        self.bytes = 0
+        self._items = OrderedDict()  # 鍵 -> (到期時間, pickle 位元組, 大小, 群組)
+        self._groups = {}  # 群組 -> OrderedDict(鍵 -> None)，依最近使用排序
+        self._group_bytes = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            dict(
+                max_bytes=config.get("CACHE_MAX_BYTES", 32 * 1024 * 1024),
+                budgets=config.get("CACHE_GROUP_BUDGETS"),
+            )
+        )
+        return cls(*args, **kwargs)
+
+    def _stat(self, group):
+        return self._stats.setdefault(
+            group,
+            {"evicted_budget": 0, "evicted_total": 0, "expired": 0, "rejected": 0},
+        )
+
+    def _remove(self, key):
+        _, _, size, group = self._items.pop(key)
+        del self._groups[group][key]
+        self._group_bytes[group] -= size
+        self.bytes -= size
+
+    def _live(self, key):
+        """取得未過期的項目並標記為最近使用；過期的項目在此移除"""
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] and item[0] <= time.time():
+            self._remove(key)
+            self._stat(item[3])["expired"] += 1
+            return None
+        self._items.move_to_end(key)
+        self._groups[item[3]].move_to_end(key)
+        return item
+
+    def _evict(self, key, reason):
+        group = self._items[key][3]
+        expired = self._items[key][0] and self._items[key][0] <= time.time()
+        self._remove(key)
+        self._stat(group)["expired" if expired else reason] += 1
+
+    def _enforce(self, group):
+        budget = self.budgets.get(group)
+        if budget is not None:
+            while self._group_bytes[group] > budget:
+                self._evict(next(iter(self._groups[group])), "evicted_budget")
+        while self.bytes > self.max_bytes:
+            self._evict(next(iter(self._items)), "evicted_total")
+
+    def _put(self, key, data, expires_at, only_if_missing=False):
+        group = cache_group(key)
+        size = len(data) + len(key) + ENTRY_OVERHEAD
+        with self._lock:
+            if only_if_missing and self._live(key) is not None:
+                return False
+            if size > min(self.budgets.get(group, self.max_bytes), self.max_bytes):
+                self._stat(group)["rejected"] += 1
+                return False
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (expires_at, data, size, group)
+            self._groups.setdefault(group, OrderedDict())[key] = None
+            self._group_bytes[group] = self._group_bytes.get(group, 0) + size
+            self.bytes += size
+            self._enforce(group)
+        return True
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0.0
+
+    def _dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key)
+        return pickle.loads(item[1]) if item else None
+
+    def has(self, key):
+        with self._lock:
+            return self._live(key) is not None
+
+    def set(self, key, value, timeout=None):
+        return self._put(key, self._dumps(value), self._expires_at(timeout))
+
+    def add(self, key, value, timeout=None):
+        return self._put(
+            key, self._dumps(value), self._expires_at(timeout), only_if_missing=True
+        )
+
+    def delete(self, key):
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._remove(key)
+            return True
+
+    def inc(self, key, delta=1):
+        with self._lock:
+            item = self._live(key)
+            value = (pickle.loads(item[1]) if item else 0) + delta
+            expires_at = item[0] if item else self._expires_at(None)
+            self._put(key, self._dumps(value), expires_at)
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._groups.clear()
+            self._group_bytes.clear()
+            self.bytes = 0
+        return True
+
+    def entries(self, groups):
+        """
+        列出指定群組中未過期的項目（供暖快取快照使用）
+        :return: [(鍵, 值, 到期時間)]，到期時間 0 表示不會過期
+        """
+        now = time.time()
+        with self._lock:
+            found = [
+                (key, data, expires_at)
+                for key, (expires_at, data, _, group) in self._items.items()
+                if group in groups and not (expires_at and expires_at <= now)
+            ]
+        return [
+            (key, pickle.loads(data), expires_at) for key, data, expires_at in found
+        ]
+
+    def report(self):
+        """各群組的筆數、估計位元組數、預算與淘汰次數（本 process）"""
+        with self._lock:
+            groups = {
+                group: {
+                    "entries": len(self._groups.get(group, ())),
+                    "bytes": self._group_bytes.get(group, 0),
+                    "budget": self.budgets.get(group),
+                    **self._stat(group),
+                }
+                for group in sorted(set(self._groups) | set(self._stats))
+            }
+            return {
+                "max_bytes": self.max_bytes,
+                "bytes": self.bytes,
+                "entries": len(self._items),
+                "groups": groups,
+            }
@@ -0,0 +1,613 @@
+"""Stale-while-revalidate caching for upstream fetchers
+
+快取項目有兩個期限：
+- soft TTL 內直接回傳快取值
+- soft TTL 與 hard TTL 之間立即回傳舊值，並在背景重新取得
+- 重新取得失敗時繼續提供最後一次成功的值，並標記為過時 (stale)
+
+快取未命中或需要更新時採用 single-flight：process 內同一個快取鍵只有一個
+執行緒呼叫上游，跨 worker 則以快取後端上的短期鎖協調。
+
+上游回應「找不到」或暫時失敗時，結果另存於 `<key>:negative` 的負面快取，
+以較短的 TTL 保留，期間內相同的查詢直接回傳 None，不再呼叫上游。
+
+啟用 L1（見 local_cache）時，查詢先找 worker 內的 L1，未命中才讀取快取後端 (L2)；
+各層的命中次數分別記錄為 cache.<函式>.l1_hit / l1_miss / l2_hit / l2_miss。
+"""
+
+import functools
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from flask import current_app, g, has_app_context
+from flask_weather import cache, metrics
+from flask_weather.concurrency import map_bounded, submit_background
+from flask_weather.local_cache import get_local_cache, invalidate
+from flask_weather.upstream import UpstreamNotFound, UpstreamUnavailable
+
+# 背景更新的鎖定時間；更新失敗時在此期間內不會再次嘗試
+REFRESH_LOCK_TIMEOUT = 30
+
+# 等待其他 worker 更新時輪詢快取的間隔（秒）
+SINGLEFLIGHT_POLL_INTERVAL = 0.05
+
+
+class _Flight:
+    """進行中的上游呼叫，等待者透過 done 取得結果（快取項目）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.stale = False
+
+
+# 快取鍵 -> 進行中的上游呼叫（process 內共用）
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def served_stale():
+    """本次請求是否使用了過時的快取資料"""
+    return has_app_context() and g.get("served_stale", False)
+
+
+def _mark_served_stale():
+    if has_app_context():
+        g.served_stale = True
+
+
+class CachedFetcher:
+    """包裝上游取得函式，提供 stale-while-revalidate 快取"""
+
+    def __init__(
+        self, fn, soft_ttl, hard_ttl, normalize=None, fetch_many=None, batch_size=None
+    ):
+        functools.update_wrapper(self, fn)
+        self.uncached = fn
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.normalize = normalize
+        self.fetch_many = fetch_many
+        self.batch_size = batch_size
+        self.prefix = f"swr:{fn.__name__}"
+
+    def _canonical(self, args):
+        """將參數轉為標準形式，等價的查詢共用同一個快取項目與上游結果"""
+        if self.normalize is None:
+            return tuple(args)
+        result = self.normalize(*args)
+        return result if isinstance(result, tuple) else (result,)
+
+    def _count(self, outcome, amount=1):
+        metrics.incr(f"cache.{self.__name__}.{outcome}", amount)
+
+    def cache_key(self, *args):
+        digest = hashlib.md5(repr(args).encode("utf-8")).hexdigest()[:16]
+        return f"{self.prefix}:{digest}"
+
+    def negative_key(self, key):
+        return f"{key}:negative"
+
+    @property
+    def _generation_key(self):
+        return f"{self.prefix}:generation"
+
+    def _read(self, keys):
+        """一次讀取世代號與多個快取項目，世代號不符的項目視為不存在"""
+        try:
+            generation, *entries = cache.get_many(self._generation_key, *keys)
+        except Exception as e:
+            current_app.logger.error(f"讀取快取失敗 ({self.__name__}): {e}")
+            return [None] * len(keys)
+        generation = generation or 0
+        return [
+            entry if entry and entry["generation"] == generation else None
+            for entry in entries
+        ]
+
+    def _read_tiered(self, keys):
+        """
+        先查 L1，未命中的鍵連同其負面快取一次向 L2 讀取，讀到的項目寫回 L1
+        :return: [(快取項目, 負面快取項目)]，與 keys 順序相同
+        """
+        local = get_local_cache()
+        results = {}
+        if local is not None:
+            for key in keys:
+                entry = local.get(key)
+                if entry is not None:
+                    results[key] = (entry, None)
+            self._count("l1_hit", len(results))
+            self._count("l1_miss", len(keys) - len(results))
+
+        remote = [key for key in keys if key not in results]
+        if not remote:
+            return [results[key] for key in keys]
+
+        entries = self._read(remote + [self.negative_key(key) for key in remote])
+        found = 0
+        for key, entry, negative in zip(
+            remote, entries[: len(remote)], entries[len(remote) :]
+        ):
+            results[key] = (entry, negative)
+            if entry is not None:
+                found += 1
+                if local is not None:
+                    local.set(key, entry)
+        self._count("l2_hit", found)
+        self._count("l2_miss", len(remote) - found)
+        return [results[key] for key in keys]
+
+    def _store(self, key, entry, timeout):
+        """寫入 L2，並更新本 worker 的 L1"""
+        cache.set(key, entry, timeout=timeout)
+        local = get_local_cache()
+        if local is not None:
+            local.set(key, entry)
+
+    def _entry(self, value, generation, fetched_at=None):
+        return {
+            "value": value,
+            "fetched_at": fetched_at or time.time(),
+            "generation": generation,
+            "stale": False,
+            "digest": _digest(value),
+        }
+
+    def _serve(self, key, args, entry, schedule=None):
+        """
+        回傳快取值；超過 soft TTL 時排程背景更新
+        :param schedule: 取代單一鍵背景更新的函式 schedule(key, args)，供批次查詢合併
+        """
+        if entry["stale"] or time.time() - entry["fetched_at"] >= self.soft_ttl:
+            self._count("stale")
+            _mark_served_stale()
+            (schedule or self._refresh_in_background)(key, args)
+        else:
+            self._count("hit")
+        return entry["value"]
+
+    def __call__(self, *args):
+        return self.lookup(*args)[0]
+
+    def lookup(self, *args):
+        """
+        與直接呼叫相同，另外回傳快取項目的中繼資料
+        :return: (值, {"fetched_at", "digest", "stale", "expires_in"})；
+                 沒有值時中繼資料為 None
+        """
+        args = self._canonical(args)
+        key = self.cache_key(*args)
+        ((entry, negative),) = self._read_tiered([key])
+        if entry is not None:
+            return self._serve(key, args, entry), self._meta(entry)
+        if negative is not None:
+            self._count("negative_hit")
+            return None, None
+        self._count("miss")
+        # 中繼資料取自本次取得的項目，快取後端拒絕寫入（超過預算等）時仍可回傳
+        entry = self._refresh(key, args, previous=None)
+        if entry is None:
+            return None, None
+        return entry["value"], self._meta(entry)
+
+    def _meta(self, entry):
+        age = time.time() - entry["fetched_at"]
+        stale = entry["stale"] or age >= self.soft_ttl
+        return {
+            "fetched_at": entry["fetched_at"],
+            "digest": entry.get("digest") or _digest(entry["value"]),
+            "stale": stale,
+            "expires_in": 0 if stale else int(self.soft_ttl - age),
+        }
+
+    def cached(self, *args):
+        """只查詢快取，不同步呼叫上游；命中回傳 (True, 值)，否則 (False, None)"""
+        args = self._canonical(args)
+        key = self.cache_key(*args)
+        ((entry, _),) = self._read_tiered([key])
+        if entry is None:
+            return False, None
+        return True, self._serve(key, args, entry)
+
+    def many(self, args_list, limit=None):
+        """
+        批次查詢：快取以一次 get_many 讀取，未命中的才以有上限的並行請求補齊；
+        有 fetch_many 時未命中與需要背景更新的參數各自每 batch_size 組合併為
+        一次上游請求
+        :param args_list: 每次呼叫的參數 tuple 列表
+        :return: 與輸入順序相同的結果列表，失敗的位置為 None
+        """
+        args_list = [self._canonical(args) for args in args_list]
+        if not args_list:
+            return []
+
+        unique = list(dict.fromkeys(args_list))
+        keys = [self.cache_key(*args) for args in unique]
+        results = {}
+        misses = []
+        stale = []
+        negative_hits = 0
+
+        def defer(key, args):
+            stale.append(args)
+
+        schedule = defer if self.fetch_many is not None else None
+        for args, key, (entry, negative) in zip(unique, keys, self._read_tiered(keys)):
+            if entry is not None:
+                results[args] = self._serve(key, args, entry, schedule)
+            elif negative is not None:
+                results[args] = None
+                negative_hits += 1
+            else:
+                misses.append(args)
+
+        if negative_hits:
+            self._count("negative_hit", negative_hits)
+        if stale:
+            self._refresh_batches_in_background(stale)
+        if misses:
+            self._count("miss", len(misses))
+            limit = limit or current_app.config.get("UPSTREAM_BATCH_CONCURRENCY", 4)
+            if self.fetch_many is None:
+                fetched = map_bounded(lambda args: self.refresh(*args), misses, limit)
+            else:
+                batches = self._batches(misses)
+                fetched = [
+                    entry["value"] if entry else None
+                    for batch, entries in zip(
+                        batches, map_bounded(self._refresh_batch, batches, limit)
+                    )
+                    for entry in entries or [None] * len(batch)
+                ]
+            results.update(zip(misses, fetched))
+
+        return [results[args] for args in args_list]
+
+    def refresh(self, *args):
+        """強制向上游重新取得並更新快取（忽略負面快取）"""
+        args = self._canonical(args)
+        key = self.cache_key(*args)
+        (previous,) = self._read([key])
+        entry = self._refresh(key, args, previous)
+        return entry["value"] if entry else None
+
+    def _refresh(self, key, args, previous):
+        """
+        Single-flight：同一 process 內同一個快取鍵只有一個執行緒呼叫上游，
+        其餘執行緒等待並共用結果
+        :return: 取得的快取項目；失敗時為標記過時的舊項目，沒有舊項目時為 None
+        """
+        with _flights_lock:
+            flight = _flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _flights[key] = _Flight()
+
+        if leader:
+            try:
+                flight.entry, flight.stale = self._refresh_across_workers(
+                    key, args, previous
+                )
+            finally:
+                with _flights_lock:
+                    _flights.pop(key, None)
+                flight.done.set()
+        else:
+            metrics.incr("singleflight.coalesced_local")
+            flight.done.wait(current_app.config.get("SINGLEFLIGHT_WAIT", 10))
+
+        if flight.stale:
+            _mark_served_stale()
+        return flight.entry
+
+    def _refresh_across_workers(self, key, args, previous):
+        """以快取後端上的短期鎖確保跨 worker 只有一個 process 更新此快取鍵"""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        lock_timeout = current_app.config.get("SINGLEFLIGHT_LOCK_TIMEOUT", 15)
+        if not cache.add(lock_key, token, timeout=lock_timeout):
+            entry = self._wait_for_other_worker(key, lock_key, previous)
+            if entry is not None:
+                metrics.incr("singleflight.coalesced_remote")
+                return entry, False
+            # 其他 worker 更新失敗或逾時，視同本次更新失敗
+            return self._keep_previous(key, previous)
+
+        try:
+            return self._fetch(key, args, previous)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _wait_for_other_worker(self, key, lock_key, previous):
+        """等待持有鎖的 worker 寫入較新的快取項目，鎖釋放或逾時即停止"""
+        deadline = time.monotonic() + current_app.config.get("SINGLEFLIGHT_WAIT", 10)
+        while time.monotonic() < deadline:
+            time.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+            (entry,) = self._read([key])
+            if entry and (
+                previous is None or entry["fetched_at"] > previous["fetched_at"]
+            ):
+                return entry
+            if not cache.has(lock_key):
+                break
+        return None
+
+    def _fetch(self, key, args, previous):
+        """
+        呼叫上游並寫入快取
+        :return: (快取項目, 是否為過時的舊項目)；回傳本次建立的項目，不再讀回快取
+        """
+        metrics.incr("singleflight.upstream_calls")
+        generation = cache.get(self._generation_key) or 0
+        try:
+            value = self.uncached(*args)
+        except UpstreamNotFound:
+            self._set_negative(key, generation, "NEGATIVE_CACHE_NOT_FOUND_TTL", 300)
+            value = None
+        except UpstreamUnavailable as e:
+            current_app.logger.error(f"更新快取失敗 ({self.__name__}): {e}")
+            self._set_negative(key, generation, "NEGATIVE_CACHE_ERROR_TTL", 30)
+            value = None
+        except Exception as e:
+            current_app.logger.error(f"更新快取失敗 ({self.__name__}): {e}")
+            value = None
+
+        if value is not None:
+            entry = self._entry(value, generation)
+            self._store(key, entry, self.hard_ttl)
+            cache.delete_many(f"{key}:refresh", self.negative_key(key))
+            return entry, False
+
+        return self._keep_previous(key, previous)
+
+    def _batches(self, args_list):
+        size = self.batch_size or len(args_list) or 1
+        return [
+            args_list[start : start + size] for start in range(0, len(args_list), size)
+        ]
+
+    def _refresh_batch(self, batch):
+        """
+        批次版的 _refresh：每個快取鍵同樣以 process 內的 single-flight 與快取後端
+        上的短期鎖協調，本執行緒取得的鍵合併為一次 fetch_many 呼叫，
+        其餘等待其他執行緒或 worker 的結果
+        :return: 與 batch 順序相同的快取項目列表
+        """
+        keys = [self.cache_key(*args) for args in batch]
+        previous = dict(zip(keys, self._read(keys)))
+        led = {}
+        followed = {}
+        with _flights_lock:
+            for args, key in zip(batch, keys):
+                if key in _flights:
+                    followed[key] = _flights[key]
+                elif key not in led:
+                    led[key] = args
+                    _flights[key] = _Flight()
+            flights = {key: _flights[key] for key in led}
+
+        results = {}
+        try:
+            results = self._refresh_batch_across_workers(led, previous)
+        finally:
+            with _flights_lock:
+                for key, flight in flights.items():
+                    flight.entry, flight.stale = results.get(key, (None, False))
+                    _flights.pop(key, None)
+                    flight.done.set()
+
+        if followed:
+            metrics.incr("singleflight.coalesced_local", len(followed))
+        for key, flight in followed.items():
+            flight.done.wait(current_app.config.get("SINGLEFLIGHT_WAIT", 10))
+            results[key] = (flight.entry, flight.stale)
+
+        if any(stale for _, stale in results.values()):
+            _mark_served_stale()
+        return [results.get(key, (None, False))[0] for key in keys]
+
+    def _refresh_batch_across_workers(self, led, previous):
+        """只取得本 process 拿到鎖的鍵；其他 worker 正在更新的鍵等待其結果"""
+        token = uuid.uuid4().hex
+        lock_timeout = current_app.config.get("SINGLEFLIGHT_LOCK_TIMEOUT", 15)
+        locked = {}
+        others = []
+        for key, args in led.items():
+            if cache.add(f"{key}:lock", token, timeout=lock_timeout):
+                locked[key] = args
+            else:
+                others.append(key)
+
+        results = {}
+        try:
+            if locked:
+                results.update(self._fetch_batch(locked, previous))
+        finally:
+            for key in locked:
+                if cache.get(f"{key}:lock") == token:
+                    cache.delete(f"{key}:lock")
+
+        for key in others:
+            entry = self._wait_for_other_worker(key, f"{key}:lock", previous[key])
+            if entry is not None:
+                metrics.incr("singleflight.coalesced_remote")
+                results[key] = (entry, False)
+            else:
+                results[key] = self._keep_previous(key, previous[key])
+        return results
+
+    def _fetch_batch(self, batch, previous):
+        """
+        以 fetch_many 一次取得多組參數的值並寫入快取
+        上游回應中沒有的參數記為找不到；上游失敗時整批記為暫時失敗，
+        有舊項目的繼續提供舊值
+        :param batch: {快取鍵: 參數 tuple}
+        :return: {快取鍵: (快取項目, 是否為過時的舊項目)}
+        """
+        metrics.incr("singleflight.upstream_calls")
+        generation = cache.get(self._generation_key) or 0
+        try:
+            values = self.fetch_many(list(batch.values()))
+        except Exception as e:
+            current_app.logger.error(f"批次更新快取失敗 ({self.__name__}): {e}")
+            if isinstance(e, UpstreamUnavailable):
+                for key in batch:
+                    self._set_negative(key, generation, "NEGATIVE_CACHE_ERROR_TTL", 30)
+            return {key: self._keep_previous(key, previous[key]) for key in batch}
+
+        results = {}
+        for key, args in batch.items():
+            value = values.get(args)
+            if value is None:
+                self._set_negative(key, generation, "NEGATIVE_CACHE_NOT_FOUND_TTL", 300)
+                results[key] = self._keep_previous(key, previous[key])
+                continue
+            entry = self._entry(value, generation)
+            self._store(key, entry, self.hard_ttl)
+            cache.delete_many(f"{key}:refresh", self.negative_key(key))
+            results[key] = (entry, False)
+        return results
+
+    def _set_negative(self, key, generation, config_key, default):
+        """記錄上游失敗結果，TTL 依失敗類型由設定決定；設為 0 則停用"""
+        timeout = current_app.config.get(config_key, default)
+        if timeout > 0:
+            cache.set(
+                self.negative_key(key),
+                {"generation": generation, "fetched_at": time.time()},
+                timeout=timeout,
+            )
+
+    def _keep_previous(self, key, previous):
+        """上游失敗：繼續提供最後一次成功的值，並標記為過時"""
+        if previous is None:
+            return None, False
+
+        entry = {**previous, "stale": True}
+        remaining = int(self.hard_ttl - (time.time() - previous["fetched_at"]))
+        if remaining > 0 and not previous["stale"]:
+            self._store(key, entry, remaining)
+        return entry, True
+
+    def _refresh_in_background(self, key, args):
+        # 同一個快取項目同時只排一個背景更新
+        if not cache.add(f"{key}:refresh", 1, timeout=REFRESH_LOCK_TIMEOUT):
+            return
+        try:
+            submit_background(self.refresh, *args)
+        except Exception as e:
+            current_app.logger.error(f"排程背景更新失敗 ({self.__name__}): {e}")
+
+    def _refresh_batches_in_background(self, args_list):
+        """需要背景更新的參數每 batch_size 組合併為一次背景 fetch_many"""
+        claimed = [
+            args
+            for args in args_list
+            if cache.add(
+                f"{self.cache_key(*args)}:refresh", 1, timeout=REFRESH_LOCK_TIMEOUT
+            )
+        ]
+        for batch in self._batches(claimed):
+            try:
+                submit_background(self._refresh_batch, batch)
+            except Exception as e:
+                current_app.logger.error(f"排程背景更新失敗 ({self.__name__}): {e}")
+
+    def clear(self):
+        """使此函式的所有快取項目失效，並通知所有 worker 清除 L1"""
+        try:
+            generation = cache.get(self._generation_key) or 0
+            cache.set(self._generation_key, generation + 1, timeout=0)
+            invalidate(f"{self.prefix}:")
+            return True
+        except Exception as e:
+            current_app.logger.error(f"清除快取失敗 ({self.__name__}): {e}")
+            return False
+
+
+def _digest(value):
+    """快取值的內容摘要，上游資料不變時摘要也不變（用於 HTTP ETag）"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+CACHE_OUTCOMES = ("hit", "stale", "miss", "negative_hit")
+TIER_OUTCOMES = ("l1_hit", "l1_miss", "l2_hit", "l2_miss")
+
+
+def _rate(hits, total):
+    return round(hits / total, 4) if total else 0.0
+
+
+def _tier_rates(counts):
+    return {
+        tier: {
+            "hit": counts[f"{tier}_hit"],
+            "miss": counts[f"{tier}_miss"],
+            "hit_rate": _rate(
+                counts[f"{tier}_hit"], counts[f"{tier}_hit"] + counts[f"{tier}_miss"]
+            ),
+        }
+        for tier in ("l1", "l2")
+    }
+
+
+def hit_rates(counters):
+    """
+    由 metrics 計數器計算各快取函式的命中率（stale 也算命中）
+    negative_hit 為負面快取省下的上游呼叫次數，另外列出，不計入命中率
+    tiers 為 L1（worker 內）與 L2（快取後端）各自的命中率
+    """
+    totals = {}
+    for name, value in counters.items():
+        if name.startswith("cache.") and name.count(".") == 2:
+            _, fn_name, outcome = name.split(".")
+            totals.setdefault(fn_name, dict.fromkeys(CACHE_OUTCOMES + TIER_OUTCOMES, 0))
+            if outcome in totals[fn_name]:
+                totals[fn_name][outcome] = value
+
+    rates = {}
+    for fn_name, counts in sorted(totals.items()):
+        lookups = counts["hit"] + counts["stale"] + counts["miss"]
+        served = counts["hit"] + counts["stale"]
+        rates[fn_name] = {
+            **{outcome: counts[outcome] for outcome in CACHE_OUTCOMES},
+            "hit_rate": _rate(served, lookups),
+            "tiers": _tier_rates(counts),
+        }
+    return rates
+
+
+def tier_hit_rates(counters):
+    """所有快取函式合計的 L1 / L2 命中率"""
+    counts = dict.fromkeys(TIER_OUTCOMES, 0)
+    for name, value in counters.items():
+        if name.startswith("cache.") and name.count(".") == 2:
+            outcome = name.rsplit(".", 1)[1]
+            if outcome in counts:
+                counts[outcome] += value
+    return _tier_rates(counts)
+
+
+def stale_while_revalidate(
+    soft_ttl, hard_ttl, normalize=None, fetch_many=None, batch_size=None
+):
+    """
+    Stale-while-revalidate 快取裝飾器
+    :param soft_ttl: 快取值視為新鮮的秒數
+    :param hard_ttl: 快取值最多保留的秒數，期間內上游失敗仍可回傳舊值
+    :param normalize: 將呼叫參數轉為標準形式的函式，例如座標對齊
+    :param fetch_many: 以一次上游請求取得多組參數的函式，回傳 {參數 tuple: 值}，
+                       供 many() 補齊未命中的項目
+    :param batch_size: fetch_many 單次最多的參數組數
+    """
+
+    def decorator(fn):
+        return CachedFetcher(fn, soft_ttl, hard_ttl, normalize, fetch_many, batch_size)
+
+    return decorator
@@ -0,0 +1,151 @@
+"""Per-provider circuit breaker for upstream APIs
+
+狀態存放在快取後端，所有 worker 共用：
+- closed：正常呼叫；時間窗內失敗率（含超過延遲門檻的慢呼叫）過高時轉為 open
+- open：直接拋出 CircuitOpen，不等待逾時，由快取層改用舊資料
+- half-open：冷卻時間過後只放行一個探測請求，成功則 closed，失敗則重新 open；
+  只有持有探測權杖的呼叫能改變狀態，開啟前已送出的請求結果只計入時間窗
+"""
+
+import time
+import uuid
+
+from flask import current_app
+from flask_weather import cache, metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """單一上游供應商的斷路器"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.prefix = f"circuit:{provider}"
+
+    def _config(self, key, default):
+        return current_app.config.get(key, default)
+
+    @property
+    def _state_key(self):
+        return f"{self.prefix}:state"
+
+    @property
+    def _probe_key(self):
+        return f"{self.prefix}:probe"
+
+    def _bucket_keys(self, now):
+        """目前與上一個時間窗的 (呼叫數, 失敗數) 計數鍵"""
+        window = self._config("CIRCUIT_WINDOW", 30)
+        current = int(now // window)
+        return [
+            (f"{self.prefix}:{bucket}:calls", f"{self.prefix}:{bucket}:failures")
+            for bucket in (current, current - 1)
+        ]
+
+    def _read_state(self):
+        try:
+            return cache.get(self._state_key) or {"state": CLOSED}
+        except Exception as e:
+            # 快取後端失敗時不阻擋上游呼叫
+            current_app.logger.error(f"讀取斷路器狀態失敗 ({self.provider}): {e}")
+            return {"state": CLOSED}
+
+    def state(self):
+        """回傳目前狀態：closed、open 或 half_open"""
+        data = self._read_state()
+        if data["state"] == OPEN:
+            cooldown = self._config("CIRCUIT_COOLDOWN", 30)
+            if time.time() - data["opened_at"] >= cooldown:
+                return HALF_OPEN
+        return data["state"]
+
+    def allow(self):
+        """
+        是否可以呼叫上游
+        :return: closed 時為 True；half-open 時取得探測鎖的請求得到探測權杖，
+                 需傳給 record()；拒絕時為 None
+        """
+        state = self.state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            token = uuid.uuid4().hex
+            timeout = self._config("CIRCUIT_COOLDOWN", 30)
+            if cache.add(self._probe_key, token, timeout=timeout):
+                return token
+        metrics.incr(f"circuit.{self.provider}.rejected")
+        return None
+
+    def record(self, success, elapsed, probe=None):
+        """
+        記錄一次呼叫結果；超過延遲門檻的成功呼叫也視為失敗
+        :param probe: allow() 回傳的探測權杖；只有探測呼叫的結果會關閉或重新開啟斷路器
+        """
+        if success and elapsed > self._config("CIRCUIT_SLOW_CALL_SECONDS", 3):
+            success = False
+            metrics.incr(f"circuit.{self.provider}.slow")
+
+        try:
+            if isinstance(probe, str) and cache.get(self._probe_key) == probe:
+                self._record_probe(success)
+            else:
+                self._record_call(success)
+        except Exception as e:
+            current_app.logger.error(f"更新斷路器狀態失敗 ({self.provider}): {e}")
+
+    def _record_probe(self, success):
+        if success:
+            self.reset()
+            current_app.logger.info(f"上游 {self.provider} 已恢復，斷路器關閉")
+        else:
+            self._open()
+
+    def _record_call(self, success):
+        now = time.time()
+        ttl = self._config("CIRCUIT_WINDOW", 30) * 2
+        (calls_key, failures_key), previous = self._bucket_keys(now)
+        _inc(calls_key, ttl)
+        if success:
+            return
+        _inc(failures_key, ttl)
+
+        # 已開啟時只更新計數，不延長開啟時間
+        if self._read_state()["state"] != CLOSED:
+            return
+        counts = cache.get_many(calls_key, failures_key, *previous)
+        calls = (counts[0] or 0) + (counts[2] or 0)
+        failures = (counts[1] or 0) + (counts[3] or 0)
+        if calls >= self._config("CIRCUIT_MIN_CALLS", 10) and (
+            failures / calls >= self._config("CIRCUIT_FAILURE_RATE", 0.5)
+        ):
+            self._open()
+            current_app.logger.warning(
+                f"上游 {self.provider} 失敗率 {failures}/{calls}，斷路器開啟"
+            )
+
+    def _open(self):
+        metrics.incr(f"circuit.{self.provider}.opened")
+        cache.set(self._state_key, {"state": OPEN, "opened_at": time.time()}, timeout=0)
+        cache.delete(self._probe_key)
+
+    def reset(self):
+        """關閉斷路器並清除時間窗計數"""
+        keys = [key for pair in self._bucket_keys(time.time()) for key in pair]
+        cache.delete_many(self._state_key, self._probe_key, *keys)
+
+    def status(self):
+        """供 /ops/health 顯示的狀態摘要"""
+        data = self._read_state()
+        return {
+            "state": self.state(),
+            "opened_at": data.get("opened_at"),
+        }
+
+
+def _inc(key, timeout):
+    """累加計數；第一次建立時設定存活時間，讓過期的時間窗自動消失"""
+    if not cache.add(key, 1, timeout=timeout):
+        cache.cache.inc(key)
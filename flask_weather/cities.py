@@ -0,0 +1,132 @@
+"""City-name normalization and alias index
+
+"Taipei"、"taipei "、"臺北"、"台北市" 都指同一個城市，正規化後共用同一個
+快取項目與上游請求。台灣 22 縣市另外建立別名索引，對應到 CWA 縣市代碼與
+OpenWeather 查詢名稱。
+"""
+
+import re
+import unicodedata
+
+# 全台 22 縣市對照表（英文代碼 -> 中文名稱）
+CWA_CITY_MAP = {
+    "taipei": "臺北市",
+    "newtaipei": "新北市",
+    "keelung": "基隆市",
+    "taoyuan": "桃園市",
+    "hsinchu": "新竹市",
+    "hsinchucounty": "新竹縣",
+    "miaoli": "苗栗縣",
+    "taichung": "臺中市",
+    "changhua": "彰化縣",
+    "nantou": "南投縣",
+    "yunlin": "雲林縣",
+    "chiayi": "嘉義市",
+    "chiayicounty": "嘉義縣",
+    "tainan": "臺南市",
+    "kaohsiung": "高雄市",
+    "pingtung": "屏東縣",
+    "yilan": "宜蘭縣",
+    "hualien": "花蓮縣",
+    "taitung": "臺東縣",
+    "penghu": "澎湖縣",
+    "kinmen": "金門縣",
+    "lienchiang": "連江縣",
+}
+
+# 縣市代碼 -> OpenWeather 查詢名稱
+OPENWEATHER_CITY_NAMES = {
+    "taipei": "Taipei",
+    "newtaipei": "New Taipei",
+    "keelung": "Keelung",
+    "taoyuan": "Taoyuan",
+    "hsinchu": "Hsinchu",
+    "hsinchucounty": "Hsinchu County",
+    "miaoli": "Miaoli",
+    "taichung": "Taichung",
+    "changhua": "Changhua",
+    "nantou": "Nantou",
+    "yunlin": "Yunlin",
+    "chiayi": "Chiayi",
+    "chiayicounty": "Chiayi County",
+    "tainan": "Tainan",
+    "kaohsiung": "Kaohsiung",
+    "pingtung": "Pingtung",
+    "yilan": "Yilan",
+    "hualien": "Hualien",
+    "taitung": "Taitung",
+    "penghu": "Penghu",
+    "kinmen": "Kinmen",
+    "lienchiang": "Lienchiang",
+}
+
+# 其他常見寫法 -> 縣市代碼
+# 「新竹」、「嘉義」同時是市與縣的簡稱，與英文 "Hsinchu"、"Chiayi" 一致對應到市
+EXTRA_ALIASES = {
+    "新竹": "hsinchu",
+    "嘉義": "chiayi",
+    "taipei city": "taipei",
+    "new taipei city": "newtaipei",
+    "keelung city": "keelung",
+    "taoyuan city": "taoyuan",
+    "hsinchu city": "hsinchu",
+    "taichung city": "taichung",
+    "chiayi city": "chiayi",
+    "tainan city": "tainan",
+    "kaohsiung city": "kaohsiung",
+    "matsu": "lienchiang",
+    "馬祖": "lienchiang",
+    "kinmen county": "kinmen",
+    "penghu county": "penghu",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_city_name(name):
+    """
+    正規化城市名稱：Unicode NFKC（全形轉半形）、去除多餘空白、忽略大小寫、
+    「台」統一為「臺」
+    """
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKC", str(name))
+    name = _WHITESPACE.sub(" ", name).strip().casefold()
+    return name.replace("台", "臺")
+
+
+def _build_alias_index():
+    # 去掉「市」「縣」後相同的簡稱（新竹、嘉義）有歧義，只由 EXTRA_ALIASES 指定
+    stems = [name[:-1] for name in CWA_CITY_MAP.values()]
+    shared = {stem for stem in stems if stems.count(stem) > 1}
+
+    index = {}
+    for code, name in CWA_CITY_MAP.items():
+        aliases = {code, name, OPENWEATHER_CITY_NAMES[code]}
+        if name[:-1] not in shared:
+            aliases.add(name[:-1])
+        for alias in aliases:
+            index[normalize_city_name(alias)] = code
+    for alias, code in EXTRA_ALIASES.items():
+        index[normalize_city_name(alias)] = code
+    return index
+
+
+# 正規化後的別名 -> 縣市代碼
+CITY_ALIAS_INDEX = _build_alias_index()
+
+
+def cwa_city_code(name):
+    """將縣市名稱或代碼轉為 CWA 縣市代碼，非台灣縣市回傳 None"""
+    return CITY_ALIAS_INDEX.get(normalize_city_name(name))
+
+
+def canonical_city(name):
+    """
+    取得城市的標準查詢名稱，作為快取鍵與上游查詢參數
+    台灣縣市對應到固定的 OpenWeather 名稱，其他城市使用正規化後的名稱
+    """
+    code = cwa_city_code(name)
+    if code:
+        return OPENWEATHER_CITY_NAMES[code]
+    return normalize_city_name(name)
@@ -0,0 +1,128 @@
+"""Flask CLI commands for Flask Weather App"""
+
+import click
+
+
+@click.command("backfill-saved-cities")
+@click.option("--dry-run", is_flag=True, help="只列出結果，不寫入資料庫")
+def backfill_saved_cities(dry_run):
+    """
+    為尚未解析城市 ID 的收藏城市補上 OpenWeather 城市 ID 與經緯度，
+    並依目前的別名表更新正規化名稱 (city_key)
+    """
+    from flask_weather import db
+    from flask_weather.cities import canonical_city
+    from flask_weather.models import SavedCity
+    from flask_weather.utils import resolve_city_location
+
+    rekeyed = 0
+    for saved in SavedCity.query:
+        city_key = canonical_city(saved.city_name)
+        if saved.city_key != city_key:
+            saved.city_key = city_key
+            rekeyed += 1
+    if rekeyed:
+        click.echo(f"已更新 {rekeyed} 筆收藏城市的正規化名稱")
+
+    pending = SavedCity.query.filter(SavedCity.owm_city_id.is_(None)).all()
+
+    # 同名城市只向上游解析一次
+    locations = {}
+    for name in dict.fromkeys(saved.city_name for saved in pending):
+        locations[name] = resolve_city_location(name)
+        status = locations[name]["id"] if locations[name] else "無法解析"
+        click.echo(f"{name}: {status}")
+
+    updated = 0
+    for saved in pending:
+        if locations[saved.city_name]:
+            saved.set_location(locations[saved.city_name])
+            updated += 1
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    if not pending:
+        click.echo("所有收藏城市都已有城市 ID。")
+        return
+    click.echo(
+        f"已補齊 {updated}/{len(pending)} 筆收藏城市"
+        + ("（dry run）" if dry_run else "")
+    )
+
+
+def _format_bytes(size):
+    if size is None:
+        return "-"
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+
+@click.command("cache-report")
+def cache_report():
+    """列出各快取群組的筆數、記憶體用量、預算與淘汰次數"""
+    from flask_weather import cache
+    from flask_weather.cache_backends import memory_report
+
+    report = memory_report(cache.cache)
+    if report is None:
+        click.echo(f"{type(cache.cache).__name__} 不支援記憶體報告。")
+        return
+
+    total = _format_bytes(report["bytes"])
+    if report.get("max_bytes"):
+        total += f" / {_format_bytes(report['max_bytes'])}"
+    click.echo(f"{report['backend']}：{report['entries']} 筆，{total}")
+    if report["backend"] == "BoundedMemoryCache":
+        click.echo(
+            "（process 內快取只包含本指令的 process，執行中的 worker 請查看 /ops/cache）"
+        )
+
+    click.echo(f"{'群組':<24}{'筆數':>8}{'用量':>12}{'預算':>12}{'淘汰':>8}")
+    for group, stats in report["groups"].items():
+        evicted = stats.get("evicted_budget", 0) + stats.get("evicted_total", 0)
+        click.echo(
+            f"{group:<24}{stats['entries']:>8}{_format_bytes(stats['bytes']):>12}"
+            f"{_format_bytes(stats.get('budget')):>12}{evicted:>8}"
+        )
+
+
+@click.command("warm-cache")
+@click.option("--keys", "show_keys", is_flag=True, help="列出每個鍵與剩餘秒數")
+@click.option("--group", help="只列出此群組的鍵")
+def warm_cache(show_keys, group):
+    """檢視暖快取快照：各群組的筆數、大小、過期筆數與最後寫入時間"""
+    from datetime import datetime
+
+    from flask_weather.warm_cache import describe_snapshot, snapshot_keys, snapshot_path
+
+    path = snapshot_path()
+    summary = describe_snapshot(path)
+    if summary is None:
+        click.echo(f"找不到暖快取快照：{path}")
+        return
+
+    click.echo(f"{path}（{_format_bytes(summary['size'])}）")
+    click.echo(f"{'群組':<24}{'筆數':>8}{'大小':>12}{'已過期':>8}  最後寫入")
+    for name, stats in summary["groups"].items():
+        saved_at = datetime.fromtimestamp(stats["saved_at"]).strftime("%m-%d %H:%M:%S")
+        click.echo(
+            f"{name:<24}{stats['entries']:>8}{_format_bytes(stats['bytes']):>12}"
+            f"{stats['expired']:>8}  {saved_at}"
+        )
+
+    if show_keys or group:
+        for key, remaining in snapshot_keys(path, group):
+            ttl = "不過期" if remaining is None else f"{remaining}s"
+            click.echo(f"  {key}  {ttl}")
+
+
+def register_commands(app):
+    """註冊 CLI 指令"""
+    app.cli.add_command(backfill_saved_cities)
+    app.cli.add_command(cache_report)
+    app.cli.add_command(warm_cache)
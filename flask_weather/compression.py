@@ -0,0 +1,128 @@
+"""Response compression (gzip, and brotli when installed)
+
+在 after_request 階段依 Accept-Encoding 壓縮 HTML 與 JSON 回應：
+- 只處理 COMPRESS_MIMETYPES 允許清單內的 content type，且本文需達 COMPRESS_MIN_SIZE 位元組
+- 有 ETag 且可公開快取的回應（CWA 預報、縣市列表、天氣 API），
+  壓縮後的位元組以 ETag 為鍵存入快取，同一份資料不必為每個客戶端重新壓縮
+- 壓縮後 ETag 改為弱驗證器，If-None-Match 以弱比對仍可得到 304
+
+brotli 為選用套件（pip install brotli 或 brotlicffi），未安裝時只使用 gzip。
+"""
+
+import gzip
+
+from flask import current_app, request
+from flask_weather import cache, metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def available_encodings():
+    """依偏好順序回傳可用的壓縮方式"""
+    encodings = {"gzip": _gzip}
+    if brotli is not None:
+        encodings = {"br": _brotli, **encodings}
+    return encodings
+
+
+def choose_encoding(accept_encodings):
+    """從 Accept-Encoding 中選出伺服器偏好且客戶端接受的壓縮方式"""
+    for encoding in available_encodings():
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def _should_compress(response):
+    config = current_app.config
+    if not config.get("COMPRESS_ENABLED", True):
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if "Content-Encoding" in response.headers or response.cache_control.no_transform:
+        return False
+    if response.mimetype not in config.get("COMPRESS_MIMETYPES", ()):
+        return False
+    return response.content_length is None or response.content_length >= config.get(
+        "COMPRESS_MIN_SIZE", 500
+    )
+
+
+def _compress(response, encoding):
+    """壓縮回應本文；可公開快取且有強 ETag 的回應會重複使用已壓縮的位元組"""
+    etag, weak = response.get_etag()
+    cacheable = etag and not weak and response.cache_control.public
+    key = f"compressed:{encoding}:{etag}" if cacheable else None
+
+    if key:
+        compressed = cache.get(key)
+        if compressed is not None:
+            metrics.incr(f"compression.{encoding}.cache_hit")
+            return compressed
+
+    data = response.get_data()
+    if len(data) < current_app.config.get("COMPRESS_MIN_SIZE", 500):
+        return None
+    compressed = available_encodings()[encoding](data)
+    metrics.incr(f"compression.{encoding}.compressed")
+    if key:
+        timeout = current_app.config.get("COMPRESS_CACHE_TIMEOUT", 600)
+        cache.set(key, compressed, timeout=timeout)
+    return compressed
+
+
+def compress_response(response):
+    """after_request：依 Accept-Encoding 壓縮回應"""
+    if response.status_code == 304:
+        return _match_validator_strength(response)
+    if not _should_compress(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    compressed = _compress(response, encoding)
+    if compressed is None:
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # 不同編碼的位元組不同，強 ETag 需改為弱 ETag
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _match_validator_strength(response):
+    """客戶端帶回的是壓縮後的弱 ETag 時，304 回應也使用弱 ETag"""
+    etag, weak = response.get_etag()
+    if etag and not weak and not request.if_none_match.contains(etag):
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """註冊回應壓縮"""
+    app.after_request(compress_response)
@@ -0,0 +1,143 @@
+"""Bounded thread pool for concurrent upstream fetches
+
+上游 API 呼叫大多在等待網路 I/O，放到執行緒池中並行執行後，
+頁面延遲約等於最慢的一個呼叫，而不是全部呼叫的總和。
+"""
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from flask import copy_current_request_context, current_app, has_request_context
+from flask_weather import metrics
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """取得目前 process 的共用執行緒池（fork 後重新建立）"""
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get("UPSTREAM_MAX_WORKERS", 8),
+                thread_name_prefix="upstream",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """在執行緒池中執行 fn，並帶入目前的 request 或 app context"""
+    if has_request_context():
+        task = copy_current_request_context(fn)
+    else:
+        app = current_app._get_current_object()
+
+        def task(*task_args, **task_kwargs):
+            with app.app_context():
+                return fn(*task_args, **task_kwargs)
+
+    return get_executor().submit(task, *args, **kwargs)
+
+
+def submit_background(fn, *args):
+    """在執行緒池中執行不依附於目前請求的工作（只帶入 app context）"""
+    app = current_app._get_current_object()
+
+    def task():
+        with app.app_context():
+            return fn(*args)
+
+    return get_executor().submit(task)
+
+
+def map_bounded(fn, items, limit):
+    """
+    以最多 limit 個並行任務執行 fn(item)
+    :return: 與 items 順序相同的結果列表，個別任務失敗時該位置為 None
+    """
+    items = list(items)
+    results = [None] * len(items)
+    pending = {}
+    remaining = iter(enumerate(items))
+
+    def fill():
+        for index, item in remaining:
+            pending[submit(fn, item)] = index
+            if len(pending) >= limit:
+                break
+
+    fill()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                current_app.logger.error(f"並行任務失敗 ({items[index]!r}): {e}")
+        fill()
+
+    return results
+
+
+def cached_result(fn, *args):
+    """
+    只查詢 stale_while_revalidate 快取，不呼叫上游
+    :return: 命中回傳 (True, 值)，否則 (False, None)；fn 不是 CachedFetcher 時一律未命中
+    """
+    from flask_weather.caching import CachedFetcher
+
+    if not isinstance(fn, CachedFetcher):
+        return False, None
+    try:
+        return fn.cached(*args)
+    except Exception:
+        return False, None
+
+
+def resolve(fn, *args):
+    """快取命中時直接回傳已完成的 Future，未命中才送入執行緒池"""
+    hit, value = cached_result(fn, *args)
+    if hit:
+        future = Future()
+        future.set_result(value)
+        return future
+    return submit(fn, *args)
+
+
+def hedge(primary, fallback, delay):
+    """
+    對沖請求：primary 在 delay 秒內沒有回應（或回傳 None）時，另外送出
+    fallback()，兩者先回傳有效資料者勝出，另一個的結果直接忽略
+    :param primary: 已送出的主要請求 Future
+    :param fallback: 備援請求的函式，只在需要時才呼叫
+    :return: 勝出的結果，兩者都失敗時回傳 None
+    """
+    done, _ = wait([primary], timeout=delay)
+    if done and primary.exception() is None and primary.result() is not None:
+        return primary.result()
+
+    metrics.incr("hedge.sent")
+    secondary = submit(fallback)
+    pending = {primary, secondary}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                value = future.result()
+            except Exception as e:
+                current_app.logger.error(f"對沖請求失敗: {e}")
+                continue
+            if value is not None:
+                for loser in pending:
+                    loser.cancel()
+                metrics.incr(
+                    "hedge.won" if future is secondary else "hedge.primary_won"
+                )
+                return value
+    return None
@@ -1,5 +1,6 @@
 """Flask Weather App Configuration"""
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -26,6 +27,153 @@ class Config:
     # CWA (Central Weather Administration) API settings
     CWA_API_KEY = os.environ.get("CWA_API_KEY")
 
+    # 上游 API 連線池設定 (每個 worker、每個供應商各一個連線池)
+    UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", "10"))
+    UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", "2"))
+    UPSTREAM_RETRY_BACKOFF = float(os.environ.get("UPSTREAM_RETRY_BACKOFF", "0.3"))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", "3.05"))
+    OPENWEATHER_READ_TIMEOUT = float(os.environ.get("OPENWEATHER_READ_TIMEOUT", "5"))
+    CWA_READ_TIMEOUT = float(os.environ.get("CWA_READ_TIMEOUT", "8"))
+    # 並行呼叫上游 API 的執行緒池大小 (每個 worker)
+    UPSTREAM_MAX_WORKERS = int(os.environ.get("UPSTREAM_MAX_WORKERS", "8"))
+    # 批次查詢 (例如儀表板) 單次最多同時發出的上游請求數
+    UPSTREAM_BATCH_CONCURRENCY = int(os.environ.get("UPSTREAM_BATCH_CONCURRENCY", "4"))
+
+    # 經緯度查詢的快取精度 (geohash 長度)，鄰近座標共用同一份上游結果
+    # 5 約 4.9 km、6 約 1.2 km；設為 0 則不對齊
+    COORD_CACHE_PRECISION = int(os.environ.get("COORD_CACHE_PRECISION", "6"))
+
+    # 快取未命中時的 single-flight 設定：跨 worker 鎖的存活秒數與等待上限
+    SINGLEFLIGHT_LOCK_TIMEOUT = int(os.environ.get("SINGLEFLIGHT_LOCK_TIMEOUT", "15"))
+    SINGLEFLIGHT_WAIT = float(os.environ.get("SINGLEFLIGHT_WAIT", "10"))
+
+    # 負面快取：找不到城市與上游暫時失敗各自的短期快取秒數，避免重複打上游
+    NEGATIVE_CACHE_NOT_FOUND_TTL = int(
+        os.environ.get("NEGATIVE_CACHE_NOT_FOUND_TTL", "300")
+    )
+    NEGATIVE_CACHE_ERROR_TTL = int(os.environ.get("NEGATIVE_CACHE_ERROR_TTL", "30"))
+
+    # 上游斷路器：時間窗內呼叫數達下限且失敗率超過門檻即開啟，冷卻後放行探測請求
+    # 超過 CIRCUIT_SLOW_CALL_SECONDS 的呼叫也計為失敗
+    CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "30"))
+    CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "10"))
+    CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get("CIRCUIT_SLOW_CALL_SECONDS", "3"))
+    CIRCUIT_COOLDOWN = int(os.environ.get("CIRCUIT_COOLDOWN", "30"))
+
+    # 台灣縣市的對沖請求：OpenWeather 超過近期延遲的 HEDGE_PERCENTILE 百分位數
+    # 仍未回應時改向 CWA 同時取得；樣本不足時等待 HEDGE_DEFAULT_DELAY 秒
+    HEDGE_ENABLED = os.environ.get("HEDGE_ENABLED", "True").lower() == "true"
+    HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_DEFAULT_DELAY = float(os.environ.get("HEDGE_DEFAULT_DELAY", "1.0"))
+    HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", "0.05"))
+
+    # 自適應讀取逾時：各端點樣本達下限後，取延遲百分位數乘上倍數，
+    # 並限制在上下限之間；樣本不足時使用上方固定的讀取逾時
+    # 上限不超過各供應商固定的讀取逾時，ADAPTIVE_TIMEOUT_MAX 可再設定更低的共同上限
+    ADAPTIVE_TIMEOUT_ENABLED = (
+        os.environ.get("ADAPTIVE_TIMEOUT_ENABLED", "True").lower() == "true"
+    )
+    ADAPTIVE_TIMEOUT_PERCENTILE = float(
+        os.environ.get("ADAPTIVE_TIMEOUT_PERCENTILE", "99")
+    )
+    ADAPTIVE_TIMEOUT_MULTIPLIER = float(
+        os.environ.get("ADAPTIVE_TIMEOUT_MULTIPLIER", "3")
+    )
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(
+        os.environ.get("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "50")
+    )
+    ADAPTIVE_TIMEOUT_MIN = float(os.environ.get("ADAPTIVE_TIMEOUT_MIN", "1"))
+    ADAPTIVE_TIMEOUT_MAX = (
+        float(os.environ["ADAPTIVE_TIMEOUT_MAX"])
+        if os.environ.get("ADAPTIVE_TIMEOUT_MAX")
+        else None
+    )
+
+    # 批次天氣 API 單次最多查詢的項目數
+    BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "20"))
+
+    # 回應壓縮：COMPRESS_MIMETYPES 內的回應本文達 COMPRESS_MIN_SIZE 位元組才壓縮；
+    # 可快取回應的壓縮結果以 ETag 為鍵保留 COMPRESS_CACHE_TIMEOUT 秒
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "True").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_CACHE_TIMEOUT = int(os.environ.get("COMPRESS_CACHE_TIMEOUT", "600"))
+    COMPRESS_MIMETYPES = (
+        "text/html",
+        "text/css",
+        "text/plain",
+        "application/json",
+        "application/javascript",
+    )
+
+    # Redis 快取值的序列化 (CompactRedisCache)：msgpack、json 或 pickle，
+    # 未設定時已安裝 msgpack 就使用 msgpack；編碼後達 CACHE_COMPRESSION_MIN_SIZE
+    # 位元組時以 zstd 或 zlib 壓縮 (未設定時已安裝 zstandard 就使用 zstd，none 停用)
+    CACHE_SERIALIZER = os.environ.get("CACHE_SERIALIZER")
+    CACHE_COMPRESSION = os.environ.get("CACHE_COMPRESSION")
+    CACHE_COMPRESSION_MIN_SIZE = int(
+        os.environ.get("CACHE_COMPRESSION_MIN_SIZE", "256")
+    )
+
+    # process 內快取 (BoundedMemoryCache) 的記憶體上限 (位元組)，以及各群組的預算：
+    # 群組為 stale-while-revalidate 函式名稱或快取鍵前綴 (cwa 為 get_cwa_weather
+    # 讀取的各縣市資料、view 為已整理的預報、compressed 為壓縮後的回應)
+    # CACHE_GROUP_BUDGETS 環境變數以 JSON 覆寫個別群組，例如 {"get_forecast": 4194304}，
+    # 建立應用程式時由 load_cache_group_budgets() 驗證並合併
+    CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_GROUP_BUDGETS = {
+        "get_forecast": 8 * 1024 * 1024,
+        "get_forecast_by_coords": 4 * 1024 * 1024,
+        "get_current_weather": 4 * 1024 * 1024,
+        "get_current_weather_by_id": 2 * 1024 * 1024,
+        "get_weather_by_coords": 2 * 1024 * 1024,
+        "get_air_pollution": 2 * 1024 * 1024,
+        "get_cwa_snapshot": 1024 * 1024,
+        "cwa": 2 * 1024 * 1024,
+        "view": 4 * 1024 * 1024,
+        "compressed": 4 * 1024 * 1024,
+    }
+
+    # 共用記憶體快取 (SharedMemoryCache)：同一台主機的 worker 共用 mmap 檔案，
+    # 共 CACHE_SHM_SLOTS 個 slot，每個 CACHE_SHM_SLOT_SIZE 位元組 (超過的值不快取)
+    # CACHE_SHM_PATH 未設定時放在 /dev/shm
+    CACHE_SHM_PATH = os.environ.get("CACHE_SHM_PATH")
+    CACHE_SHM_SLOTS = int(os.environ.get("CACHE_SHM_SLOTS", "4096"))
+    CACHE_SHM_SLOT_SIZE = int(os.environ.get("CACHE_SHM_SLOT_SIZE", "4096"))
+
+    # 暖快取快照：每 WARM_CACHE_INTERVAL 秒 (0 則只在正常結束時) 將天氣快取寫入
+    # SQLite，create_app 時載回並保留剩餘 TTL；WARM_CACHE_GROUPS 為要保存的群組
+    # WARM_CACHE_PATH 未設定時放在應用程式的 instance 目錄，不寫入套件目錄
+    WARM_CACHE_ENABLED = os.environ.get("WARM_CACHE_ENABLED", "True").lower() == "true"
+    WARM_CACHE_PATH = os.environ.get("WARM_CACHE_PATH")
+    WARM_CACHE_INTERVAL = int(os.environ.get("WARM_CACHE_INTERVAL", "300"))
+    WARM_CACHE_GROUPS = (
+        "get_current_weather",
+        "get_current_weather_by_id",
+        "get_weather_by_coords",
+        "get_forecast",
+        "get_forecast_by_coords",
+        "get_air_pollution",
+        "get_cwa_snapshot",
+        "cwa",
+    )
+
+    # L1：每個 worker 內的 LRU 快取，放在共用快取 (Redis) 前面，最多保留
+    # L1_CACHE_SIZE 筆、每筆 L1_CACHE_TTL 秒；清除快取時經由 Redis pub/sub
+    # 頻道 L1_INVALIDATION_CHANNEL 通知所有 worker。任一設為 0 則停用；
+    # L1_CACHE_SIZE 未設定時只在有 CACHE_REDIS_URL（可廣播失效訊息）時啟用 256 筆
+    L1_CACHE_SIZE = (
+        int(os.environ["L1_CACHE_SIZE"]) if os.environ.get("L1_CACHE_SIZE") else None
+    )
+    L1_CACHE_TTL = float(os.environ.get("L1_CACHE_TTL", "5"))
+    L1_INVALIDATION_CHANNEL = os.environ.get(
+        "L1_INVALIDATION_CHANNEL", "flask_weather:l1-invalidate"
+    )
+
+    # /ops 端點的存取權杖；未設定時僅開發與測試環境可存取
+    OPS_TOKEN = os.environ.get("OPS_TOKEN")
+
     # Database configuration
     # Zeabur 會自動注入 POSTGRES_CONNECTION_STRING 環境變數
     # 若沒有 PostgreSQL，則退回使用 SQLite (本地開發)
@@ -70,6 +218,8 @@ class TestingConfig(Config):
     )
     WTF_CSRF_ENABLED = False  # 測試時關閉 CSRF 驗證方便測試
     TALISMAN_ENABLED = False  # 測試時禁用 Talisman 以避免 HTTPS 重定向
+    L1_CACHE_SIZE = 0  # 測試直接操作快取後端，停用 L1 以免讀到舊值
+    WARM_CACHE_ENABLED = False  # 測試之間不沿用快取
 
 
 class ProductionConfig(Config):
@@ -77,9 +227,49 @@ class ProductionConfig(Config):
 
     DEBUG = False
     ENV = "production"
-    CACHE_TYPE = "redis"
     # Zeabur 會自動注入 REDIS_CONNECTION_STRING
     CACHE_REDIS_URL = os.environ.get("REDIS_CONNECTION_STRING")
+    # 有 Redis 時使用以精簡格式 (msgpack / JSON + 壓縮) 儲存值的 RedisCache，
+    # 沒有時改用同一台主機 worker 共用的記憶體快取；可用 CACHE_TYPE 指定
+    CACHE_TYPE = os.environ.get("CACHE_TYPE") or (
+        "flask_weather.cache_backends.CompactRedisCache"
+        if CACHE_REDIS_URL
+        else "flask_weather.cache_backends.SharedMemoryCache"
+    )
+
+
+class ConfigError(ValueError):
+    """環境變數設定值無效"""
+
+
+def load_cache_group_budgets(app):
+    """
+    以 CACHE_GROUP_BUDGETS 環境變數 (JSON 物件：群組 -> 位元組數) 覆寫預設的群組預算
+    :raises ConfigError: 不是 JSON 物件或預算不是非負整數時，訊息中指出變數名稱
+    """
+    raw = os.environ.get("CACHE_GROUP_BUDGETS")
+    if not raw:
+        return
+
+    try:
+        overrides = json.loads(raw)
+    except ValueError as e:
+        raise ConfigError(f"CACHE_GROUP_BUDGETS 不是有效的 JSON：{e}") from e
+    if not isinstance(overrides, dict):
+        raise ConfigError(
+            'CACHE_GROUP_BUDGETS 必須是 JSON 物件，例如 {"get_forecast": 4194304}'
+        )
+    for group, budget in overrides.items():
+        if type(budget) is not int or budget < 0:
+            raise ConfigError(
+                f"CACHE_GROUP_BUDGETS 中 {group} 的預算必須是非負整數（位元組），"
+                f"目前為 {budget!r}"
+            )
+
+    app.config["CACHE_GROUP_BUDGETS"] = {
+        **app.config.get("CACHE_GROUP_BUDGETS", {}),
+        **overrides,
+    }
 
 
 def get_config():
@@ -0,0 +1,75 @@
+"""Geohash helpers for coordinate-based cache keys
+
+瀏覽器定位的經緯度每位使用者都不同，直接當作快取鍵幾乎不會命中。
+將座標對齊到 geohash 格子的中心後，鄰近的請求可以共用同一份上游結果。
+精度 5 約為 4.9 x 4.9 km，精度 6 約為 1.2 x 0.6 km。
+"""
+
+from flask import current_app, has_app_context
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE_MAP = {char: index for index, char in enumerate(_BASE32)}
+
+
+def encode(lat, lon, precision):
+    """將經緯度編碼為指定長度的 geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash 由經度開始交錯
+
+    while len(chars) < precision:
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            value_range[0] = mid
+        else:
+            bits = bits * 2
+            value_range[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def decode_center(geohash):
+    """回傳 geohash 格子中心的 (lat, lon)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = _DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            value_range = lon_range if even else lat_range
+            mid = (value_range[0] + value_range[1]) / 2
+            if bits >> shift & 1:
+                value_range[0] = mid
+            else:
+                value_range[1] = mid
+            even = not even
+
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def snap_coords(lat, lon):
+    """
+    將座標對齊到 geohash 格子中心，精度由 COORD_CACHE_PRECISION 設定
+    精度小於等於 0 時不對齊，直接回傳原始座標
+    """
+    precision = 6
+    if has_app_context():
+        precision = current_app.config.get("COORD_CACHE_PRECISION", precision)
+    if precision <= 0:
+        return lat, lon
+
+    center_lat, center_lon = decode_center(encode(float(lat), float(lon), precision))
+    return round(center_lat, 5), round(center_lon, 5)
@@ -0,0 +1,65 @@
+"""HTTP caching helpers for JSON endpoints
+
+ETag 由快取項目的內容摘要與輸出參數（單位制等）組成，不需要序列化回應
+就能得知；客戶端帶 If-None-Match 且相符時直接回傳 304，不產生 JSON。
+Cache-Control 的 max-age 跟隨快取項目剩餘的新鮮時間。
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from flask import jsonify, make_response, request
+
+
+def make_etag(*parts):
+    """由多個部分組成強 ETag（未加引號）"""
+    raw = ":".join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def to_http_date(timestamp):
+    """Unix timestamp -> aware datetime，供 Last-Modified 使用"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def etag_matches(etag):
+    """
+    If-None-Match 是否包含此 ETag（弱比對，RFC 9110）
+    回應壓縮後 ETag 會改為弱驗證器，客戶端帶回 W/"..." 也應視為相符
+    """
+    return request.if_none_match.contains_weak(etag)
+
+
+def apply_cache_headers(
+    response, etag, last_modified=None, max_age=0, stale_while_revalidate=None
+):
+    """
+    設定 ETag、Last-Modified 與 Cache-Control
+    :param stale_while_revalidate: 過期後仍可先使用舊回應並在背景重新驗證的秒數
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max(int(max_age), 0)
+    if stale_while_revalidate:
+        response.cache_control.stale_while_revalidate = int(stale_while_revalidate)
+    return response
+
+
+def conditional_json(
+    build, etag, last_modified=None, max_age=0, stale_while_revalidate=None
+):
+    """
+    條件式 GET：If-None-Match 相符時回傳 304，否則呼叫 build() 產生 JSON
+    :param build: 回傳可 JSON 序列化資料的函式，只在需要回應本文時呼叫
+    """
+    if etag_matches(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build())
+    return apply_cache_headers(
+        response, etag, last_modified, max_age, stale_while_revalidate
+    )
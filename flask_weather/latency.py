@@ -0,0 +1,105 @@
+"""Rolling upstream latency histograms
+
+每個 worker process 為各上游供應商與端點維護一份滾動延遲直方圖：
+時間切成 SLICE_SECONDS 秒的片段，只保留最近 WINDOW_SLICES 個片段，
+舊資料自動淘汰。直方圖用來估計延遲百分位數，決定對沖請求的等待時間與
+自適應的讀取逾時。
+"""
+
+import threading
+import time
+
+# 直方圖各桶的上界（秒），最後一桶收集所有更慢的呼叫
+BUCKET_BOUNDS = (
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.15,
+    0.25,
+    0.4,
+    0.6,
+    1.0,
+    1.5,
+    2.5,
+    4.0,
+    6.0,
+    10.0,
+    float("inf"),
+)
+
+# 每個時間片段的秒數與保留的片段數（預設保留最近 5 分鐘）
+SLICE_SECONDS = 30
+WINDOW_SLICES = 10
+
+
+class LatencyTracker:
+    """各 (供應商, 端點) 的滾動延遲直方圖"""
+
+    def __init__(self, slice_seconds=SLICE_SECONDS, window_slices=WINDOW_SLICES):
+        self.slice_seconds = slice_seconds
+        self.window_slices = window_slices
+        # (provider, endpoint) -> {片段編號: 各桶計數}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _slice(self):
+        return int(time.monotonic() // self.slice_seconds)
+
+    def record(self, provider, seconds, endpoint=None):
+        bucket = next(i for i, bound in enumerate(BUCKET_BOUNDS) if seconds <= bound)
+        current = self._slice()
+        with self._lock:
+            slices = self._histograms.setdefault((provider, endpoint), {})
+            counts = slices.get(current)
+            if counts is None:
+                counts = slices[current] = [0] * len(BUCKET_BOUNDS)
+                for old in [s for s in slices if s <= current - self.window_slices]:
+                    del slices[old]
+            counts[bucket] += 1
+
+    def _merged(self, provider, endpoint=None):
+        """合併時間窗內的片段；未指定端點時合併該供應商的所有端點"""
+        oldest = self._slice() - self.window_slices
+        merged = [0] * len(BUCKET_BOUNDS)
+        with self._lock:
+            for (key_provider, key_endpoint), slices in self._histograms.items():
+                if key_provider != provider:
+                    continue
+                if endpoint is not None and key_endpoint != endpoint:
+                    continue
+                for index, counts in slices.items():
+                    if index > oldest:
+                        merged = [a + b for a, b in zip(merged, counts)]
+        return merged
+
+    def count(self, provider, endpoint=None):
+        return sum(self._merged(provider, endpoint))
+
+    def percentile(self, provider, q, endpoint=None):
+        """
+        回傳第 q 百分位數（桶內線性內插），沒有樣本時回傳 None
+        :param q: 0-100
+        """
+        counts = self._merged(provider, endpoint)
+        total = sum(counts)
+        if not total:
+            return None
+
+        target = q / 100 * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= target:
+                lower = BUCKET_BOUNDS[i - 1] if i else 0.0
+                upper = BUCKET_BOUNDS[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return BUCKET_BOUNDS[-2]
+
+    def endpoints(self):
+        """目前有樣本的 (供應商, 端點) 列表"""
+        with self._lock:
+            return sorted(self._histograms, key=lambda key: (key[0], key[1] or ""))
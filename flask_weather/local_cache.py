@@ -0,0 +1,178 @@
+"""In-process L1 cache in front of the shared cache backend
+
+正式環境每次快取命中都要到 Redis 往返一次，熱門城市在同一個 TTL 內會被每個
+worker 讀取上千次。L1 是每個 worker 內有上限的 LRU，以很短的 TTL 保留
+stale-while-revalidate 快取項目，命中時不必連線 Redis：
+
+- 最多 L1_CACHE_SIZE 筆，每筆保留 L1_CACHE_TTL 秒；任一設為 0 則停用
+- 清除快取（例如 clear_weather_cache）時先清除本 worker 的 L1，再以 Redis
+  pub/sub 通知其他 worker；訂閱中斷重連時清空整個 L1，避免漏接的訊息
+- 沒有 CACHE_REDIS_URL 時（開發環境的 SimpleCache、正式環境退回的
+  SharedMemoryCache 或 BoundedMemoryCache）無法通知其他 worker，預設停用 L1；
+  明確設定 L1_CACHE_SIZE 時仍會啟用，但清除快取只影響本 worker 的 L1
+
+L1 直接保存物件而非序列化後的位元組，取得的值不可修改。
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# 訂閱連線中斷後重新連線前等待的秒數
+RECONNECT_DELAY = 1.0
+
+# 未設定 L1_CACHE_SIZE 且有 CACHE_REDIS_URL 時的筆數上限
+DEFAULT_SIZE = 256
+
+
+class LocalCache:
+    """執行緒安全、有筆數上限與 TTL 的 LRU"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.bus = None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """取得未過期的值，不存在時回傳 None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        """移除鍵以 prefix 開頭的所有項目"""
+        with self._lock:
+            for key in [key for key in self._items if key.startswith(prefix)]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class InvalidationBus:
+    """以 Redis pub/sub 將 L1 失效訊息（鍵前綴）廣播給所有 worker"""
+
+    def __init__(self, local, url, channel):
+        self.local = local
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    def publish(self, prefix):
+        try:
+            self._redis().publish(self.channel, prefix)
+        except redis.RedisError as e:
+            logger.error(f"廣播 L1 失效訊息失敗: {e}")
+
+    def ensure_listening(self):
+        """在目前 process 啟動訂閱執行緒；fork 出的 worker 會以新連線重新啟動"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._client = None
+            threading.Thread(
+                target=self._listen, name="l1-invalidation", daemon=True
+            ).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # 連線中斷期間可能漏接訊息，重新訂閱後清空 L1
+                self.local.clear()
+                for message in pubsub.listen():
+                    self.handle(message)
+            except Exception as e:
+                logger.warning(f"L1 失效訊息訂閱中斷，稍後重新連線: {e}")
+                time.sleep(RECONNECT_DELAY)
+
+    def handle(self, message):
+        if message.get("type") != "message":
+            return
+        prefix = message["data"]
+        if isinstance(prefix, bytes):
+            prefix = prefix.decode("utf-8")
+        self.local.invalidate_prefix(prefix)
+
+
+def init_local_cache(app):
+    """依設定在應用程式上註冊 L1 快取；停用時為 None"""
+    url = app.config.get("CACHE_REDIS_URL")
+    size = app.config.get("L1_CACHE_SIZE")
+    if size is None:
+        size = DEFAULT_SIZE if url else 0
+    ttl = app.config.get("L1_CACHE_TTL", 0)
+    if size <= 0 or ttl <= 0:
+        app.extensions["local_cache"] = None
+        return
+
+    local = LocalCache(size, ttl)
+    if url:
+        channel = app.config.get("L1_INVALIDATION_CHANNEL", "flask_weather:l1")
+        local.bus = InvalidationBus(local, url, channel)
+    else:
+        app.logger.warning("沒有 CACHE_REDIS_URL，清除快取時只會清除本 worker 的 L1")
+    app.extensions["local_cache"] = local
+
+
+def get_local_cache():
+    """取得目前應用程式的 L1 快取；停用或沒有 app context 時回傳 None"""
+    if not has_app_context():
+        return None
+    local = current_app.extensions.get("local_cache")
+    if local is not None and local.bus is not None:
+        local.bus.ensure_listening()
+    return local
+
+
+def invalidate(prefix):
+    """使所有 worker 的 L1 中鍵以 prefix 開頭的項目失效"""
+    local = get_local_cache()
+    if local is None:
+        return
+    local.invalidate_prefix(prefix)
+    if local.bus is not None:
+        local.bus.publish(prefix)
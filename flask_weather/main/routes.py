@@ -1,4 +1,5 @@
 from flask import (
+    current_app,
     render_template,
     session,
     flash,
@@ -6,11 +7,13 @@ from flask import (
     request,
     url_for,
 )
+from flask_weather import limiter
+from flask_weather.weather.api import batch_cost, batch_weather_json, weather_json
 from flask_weather.weather.forms import SearchForm
 from . import main_bp
 from flask_weather.utils import (
-    clear_weather_cache,
-    get_current_weather,
+    get_current_weather_group,
+    get_current_weather_many,
     format_weather_data,
 )
 from flask_login import login_required, current_user
@@ -24,9 +27,17 @@ def index():
 
 
 @main_bp.route("/api/weather", methods=["GET"])
+@limiter.limit("60 per minute")
 def weather_api_root():
-    """天氣 API 端點"""
-    return {"status": "ok", "message": "天氣 API 端點"}
+    """天氣 API 端點：?city=<城市>&view=current|forecast|chart&units=metric|imperial"""
+    return weather_json(request.args.get("city"), request.args.get("view", "current"))
+
+
+@main_bp.route("/api/weather/batch", methods=["POST"])
+@limiter.limit("60 per minute", cost=batch_cost)
+def weather_api_batch():
+    """批次天氣 API：每個項目計一次限流額度"""
+    return batch_weather_json()
 
 
 @main_bp.route("/set_units/<unit>")
@@ -34,7 +45,6 @@ def set_units(unit):
     if unit in ["metric", "imperial"]:
         session["units"] = unit
         flash(f"已切換至 {'攝氏 (°C)' if unit == 'metric' else '華氏 (°F)'}", "success")
-        clear_weather_cache()
     return redirect(request.referrer or url_for("main.index"))
 
 
@@ -49,13 +59,29 @@ def dashboard():
     )
     saved_cities = pagination.items
 
+    # 已解析城市 ID 的收藏以 group 端點一次取得，其餘依城市名稱批次查詢
+    city_ids = [saved.owm_city_id for saved in saved_cities if saved.owm_city_id]
+    names = [saved.city_name for saved in saved_cities if not saved.owm_city_id]
+    by_id = dict(zip(city_ids, get_current_weather_group(city_ids)))
+    by_name = dict(zip(names, get_current_weather_many(names)))
+    raw_reports = [
+        (
+            by_id.get(saved.owm_city_id)
+            if saved.owm_city_id
+            else by_name.get(saved.city_name)
+        )
+        for saved in saved_cities
+    ]
+
     weather_reports = []
-    for saved in saved_cities:
-        # 逐一查詢天氣 (注意：這可能會很慢，後續需優化)
-        raw_data = get_current_weather(saved.city_name)
-        if raw_data:
+    for saved, raw_data in zip(saved_cities, raw_reports):
+        data = None
+        try:
             data = format_weather_data(raw_data)
-            weather_reports.append(data)
+        except (KeyError, IndexError, TypeError) as e:
+            current_app.logger.error(f"格式化 {saved.city_name} 天氣資料失敗: {e}")
+        # 個別城市失敗時仍顯示卡片，不影響整個儀表板
+        weather_reports.append(data or {"city": saved.city_name, "unavailable": True})
 
     return render_template(
         "dashboard.html", reports=weather_reports, pagination=pagination
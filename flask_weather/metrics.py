@@ -0,0 +1,29 @@
+"""Process-local counters for cache and upstream behaviour
+
+計數器存在各 worker process 的記憶體中，/ops/metrics 回傳的是處理該請求的
+worker 的數值（回應中附上 pid 以便區分）。
+"""
+
+import threading
+from collections import Counter
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    """累加計數器"""
+    with _lock:
+        _counters[name] += amount
+
+
+def snapshot():
+    """取得目前所有計數器的複本"""
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset():
+    """清除所有計數器（測試用）"""
+    with _lock:
+        _counters.clear()
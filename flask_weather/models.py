@@ -1,5 +1,7 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from flask_weather import db, login
+from flask_weather.cities import canonical_city
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
@@ -35,12 +37,33 @@ class User(UserMixin, db.Model):
 
 class SavedCity(db.Model):
     __tablename__ = "saved_cities"
+    __table_args__ = (
+        db.Index("ix_saved_cities_user_id_city_key", "user_id", "city_key"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     city_name = db.Column(db.String(64), nullable=False)
+    # canonical_city(city_name)，讓「台北」與「臺北市」等寫法可直接以 SQL 比對
+    city_key = db.Column(db.String(128))
+    # OpenWeather 城市 ID 與經緯度，收藏時解析一次，儀表板可用 group 端點批次查詢
+    owm_city_id = db.Column(db.Integer, index=True)
+    lat = db.Column(db.Float)
+    lon = db.Column(db.Float)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))  # 外鍵關聯
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @validates("city_name")
+    def _set_city_key(self, key, city_name):
+        self.city_key = canonical_city(city_name)
+        return city_name
+
+    def set_location(self, location):
+        """套用 resolve_city_location() 的結果"""
+        if location:
+            self.owm_city_id = location["id"]
+            self.lat = location["lat"]
+            self.lon = location["lon"]
+
     def __repr__(self):
         return f"<SavedCity {self.city_name}>"
 
@@ -0,0 +1,73 @@
+import hmac
+import os
+
+from flask import abort, current_app, jsonify, request
+from . import ops_bp
+from flask_weather import cache, metrics
+from flask_weather.cache_backends import memory_report
+from flask_weather.caching import hit_rates, tier_hit_rates
+from flask_weather.circuit import CLOSED
+from flask_weather.local_cache import get_local_cache
+from flask_weather.upstream import get_upstream
+
+
+@ops_bp.before_request
+def require_ops_access():
+    """設定 OPS_TOKEN 時需帶 X-Ops-Token；未設定時僅開發與測試環境可用"""
+    token = current_app.config.get("OPS_TOKEN")
+    if token:
+        provided = request.headers.get("X-Ops-Token", "")
+        if not hmac.compare_digest(provided, token):
+            abort(403)
+    elif not (current_app.debug or current_app.testing):
+        abort(404)
+
+
+@ops_bp.route("/metrics")
+def metrics_view():
+    counters = metrics.snapshot()
+    local = get_local_cache()
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "counters": counters,
+            "cache": hit_rates(counters),
+            "cache_tiers": {
+                **tier_hit_rates(counters),
+                "l1_size": len(local) if local is not None else None,
+            },
+        }
+    )
+
+
+@ops_bp.route("/cache")
+def cache_memory():
+    """各快取群組的記憶體用量與淘汰次數（process 內快取為本 worker 的數字）"""
+    report = memory_report(cache.cache)
+    if report is None:
+        return jsonify({"pid": os.getpid(), "supported": False})
+    return jsonify({"pid": os.getpid(), "supported": True, **report})
+
+
+@ops_bp.route("/health")
+def health():
+    """各上游供應商的斷路器狀態（上游降級時網站仍以快取資料服務，故固定回傳 200）"""
+    breakers = {
+        provider: breaker.status()
+        for provider, breaker in get_upstream().breakers.items()
+    }
+    degraded = any(status["state"] != CLOSED for status in breakers.values())
+    return jsonify({"status": "degraded" if degraded else "ok", "upstreams": breakers})
+
+
+@ops_bp.route("/timeouts")
+def timeouts():
+    """各上游端點的延遲百分位數與目前採用的讀取逾時（本 worker）"""
+    client = get_upstream()
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "connect_timeout": client.connect_timeout,
+            "endpoints": client.timeouts(),
+        }
+    )
@@ -0,0 +1,203 @@
+"""Compact serializer for cache values stored in Redis
+
+cachelib 預設以 pickle 儲存每個快取值（OpenWeather、CWA 的 dict 與其中的
+Unicode 字串），佔用較多 Redis 記憶體與每次命中的傳輸量。CacheSerializer
+改用精簡格式：
+
+- msgpack（已安裝時）或 JSON；兩者無法無損表示的值（tuple、自訂物件等）
+  自動改用 pickle，讀回的型別與寫入時相同
+- bytes（例如已壓縮的回應）原樣儲存
+- 編碼後達 CACHE_COMPRESSION_MIN_SIZE 位元組時以 zstd（已安裝時）或 zlib 壓縮，
+  壓縮後沒有變小就不壓縮
+- 沒有壓縮的值改用 pickle 會更小時（例如重複鍵名很多的預報清單）就以 pickle 儲存
+- 整數以十進位字串儲存，Redis 的 INCRBY（cache.cache.inc）可以直接累加
+
+整數以外的值開頭有兩個位元組：格式版本與編碼方式。讀取端依標頭解碼，不受目前設定
+影響，切換 msgpack / JSON 或壓縮方式時不需清空快取；不認得的版本視為未命中。
+舊版 pickle 值（以 "!" 開頭）仍可讀取。
+
+msgpack 與 zstandard 為選用套件（pip install msgpack zstandard）。
+"""
+
+import json
+import logging
+import pickle
+import zlib
+
+from cachelib.serializers import RedisSerializer
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 格式版本；變更標頭或編碼方式的意義時遞增，並同時改變 Redis 鍵的命名空間
+FORMAT_VERSION = 1
+
+# 標頭第二個位元組：低 4 位元為編碼方式，高 4 位元為壓縮方式
+RAW, JSON, MSGPACK, PICKLE = 0, 1, 2, 3
+NO_COMPRESSION, ZLIB, ZSTD = 0, 1, 2
+
+FORMATS = {"json": JSON, "msgpack": MSGPACK, "pickle": PICKLE}
+COMPRESSIONS = {"none": NO_COMPRESSION, "zlib": ZLIB, "zstd": ZSTD}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_LEGACY_PICKLE = b"!"
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def default_format():
+    return "msgpack" if msgpack is not None else "json"
+
+
+def default_compression():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _is_json_value(value):
+    """JSON 能否無損表示此值（dict 的鍵必須是字串，不接受 tuple 與子類別）"""
+    if type(value) in _JSON_SCALARS:
+        return True
+    if type(value) is list:
+        return all(_is_json_value(item) for item in value)
+    if type(value) is dict:
+        return all(
+            type(key) is str and _is_json_value(item) for key, item in value.items()
+        )
+    return False
+
+
+def _encode_json(value):
+    if not _is_json_value(value):
+        raise TypeError("JSON 無法無損表示此值")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_json(data):
+    return json.loads(data)
+
+
+def _encode_msgpack(value):
+    # strict_types：tuple 與 dict / list 的子類別交給 pickle，讀回時型別不變
+    return msgpack.packb(value, use_bin_type=True, strict_types=True)
+
+
+def _decode_msgpack(data):
+    if msgpack is None:
+        raise RuntimeError("未安裝 msgpack")
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _encode_pickle(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+ENCODERS = {JSON: _encode_json, MSGPACK: _encode_msgpack, PICKLE: _encode_pickle}
+DECODERS = {
+    RAW: bytes,
+    JSON: _decode_json,
+    MSGPACK: _decode_msgpack,
+    PICKLE: pickle.loads,
+}
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_decompress(data):
+    if zstandard is None:
+        raise RuntimeError("未安裝 zstandard")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+COMPRESSORS = {
+    ZLIB: lambda data: zlib.compress(data, ZLIB_LEVEL),
+    ZSTD: _zstd_compress,
+}
+DECOMPRESSORS = {NO_COMPRESSION: bytes, ZLIB: zlib.decompress, ZSTD: _zstd_decompress}
+
+
+class CacheSerializer(RedisSerializer):
+    """
+    cachelib 相容的序列化器
+    :param fmt: msgpack、json 或 pickle，None 表示 msgpack 已安裝時使用 msgpack
+    :param compression: zstd、zlib 或 none，None 表示 zstandard 已安裝時使用 zstd
+    :param min_size: 編碼後達此位元組數才壓縮
+    """
+
+    def __init__(self, fmt=None, compression=None, min_size=256):
+        fmt = fmt or default_format()
+        compression = compression or default_compression()
+        if fmt not in FORMATS:
+            raise ValueError(f"不支援的快取序列化格式：{fmt}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支援的快取壓縮方式：{compression}")
+        if fmt == "msgpack" and msgpack is None:
+            raise RuntimeError("CACHE_SERIALIZER=msgpack 需要安裝 msgpack")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("CACHE_COMPRESSION=zstd 需要安裝 zstandard")
+
+        self.fmt = fmt
+        self.compression = compression
+        self.min_size = min_size
+        self._codec = FORMATS[fmt]
+        self._compressor = COMPRESSIONS[compression]
+
+    def _encode(self, value):
+        if type(value) is bytes:
+            return RAW, value
+        if self._codec != PICKLE:
+            try:
+                return self._codec, ENCODERS[self._codec](value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return PICKLE, _encode_pickle(value)
+
+    def dumps(self, value, protocol=None):
+        """將值編碼為帶標頭的位元組；整數維持十進位字串以支援 INCRBY"""
+        if type(value) is int:
+            return str(value).encode("ascii")
+
+        codec, data = self._encode(value)
+        compressor = NO_COMPRESSION
+        if self._compressor != NO_COMPRESSION and len(data) >= self.min_size:
+            compressed = COMPRESSORS[self._compressor](data)
+            if len(compressed) < len(data):
+                compressor, data = self._compressor, compressed
+        if compressor == NO_COMPRESSION and codec not in (RAW, PICKLE):
+            # pickle 會記住重複出現的字串，鍵名重複多的值可能比 msgpack / JSON 小
+            pickled = _encode_pickle(value)
+            if len(pickled) < len(data):
+                codec, data = PICKLE, pickled
+        return bytes((FORMAT_VERSION, compressor << 4 | codec)) + data
+
+    def loads(self, value):
+        """解碼快取值；無法解碼時記錄警告並視為未命中 (None)"""
+        if not value:
+            return None
+        if value[:1] == _LEGACY_PICKLE:
+            return super().loads(value)
+        if value[0] != FORMAT_VERSION:
+            try:
+                return int(value)
+            except ValueError:
+                logger.warning(f"無法辨識的快取格式版本：{value[0]}")
+                return None
+
+        try:
+            flags = value[1]
+            data = DECOMPRESSORS[flags >> 4](value[2:])
+            return DECODERS[flags & 0x0F](data)
+        except Exception as e:
+            logger.warning(f"快取值解碼失敗：{e}")
+            return None
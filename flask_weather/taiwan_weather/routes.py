@@ -1,6 +1,43 @@
-from flask import jsonify, render_template
+from flask import jsonify, make_response, render_template, request
 from . import taiwan_weather_bp
-from flask_weather.utils import get_cwa_cities, get_cwa_weather
+from flask_weather.caching import served_stale
+from flask_weather.http_cache import (
+    apply_cache_headers,
+    conditional_json,
+    etag_matches,
+    make_etag,
+)
+from flask_weather.utils import (
+    CWA_SNAPSHOT_HARD_TIMEOUT,
+    CWA_SNAPSHOT_TIMEOUT,
+    cwa_fresh_seconds,
+    get_cwa_cities,
+    get_cwa_overview,
+    get_cwa_snapshot,
+    get_cwa_weather_versioned,
+)
+
+# 縣市列表是靜態資料，啟動時算好 ETag，瀏覽器與 CDN 可快取一天
+CWA_CITIES = get_cwa_cities()
+CWA_CITIES_ETAG = make_etag(
+    "cwa-cities", *(f"{city['code']}={city['name']}" for city in CWA_CITIES)
+)
+CWA_CITIES_MAX_AGE = 86400
+
+# 預報過期後仍可先使用舊回應的秒數，與伺服器端快取的 hard TTL 對齊
+CWA_STALE_WHILE_REVALIDATE = CWA_SNAPSHOT_HARD_TIMEOUT - CWA_SNAPSHOT_TIMEOUT
+
+
+def _not_modified(etag, max_age):
+    """客戶端持有的 ETag 仍有效時回傳 304，否則回傳 None"""
+    if not etag_matches(etag):
+        return None
+    return apply_cache_headers(
+        make_response("", 304),
+        etag,
+        max_age=max_age,
+        stale_while_revalidate=CWA_STALE_WHILE_REVALIDATE,
+    )
 
 
 @taiwan_weather_bp.route("/taiwan")
@@ -10,12 +47,54 @@ def page():
 
 @taiwan_weather_bp.route("/taiwan/cities")
 def cities():
-    return jsonify({"success": True, "data": get_cwa_cities()})
+    return conditional_json(
+        lambda: {"success": True, "data": CWA_CITIES},
+        CWA_CITIES_ETAG,
+        max_age=CWA_CITIES_MAX_AGE,
+    )
+
+
+@taiwan_weather_bp.route("/taiwan/weather")
+def overview():
+    """全台縣市預報；帶 ?since=<version> 時只回傳有變動的縣市"""
+    since = request.args.get("since")
+
+    # 快照版本即內容摘要，客戶端已有最新版本時不必讀取各縣市資料
+    snapshot = get_cwa_snapshot()
+    if snapshot:
+        etag = make_etag("cwa-overview", snapshot["version"], since, served_stale())
+        response = _not_modified(etag, cwa_fresh_seconds(snapshot["fetched_at"]))
+        if response:
+            return response
+
+    overview = get_cwa_overview(since=since)
+    if not overview:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": "查無資料",
+                    "message": "無法取得全台天氣資料",
+                }
+            ),
+            503,
+        )
+
+    stale = served_stale()
+    response = jsonify({"success": True, "stale": stale, **overview})
+    if snapshot and snapshot["version"] == overview["version"]:
+        apply_cache_headers(
+            response,
+            make_etag("cwa-overview", overview["version"], since, stale),
+            max_age=cwa_fresh_seconds(snapshot["fetched_at"]),
+            stale_while_revalidate=CWA_STALE_WHILE_REVALIDATE,
+        )
+    return response
 
 
 @taiwan_weather_bp.route("/taiwan/weather/<city_code>")
 def weather(city_code):
-    data = get_cwa_weather(city_code)
+    data, version = get_cwa_weather_versioned(city_code)
     if not data:
         return (
             jsonify(
@@ -28,4 +107,19 @@ def weather(city_code):
             404,
         )
 
-    return jsonify({"success": True, "data": data})
+    stale = served_stale()
+    if version is None:
+        return jsonify({"success": True, "stale": stale, "data": data})
+
+    # 縣市摘要在寫入快照時已算好，不需序列化即可比對
+    etag = make_etag("cwa", data["cityCode"], version["digest"], stale)
+    max_age = cwa_fresh_seconds(version["fetched_at"])
+    response = _not_modified(etag, max_age)
+    if response:
+        return response
+    return apply_cache_headers(
+        jsonify({"success": True, "stale": stale, "data": data}),
+        etag,
+        max_age=max_age,
+        stale_while_revalidate=CWA_STALE_WHILE_REVALIDATE,
+    )
@@ -0,0 +1,219 @@
+"""Upstream HTTP client for weather providers
+
+每個 worker process 對每個上游供應商 (OpenWeather、CWA) 各維護一個
+連線池化的 requests.Session，重複使用 TCP/TLS 連線，並統一設定重試與逾時。
+每個供應商另有斷路器，上游持續失敗時直接拒絕呼叫，不再等待逾時。
+讀取逾時依各端點近期的延遲百分位數自動調整，見 UpstreamClient.timeout。
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from flask_weather.circuit import CircuitBreaker
+from flask_weather.latency import LatencyTracker
+
+OPENWEATHER = "openweather"
+CWA = "cwa"
+
+# 供應商 -> 讀取逾時的設定鍵
+READ_TIMEOUT_KEYS = {
+    OPENWEATHER: "OPENWEATHER_READ_TIMEOUT",
+    CWA: "CWA_READ_TIMEOUT",
+}
+
+# 遇到以下狀態碼時重試（僅限 GET）
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class UpstreamError(Exception):
+    """上游 API 呼叫失敗"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UpstreamNotFound(UpstreamError):
+    """上游回應 404，例如找不到城市"""
+
+
+class UpstreamUnavailable(UpstreamError):
+    """上游暫時無法使用：5xx、逾時或連線錯誤"""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """斷路器開啟中，未呼叫上游即失敗"""
+
+
+def raise_for_upstream(exc, provider):
+    """將 requests 例外轉為對應的 UpstreamError"""
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status_code = exc.response.status_code if exc.response is not None else 0
+        if status_code == 404:
+            raise UpstreamNotFound(f"{provider}: {exc}", status_code) from exc
+        if status_code >= 500:
+            raise UpstreamUnavailable(f"{provider}: {exc}", status_code) from exc
+        raise UpstreamError(f"{provider}: {exc}", status_code) from exc
+    if isinstance(exc, requests.exceptions.RequestException):
+        raise UpstreamUnavailable(f"{provider}: {exc}") from exc
+    raise UpstreamError(f"{provider}: {exc}") from exc
+
+
+class UpstreamClient:
+    """依供應商分開的連線池 HTTP 客戶端"""
+
+    def __init__(self, config):
+        self.config = config
+        self.pool_size = config.get("UPSTREAM_POOL_SIZE", 10)
+        self.max_retries = config.get("UPSTREAM_MAX_RETRIES", 2)
+        self.retry_backoff = config.get("UPSTREAM_RETRY_BACKOFF", 0.3)
+        self.connect_timeout = config.get("UPSTREAM_CONNECT_TIMEOUT", 3.05)
+        self.read_timeouts = {
+            provider: config.get(key, 5) for provider, key in READ_TIMEOUT_KEYS.items()
+        }
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.latency = LatencyTracker()
+        self.breakers = {
+            provider: CircuitBreaker(provider) for provider in READ_TIMEOUT_KEYS
+        }
+
+    def _build_session(self, provider):
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,  # 讀取逾時不重試，避免請求時間倍增
+            status=self.max_retries,
+            backoff_factor=self.retry_backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,  # 交由 raise_for_status() 處理最終的 5xx
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if provider == CWA:
+            # CWA 憑證鏈在部分環境無法驗證，沿用原本的設定
+            session.verify = False
+        return session
+
+    def session(self, provider):
+        """取得指定供應商的 Session；fork 之後會為新 process 重新建立"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # gunicorn fork 後不可共用父 process 的 socket
+                self._sessions = {}
+                self._pid = os.getpid()
+            session = self._sessions.get(provider)
+            if session is None:
+                session = self._sessions[provider] = self._build_session(provider)
+            return session
+
+    def timeout(self, provider, endpoint=None):
+        """
+        回傳 (connect, read) 逾時設定
+        樣本足夠時讀取逾時取該端點延遲的 ADAPTIVE_TIMEOUT_PERCENTILE 百分位數
+        乘上 ADAPTIVE_TIMEOUT_MULTIPLIER，並限制在 ADAPTIVE_TIMEOUT_MIN 與
+        固定的讀取逾時（另有 ADAPTIVE_TIMEOUT_MAX 時取較小者）之間，
+        只會比固定逾時更快放棄；樣本不足時使用固定的讀取逾時
+        """
+        return (self.connect_timeout, self.read_timeout(provider, endpoint))
+
+    def read_timeout(self, provider, endpoint=None):
+        fixed = self.read_timeouts.get(provider, 5)
+        config = self.config
+        if not config.get("ADAPTIVE_TIMEOUT_ENABLED", True):
+            return fixed
+        if self.latency.count(provider, endpoint) < config.get(
+            "ADAPTIVE_TIMEOUT_MIN_SAMPLES", 50
+        ):
+            return fixed
+
+        observed = self.latency.percentile(
+            provider, config.get("ADAPTIVE_TIMEOUT_PERCENTILE", 99), endpoint
+        )
+        timeout = observed * config.get("ADAPTIVE_TIMEOUT_MULTIPLIER", 3.0)
+        lower = config.get("ADAPTIVE_TIMEOUT_MIN", 1.0)
+        upper = min(config.get("ADAPTIVE_TIMEOUT_MAX") or fixed, fixed)
+        return round(min(max(timeout, lower), upper), 3)
+
+    def timeouts(self):
+        """各 (供應商, 端點) 目前的延遲百分位數與採用的讀取逾時，供 /ops 顯示"""
+        report = []
+        for provider, endpoint in self.latency.endpoints():
+            report.append(
+                {
+                    "provider": provider,
+                    "endpoint": endpoint,
+                    "samples": self.latency.count(provider, endpoint),
+                    "p50": self.latency.percentile(provider, 50, endpoint),
+                    "p99": self.latency.percentile(provider, 99, endpoint),
+                    "read_timeout": self.read_timeout(provider, endpoint),
+                }
+            )
+        return report
+
+    def get(self, provider, url, params=None, timeout=None):
+        """
+        經由斷路器呼叫上游；斷路器開啟時立即拋出 CircuitOpen
+        5xx 與連線錯誤計為失敗，4xx 代表上游正常回應，不影響斷路器
+        """
+        breaker = self.breakers[provider]
+        probe = breaker.allow()
+        if not probe:
+            raise CircuitOpen(f"{provider}: 斷路器開啟中")
+
+        endpoint = _endpoint(url)
+        start = time.monotonic()
+        try:
+            response = self.session(provider).get(
+                url, params=params, timeout=timeout or self.timeout(provider, endpoint)
+            )
+        except requests.exceptions.Timeout:
+            # 逾時也記入直方圖，上游變慢時百分位數與逾時會跟著上升
+            elapsed = time.monotonic() - start
+            breaker.record(False, elapsed, probe)
+            self.latency.record(provider, elapsed, endpoint)
+            raise
+        except requests.exceptions.RequestException:
+            breaker.record(False, time.monotonic() - start, probe)
+            raise
+        elapsed = time.monotonic() - start
+        breaker.record(response.status_code < 500, elapsed, probe)
+        if response.status_code < 500:
+            self.latency.record(provider, elapsed, endpoint)
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+def _endpoint(url):
+    """以 URL 路徑的最後一段作為端點名稱，例如 weather、forecast、F-C0032-001"""
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1] or None
+
+
+def init_upstream(app):
+    """在應用程式上註冊上游客戶端"""
+    app.extensions["upstream"] = UpstreamClient(app.config)
+
+
+def get_upstream():
+    """取得目前應用程式的上游客戶端"""
+    return current_app.extensions["upstream"]
@@ -1,55 +1,96 @@
 """Utility functions for Flask Weather App"""
 
+import hashlib
+import json
+import time
+
 import requests
-from flask import current_app, session
+from flask import current_app, has_request_context, session
 from datetime import datetime
-from flask_weather import cache
+from flask_weather import cache, metrics
+from flask_weather.caching import stale_while_revalidate
+from flask_weather.cities import CWA_CITY_MAP, canonical_city, cwa_city_code
+from flask_weather.geo import snap_coords
+from flask_weather.upstream import (
+    CWA,
+    OPENWEATHER,
+    UpstreamError,
+    get_upstream,
+    raise_for_upstream,
+)
 from collections import defaultdict
 
+# OpenWeather API 設定
+# 上游一律以公制取得並快取，顯示時才依使用者設定轉換，快取與單位無關
+OPENWEATHER_API_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+# 單位換算
+MPS_TO_MPH = 2.23694
+WIND_UNITS = {"metric": "m/s", "imperial": "mph"}
+
+# 城市經緯度幾乎不會變動，快取一天
+CITY_COORDS_TIMEOUT = 86400
+
+# OpenWeather group 端點單次最多可查詢的城市 ID 數量
+GROUP_MAX_IDS = 20
+
 # CWA 天氣 API 設定
 CWA_API_BASE_URL = "https://opendata.cwa.gov.tw/api/v1/rest/datastore/F-C0032-001"
 
-# 全台 22 縣市對照表（英文代碼 -> 中文名稱）
-CWA_CITY_MAP = {
-    "taipei": "臺北市",
-    "newtaipei": "新北市",
-    "keelung": "基隆市",
-    "taoyuan": "桃園市",
-    "hsinchu": "新竹市",
-    "hsinchucounty": "新竹縣",
-    "miaoli": "苗栗縣",
-    "taichung": "臺中市",
-    "changhua": "彰化縣",
-    "nantou": "南投縣",
-    "yunlin": "雲林縣",
-    "chiayi": "嘉義市",
-    "chiayicounty": "嘉義縣",
-    "tainan": "臺南市",
-    "kaohsiung": "高雄市",
-    "pingtung": "屏東縣",
-    "yilan": "宜蘭縣",
-    "hualien": "花蓮縣",
-    "taitung": "臺東縣",
-    "penghu": "澎湖縣",
-    "kinmen": "金門縣",
-    "lienchiang": "連江縣",
+# 中文名稱 -> 英文代碼
+CWA_CITY_CODES = {name: code for code, name in CWA_CITY_MAP.items()}
+
+# 全台快照的快取時間；各縣市項目多保留一段時間，避免讀到索引後項目剛好過期
+CWA_SNAPSHOT_TIMEOUT = 600
+CWA_SNAPSHOT_HARD_TIMEOUT = 3600
+CWA_SNAPSHOT_GRACE = 60
+# 各版本摘要保留一天，供客戶端以 ?since=<version> 取得差異
+CWA_DIGEST_HISTORY_TIMEOUT = 86400
+
+# 已整理的預報檢視模型保留秒數（與預報快取的 hard TTL 相同）
+FORECAST_VIEW_TIMEOUT = 3600
+
+# 快取前只保留頁面與 API 會用到的欄位；None 表示整個值保留，list 表示逐項套用
+WEATHER_FIELDS = {
+    "id": None,
+    "name": None,
+    "coord": None,
+    "dt": None,
+    "sys": {"country": None, "sunrise": None, "sunset": None},
+    "main": {"temp": None, "feels_like": None, "humidity": None, "pressure": None},
+    "wind": {"speed": None},
+    "weather": [{"description": None, "icon": None, "main": None}],
+}
+FORECAST_FIELDS = {
+    "city": {"id": None, "name": None, "coord": None, "country": None},
+    "list": [
+        {
+            "dt": None,
+            "main": {"temp": None},
+            "weather": [{"description": None, "icon": None}],
+            "pop": None,
+        }
+    ],
 }
 
 
-def _fetch_weather_data(params, timeout=5):
+def _fetch_weather_data(params, endpoint="weather", timeout=None):
     """
-    私有函式：統一處理 OpenWeather API 請求與錯誤處理，成功回傳 JSON，失敗回傳 None
+    私有函式：統一處理 OpenWeather API 請求與錯誤處理，成功回傳 JSON
+    失敗時記錄日誌並拋出 UpstreamError（找不到為 UpstreamNotFound，
+    5xx／逾時／連線錯誤為 UpstreamUnavailable），由快取層決定如何處理
+    :param endpoint: OpenWeather API 端點，例如 weather、forecast、air_pollution
     """
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
+    url = f"{OPENWEATHER_API_BASE_URL}/{endpoint}"
 
     try:
-        current_app.logger.debug(f"呼叫 OpenWeather API：{params}")
-        response = requests.get(base_url, params=params, timeout=timeout)
+        current_app.logger.debug(f"呼叫 OpenWeather API ({endpoint})：{params}")
+        response = get_upstream().get(OPENWEATHER, url, params=params, timeout=timeout)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.Timeout:
-        current_app.logger.warning("OpenWeather API 請求逾時")
-        return None
+    except requests.exceptions.Timeout as e:
+        current_app.logger.warning(f"OpenWeather API ({endpoint}) 請求逾時")
+        raise_for_upstream(e, OPENWEATHER)
     except requests.exceptions.HTTPError as e:
         status_code = e.response.status_code if e.response is not None else 0
         if status_code == 404:
@@ -58,49 +99,81 @@ def _fetch_weather_data(params, timeout=5):
             current_app.logger.error("OpenWeather API Key 無效")
         else:
             current_app.logger.error(f"HTTP 錯誤: {e}")
-        return None
+        raise_for_upstream(e, OPENWEATHER)
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"連線錯誤: {e}")
-        return None
+        raise_for_upstream(e, OPENWEATHER)
     except ValueError as e:
         current_app.logger.error(f"API 回傳資料格式錯誤: {e}")
-        return None
+        raise_for_upstream(e, OPENWEATHER)
 
 
-def _fetch_cwa_data(city_name, timeout=8):
+def _pick(data, fields):
+    """依欄位規格複製資料，只保留存在且需要的欄位"""
+    if fields is None:
+        return data
+    if isinstance(fields, list):
+        if not isinstance(data, list):
+            return data
+        return [_pick(item, fields[0]) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: _pick(data[key], sub) for key, sub in fields.items() if key in data}
+
+
+def trim_weather_data(data):
+    """當前天氣只保留 format_weather_data 與城市定位需要的欄位"""
+    return _pick(data, WEATHER_FIELDS) if data else data
+
+
+def trim_forecast_data(data):
+    """
+    預報只保留 format_forecast_data 需要的欄位，並附上內容摘要 view_key，
+    供已整理的檢視模型快取使用
     """
-    取得 CWA 36 小時天氣預報原始資料
+    if not data:
+        return data
+    trimmed = _pick(data, FORECAST_FIELDS)
+    trimmed["view_key"] = _digest(trimmed)
+    return trimmed
+
+
+def _fetch_cwa_data(city_name=None, timeout=None):
+    """
+    取得 CWA 36 小時天氣預報原始資料，失敗時拋出 UpstreamError
+    :param city_name: 縣市中文名稱；未指定時一次取得全台所有縣市
     """
     api_key = current_app.config.get("CWA_API_KEY")
     if not api_key:
         current_app.logger.error("CWA API Key 未設定")
-        return None
+        raise UpstreamError("CWA API Key 未設定")
 
-    params = {
-        "Authorization": api_key,
-        "locationName": city_name,
-    }
+    params = {"Authorization": api_key}
+    if city_name:
+        params["locationName"] = city_name
 
     try:
         current_app.logger.debug(f"呼叫 CWA API：{params}")
-        response = requests.get(CWA_API_BASE_URL, params=params, timeout=timeout, verify=False)
+        response = get_upstream().get(
+            CWA, CWA_API_BASE_URL, params=params, timeout=timeout
+        )
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.Timeout:
+    except requests.exceptions.Timeout as e:
         current_app.logger.warning("CWA API 請求逾時")
-        return None
+        raise_for_upstream(e, CWA)
     except requests.exceptions.HTTPError as e:
         current_app.logger.error(f"CWA API HTTP 錯誤: {e}")
-        return None
+        raise_for_upstream(e, CWA)
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"CWA API 連線錯誤: {e}")
-        return None
+        raise_for_upstream(e, CWA)
     except ValueError as e:
         current_app.logger.error(f"CWA API 回傳資料格式錯誤: {e}")
-        return None
+        raise_for_upstream(e, CWA)
 
 
-@cache.memoize(timeout=600)  # 快取 10 分鐘
+@stale_while_revalidate(soft_ttl=600, hard_ttl=3600, normalize=canonical_city)
 def get_current_weather(city):
     """
     取得指定城市的當前天氣
@@ -108,36 +181,162 @@ def get_current_weather(city):
     :return: 成功回傳天氣資料字典，失敗回傳 None
     """
     api_key = current_app.config.get("OPENWEATHER_API_KEY")
-    units = session.get("units", "metric")
+    params = {"q": city, "appid": api_key, "units": "metric", "lang": "zh_tw"}
+    data = trim_weather_data(_fetch_weather_data(params))
+    _remember_city_coords(city, data)
+    return data
 
-    params = {"q": city, "appid": api_key, "units": units, "lang": "zh_tw"}
-    return _fetch_weather_data(params)
+
+def get_current_weather_many(cities):
+    """
+    批次取得多個城市的當前天氣
+    快取命中的城市以一次 get_many 取得，未命中的城市才以有上限的並行請求補齊
+    :param cities: 城市名稱列表
+    :return: 與輸入順序相同的列表，取得失敗的城市為 None
+    """
+    return get_current_weather.many([(city,) for city in cities])
 
 
-def format_weather_data(data):
+def resolve_city_location(city):
+    """
+    解析城市在 OpenWeather 的城市 ID 與經緯度
+    經由 get_current_weather 查詢，取得的天氣同時寫入共用快取
+    :param city: 城市名稱
+    :return: {"id", "lat", "lon"}，失敗回傳 None
+    """
+    data = get_current_weather(city)
+    if not data or "id" not in data or "coord" not in data:
+        return None
+    return {"id": data["id"], "lat": data["coord"]["lat"], "lon": data["coord"]["lon"]}
+
+
+def _fetch_weather_group(batch):
+    """
+    以 OpenWeather group 端點一次取得多個城市 ID 的當前天氣
+    :param batch: [(城市 ID,)]，最多 GROUP_MAX_IDS 組
+    :return: {(城市 ID,): 天氣資料}，上游沒有回傳的城市 ID 不列出
+    """
+    api_key = current_app.config.get("OPENWEATHER_API_KEY")
+    params = {
+        "id": ",".join(str(city_id) for (city_id,) in batch),
+        "appid": api_key,
+        "units": "metric",
+        "lang": "zh_tw",
+    }
+    data = _fetch_weather_data(params, endpoint="group")
+    return {
+        (item["id"],): trim_weather_data(item)
+        for item in (data or {}).get("list", [])
+        if "id" in item
+    }
+
+
+@stale_while_revalidate(
+    soft_ttl=600,
+    hard_ttl=3600,
+    normalize=int,
+    fetch_many=_fetch_weather_group,
+    batch_size=GROUP_MAX_IDS,
+)
+def get_current_weather_by_id(city_id):
+    """
+    取得指定 OpenWeather 城市 ID 的當前天氣（背景更新單一城市時使用）
+    批次查詢請用 get_current_weather_group，未命中的城市 ID 會合併為 group 請求
+    """
+    api_key = current_app.config.get("OPENWEATHER_API_KEY")
+    params = {"id": city_id, "appid": api_key, "units": "metric", "lang": "zh_tw"}
+    return trim_weather_data(_fetch_weather_data(params))
+
+
+def get_current_weather_group(city_ids):
+    """
+    以 OpenWeather group 端點批次取得多個城市 ID 的當前天氣
+    快取項目與 get_current_weather 相同採用 stale-while-revalidate：超過 soft TTL
+    仍回傳舊值並在背景更新，上游失敗時繼續提供最後一次成功的值；
+    快取未命中的城市 ID 每 20 個合併為一次上游請求
+    :param city_ids: OpenWeather 城市 ID 列表
+    :return: 與輸入順序相同的列表，取得失敗的城市為 None
+    """
+    return get_current_weather_by_id.many([(city_id,) for city_id in city_ids])
+
+
+def _city_coords_key(city):
+    return f"city_coords:{canonical_city(city)}"
+
+
+def _remember_city_coords(city, data):
+    """記住城市的經緯度，之後查詢空氣品質時不必等待當前天氣回應"""
+    if data and "coord" in data:
+        coords = (data["coord"]["lat"], data["coord"]["lon"])
+        cache.set(_city_coords_key(city), coords, timeout=CITY_COORDS_TIMEOUT)
+
+
+def get_cached_city_coords(city):
+    """取得先前查詢過的城市經緯度，沒有紀錄時回傳 None"""
+    return cache.get(_city_coords_key(city))
+
+
+def get_units():
+    """取得使用者選擇的單位制 (metric / imperial)，預設為公制"""
+    if has_request_context():
+        return session.get("units", "metric")
+    return "metric"
+
+
+def convert_temp(celsius, units):
+    """將攝氏溫度轉換為指定單位制，四捨五入到小數一位"""
+    if celsius is None:
+        return None
+    if units == "imperial":
+        return round(celsius * 9 / 5 + 32, 1)
+    return round(celsius, 1)
+
+
+def convert_wind_speed(meters_per_second, units):
+    """將風速 (m/s) 轉換為指定單位制"""
+    if meters_per_second is None:
+        return None
+    if units == "imperial":
+        return round(meters_per_second * MPS_TO_MPH, 2)
+    return meters_per_second
+
+
+def format_weather_data(data, units=None):
     """
     將 OpenWeatherMap 的原始資料轉換為前端易用的格式
+    上游資料一律為公制，溫度與風速在此依使用者的單位制轉換
+    由 CWA 預報轉換而來的資料缺少的欄位為 None，source 標示資料來源
+    :param units: metric 或 imperial，未指定時使用 session 中的設定
     """
     if not data:
         return None
 
+    units = units or get_units()
     return {
         "city": data["name"],
         "country": data["sys"]["country"],
-        "temp": round(data["main"]["temp"], 1),
-        "feels_like": round(data["main"]["feels_like"], 1),
+        "temp": convert_temp(data["main"]["temp"], units),
+        "feels_like": convert_temp(data["main"]["feels_like"], units),
         "humidity": data["main"]["humidity"],
-        "wind_speed": data["wind"]["speed"],
+        "wind_speed": convert_wind_speed(data["wind"]["speed"], units),
+        "wind_unit": WIND_UNITS[units],
         "pressure": data["main"]["pressure"],
         "description": data["weather"][0]["description"],
         "icon": data["weather"][0]["icon"],
         "condition": data["weather"][0]["main"],  # 例如 'Clouds', 'Rain'
         "dt": datetime.fromtimestamp(data["dt"]).strftime("%Y-%m-%d %H:%M"),
-        "sunrise": datetime.fromtimestamp(data["sys"]["sunrise"]).strftime("%H:%M"),
-        "sunset": datetime.fromtimestamp(data["sys"]["sunset"]).strftime("%H:%M"),
+        "sunrise": _format_clock(data["sys"]["sunrise"]),
+        "sunset": _format_clock(data["sys"]["sunset"]),
+        "source": data.get("source", OPENWEATHER),
     }
 
 
+def _format_clock(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M")
+
+
 def get_weather_icon_class(icon_code):
     """
     將 OpenWeatherMap icon code 對應到 Remix Icon
@@ -166,7 +365,7 @@ def get_weather_icon_class(icon_code):
     return mapping.get(icon_code, "ri-question-fill text-gray-500")
 
 
-@cache.memoize(timeout=600)  # 快取 10 分鐘
+@stale_while_revalidate(soft_ttl=600, hard_ttl=3600, normalize=snap_coords)
 def get_weather_by_coords(lat, lon):
     """
     根據經緯度取得當前天氣
@@ -175,24 +374,25 @@ def get_weather_by_coords(lat, lon):
     :return: 成功回傳天氣資料字典，失敗回傳 None
     """
     api_key = current_app.config.get("OPENWEATHER_API_KEY")
-    units = session.get("units", "metric")
-
     params = {
         "lat": lat,
         "lon": lon,
         "appid": api_key,
-        "units": units,
+        "units": "metric",
         "lang": "zh_tw",
     }
 
-    return _fetch_weather_data(params)
+    return trim_weather_data(_fetch_weather_data(params))
 
 
 def clear_weather_cache():
     """清除所有天氣相關的快取，並記錄成功或失敗的日誌。回傳 True 表示成功，False 表示失敗。"""
     try:
-        cache.delete_memoized(get_current_weather)
-        cache.delete_memoized(get_weather_by_coords)
+        get_current_weather.clear()
+        get_current_weather_by_id.clear()
+        get_forecast.clear()
+        get_weather_by_coords.clear()
+        get_forecast_by_coords.clear()
         current_app.logger.debug("已清除天氣快取")
         return True
     except Exception as e:
@@ -206,6 +406,7 @@ def get_cwa_cities():
 
 
 def _format_cwa_weather_data(raw_data, city_code):
+    """將只含單一縣市的 CWA 回應轉換為前端易用的格式"""
     if not raw_data:
         return None
 
@@ -214,7 +415,11 @@ def _format_cwa_weather_data(raw_data, city_code):
     if not locations:
         return None
 
-    location_data = locations[0]
+    return _format_cwa_location(locations[0], records, city_code)
+
+
+def _format_cwa_location(location_data, records, city_code):
+    """將 CWA 回應中的單一縣市資料轉換為前端易用的格式"""
     weather_elements = location_data.get("weatherElement") or []
     if not weather_elements or not weather_elements[0].get("time"):
         return None
@@ -264,22 +469,241 @@ def _format_cwa_weather_data(raw_data, city_code):
     return weather_data
 
 
-@cache.memoize(timeout=600)
+def _format_cwa_snapshot(raw_data):
+    """將全台 CWA 回應解析為 {縣市代碼: 天氣預報}"""
+    if not raw_data:
+        return {}
+
+    records = raw_data.get("records") or {}
+    snapshot = {}
+    for location_data in records.get("location") or []:
+        city_code = CWA_CITY_CODES.get(location_data.get("locationName"))
+        if not city_code:
+            continue
+        weather_data = _format_cwa_location(location_data, records, city_code)
+        if weather_data:
+            snapshot[city_code] = weather_data
+    return snapshot
+
+
+def _cwa_city_key(version, city_code):
+    return f"cwa:{version}:{city_code}"
+
+
+def _cwa_digests_key(version):
+    return f"cwa:digests:{version}"
+
+
+def _digest(data):
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+@stale_while_revalidate(
+    soft_ttl=CWA_SNAPSHOT_TIMEOUT, hard_ttl=CWA_SNAPSHOT_HARD_TIMEOUT
+)
+def get_cwa_snapshot():
+    """
+    一次取得全台縣市預報並寫入快取，回傳快照索引
+    各縣市資料先以版本號寫入，最後才更新指向該版本的快照索引，
+    讀取端只會看到完整的舊版或新版，且整份快照隨索引一起過期
+    :return: 快照索引 {"version", "fetched_at", "digests"}，失敗回傳 None
+    """
+    cities = _format_cwa_snapshot(_fetch_cwa_data())
+    if not cities:
+        return None
+
+    # 版本號由各縣市內容摘要組成，內容沒變時版本也不變
+    digests = {code: _digest(data) for code, data in cities.items()}
+    version = _digest(digests)
+    cache.set_many(
+        {_cwa_city_key(version, code): data for code, data in cities.items()},
+        timeout=CWA_SNAPSHOT_HARD_TIMEOUT + CWA_SNAPSHOT_GRACE,
+    )
+    # 保留各版本的摘要，供 ?since=<version> 計算差異
+    cache.set(_cwa_digests_key(version), digests, timeout=CWA_DIGEST_HISTORY_TIMEOUT)
+    current_app.logger.debug(f"已更新 CWA 快照 {version}（{len(cities)} 個縣市）")
+    return {"version": version, "fetched_at": time.time(), "digests": digests}
+
+
+def refresh_cwa_snapshot():
+    """強制重新取得全台快照"""
+    return get_cwa_snapshot.refresh()
+
+
+def _read_cwa_cities(city_codes):
+    """
+    從目前快照讀取多個縣市的預報
+    :return: (快照索引, {縣市代碼: 天氣預報})，無法取得快照時回傳 (None, {})
+    """
+    snapshot = get_cwa_snapshot()
+    for _ in range(2):
+        if not snapshot:
+            return None, {}
+
+        codes = [code for code in city_codes if code in snapshot["digests"]]
+        keys = [_cwa_city_key(snapshot["version"], code) for code in codes]
+        values = cache.get_many(*keys) if keys else []
+        if all(value is not None for value in values):
+            return snapshot, dict(zip(codes, values))
+
+        # 個別項目被快取淘汰時，重新取得整份快照
+        snapshot = refresh_cwa_snapshot()
+    return None, {}
+
+
 def get_cwa_weather(city_code):
-    """取得指定縣市 CWA 天氣預報"""
-    if not city_code:
+    """取得指定縣市 CWA 天氣預報（從全台快照讀取）"""
+    return get_cwa_weather_versioned(city_code)[0]
+
+
+def get_cwa_weather_versioned(city_code):
+    """
+    取得指定縣市 CWA 天氣預報，以及寫入快照時已算好的內容摘要與取得時間，
+    供 HTTP ETag 與 Cache-Control 使用
+    :return: (天氣預報, {"digest", "fetched_at"})；查無資料時為 (None, None)，
+             無法得知快照版本時摘要資訊為 None
+    """
+    city_key = cwa_city_code(city_code) if city_code else None
+    if not city_key:
+        return None, None
+
+    snapshot, cities = _read_cwa_cities([city_key])
+    data = cities.get(city_key)
+    if data is None or not snapshot:
+        return data, None
+    return data, {
+        "digest": snapshot["digests"][city_key],
+        "fetched_at": snapshot["fetched_at"],
+    }
+
+
+def cwa_fresh_seconds(fetched_at):
+    """CWA 快照剩餘的新鮮秒數（與伺服器端快取的 soft TTL 對齊）"""
+    return max(0, int(CWA_SNAPSHOT_TIMEOUT - (time.time() - fetched_at)))
+
+
+# CWA 天氣現象關鍵字 -> (OpenWeather icon, condition)，依序比對
+CWA_CONDITIONS = (
+    ("雷", "11d", "Thunderstorm"),
+    ("雪", "13d", "Snow"),
+    ("雨", "10d", "Rain"),
+    ("霧", "50d", "Fog"),
+    ("陰", "04d", "Clouds"),
+    ("雲", "03d", "Clouds"),
+    ("晴", "01d", "Clear"),
+)
+
+
+def _parse_cwa_temp(value):
+    try:
+        return float(value.rstrip("°C"))
+    except (AttributeError, ValueError):
         return None
 
-    city_key = city_code.lower()
-    city_name = CWA_CITY_MAP.get(city_key)
-    if not city_name:
+
+def _cwa_to_weather_data(cwa_data):
+    """
+    將 CWA 縣市預報的第一個時段轉換為 OpenWeather 當前天氣的結構，
+    讓 format_weather_data 可以直接使用；CWA 沒有的欄位（濕度、風速、
+    氣壓、日出日落）為 None
+    """
+    if not cwa_data or not cwa_data.get("forecasts"):
+        return None
+
+    period = cwa_data["forecasts"][0]
+    low = _parse_cwa_temp(period["minTemp"])
+    high = _parse_cwa_temp(period["maxTemp"])
+    temps = [t for t in (low, high) if t is not None]
+    if not temps:
         return None
+    temp = sum(temps) / len(temps)
+
+    icon, condition = "03d", "Clouds"
+    for keyword, keyword_icon, keyword_condition in CWA_CONDITIONS:
+        if keyword in period["weather"]:
+            icon, condition = keyword_icon, keyword_condition
+            break
+
+    try:
+        dt = datetime.strptime(period["startTime"], "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        dt = time.time()
+
+    return {
+        "name": cwa_data["city"],
+        "sys": {"country": "TW", "sunrise": None, "sunset": None},
+        "main": {
+            "temp": temp,
+            "feels_like": temp,
+            "humidity": None,
+            "pressure": None,
+        },
+        "wind": {"speed": None},
+        "weather": [
+            {"description": period["weather"], "icon": icon, "main": condition}
+        ],
+        "dt": int(dt),
+        "source": CWA,
+    }
 
-    raw_data = _fetch_cwa_data(city_name)
-    return _format_cwa_weather_data(raw_data, city_key)
 
+def get_cwa_current_weather(city_code):
+    """取得 CWA 縣市預報並轉換為 OpenWeather 當前天氣的結構"""
+    return _cwa_to_weather_data(get_cwa_weather(city_code))
 
-@cache.memoize(timeout=600)  # 快取 10 分鐘
+
+def hedge_delay(provider, endpoint=None):
+    """主要供應商等待多久才發出對沖請求：近期延遲的設定百分位數"""
+    config = current_app.config
+    latency = get_upstream().latency
+    if latency.count(provider, endpoint) < config.get("HEDGE_MIN_SAMPLES", 20):
+        return config.get("HEDGE_DEFAULT_DELAY", 1.0)
+    delay = latency.percentile(provider, config.get("HEDGE_PERCENTILE", 95), endpoint)
+    return max(delay, config.get("HEDGE_MIN_DELAY", 0.05))
+
+
+def get_cwa_overview(since=None):
+    """
+    取得全台縣市預報
+    :param since: 客戶端持有的快照版本；提供且仍可比對時只回傳有變動的縣市
+    :return: {"version", "full", "data", "removed"}，失敗回傳 None
+    """
+    snapshot = get_cwa_snapshot()
+    if not snapshot:
+        return None
+
+    previous = cache.get(_cwa_digests_key(since)) if since else None
+    if previous is None:
+        changed = list(snapshot["digests"])
+        removed = []
+    else:
+        changed = [
+            code
+            for code, digest in snapshot["digests"].items()
+            if previous.get(code) != digest
+        ]
+        removed = [code for code in previous if code not in snapshot["digests"]]
+
+    current, cities = _read_cwa_cities(changed)
+    if current is None:
+        return None
+    if current["version"] != snapshot["version"]:
+        # 讀取途中快照已更新，改以新版本回傳完整資料
+        current, cities = _read_cwa_cities(list(current["digests"]))
+        previous, removed = None, []
+        if current is None:
+            return None
+
+    return {
+        "version": current["version"],
+        "full": previous is None,
+        "data": cities,
+        "removed": removed,
+    }
+
+
+@stale_while_revalidate(soft_ttl=600, hard_ttl=3600, normalize=canonical_city)
 def get_forecast(city):
     """
     取得指定城市的天氣預報
@@ -287,28 +711,20 @@ def get_forecast(city):
     :return: 成功回傳天氣預報資料字典，失敗回傳 None
     """
     api_key = current_app.config.get("OPENWEATHER_API_KEY")
-    units = session.get("units", "metric")
-
-    params = {"q": city, "appid": api_key, "units": units, "lang": "zh_tw"}
-    base_url = "https://api.openweathermap.org/data/2.5/forecast"
-
-    try:
-        current_app.logger.debug(f"呼叫 OpenWeather Forecast API：{params}")
-        response = requests.get(base_url, params=params, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"取得天氣預報失敗: {e}")
-        return None
+    params = {"q": city, "appid": api_key, "units": "metric", "lang": "zh_tw"}
+    return trim_forecast_data(_fetch_weather_data(params, endpoint="forecast"))
 
 
-def format_forecast_data(data):
+def format_forecast_data(data, units=None):
     """
     將 OpenWeatherMap 的預報資料轉換為前端易用的格式
+    :param units: metric 或 imperial，未指定時使用 session 中的設定
     """
     if not data:
         return None
 
+    units = units or get_units()
+
     daily_forecasts = defaultdict(list)
 
     for item in data.get("list", []):
@@ -332,7 +748,7 @@ def format_forecast_data(data):
         # 整理單筆資料
         forecast_item = {
             "time": dt.strftime("%H:%M"),
-            "temp": round(item["main"]["temp"], 1),
+            "temp": convert_temp(item["main"]["temp"], units),
             "description": item["weather"][0]["description"],
             "icon": item["weather"][0]["icon"],
             "pop": int(
@@ -346,6 +762,33 @@ def format_forecast_data(data):
     return dict(daily_forecasts)
 
 
+def get_forecast_view(data, units=None):
+    """
+    預報的檢視模型：{"forecast": 依日期分組的預報, "chart": 圖表資料}
+    以預報內容摘要 (view_key) 與單位制為鍵快取整理結果，同一份預報
+    不必在每次頁面瀏覽時重新整理；沒有 view_key 的資料直接整理不快取
+    """
+    if not data:
+        return None
+
+    units = units or get_units()
+    view_key = data.get("view_key")
+    key = f"view:forecast:{view_key}:{units}" if view_key else None
+    if key:
+        view = cache.get(key)
+        if view is not None:
+            metrics.incr("view.forecast.hit")
+            return view
+
+    forecast = format_forecast_data(data, units)
+    view = {"forecast": forecast, "chart": prepare_chart_data(forecast)}
+    if key:
+        metrics.incr("view.forecast.miss")
+        cache.set(key, view, timeout=FORECAST_VIEW_TIMEOUT)
+    return view
+
+
+@stale_while_revalidate(soft_ttl=600, hard_ttl=3600, normalize=snap_coords)
 def get_forecast_by_coords(lat, lon):
     """
     根據經緯度取得天氣預報
@@ -354,24 +797,14 @@ def get_forecast_by_coords(lat, lon):
     :return: 成功回傳天氣預報資料字典，失敗回傳 None
     """
     api_key = current_app.config.get("OPENWEATHER_API_KEY")
-    units = session.get("units", "metric")
-
     params = {
         "lat": lat,
         "lon": lon,
         "appid": api_key,
-        "units": units,
+        "units": "metric",
         "lang": "zh_tw",
     }
-    base_url = "https://api.openweathermap.org/data/2.5/forecast"
-    try:
-        current_app.logger.debug(f"呼叫 OpenWeather Forecast API：{params}")
-        response = requests.get(base_url, params=params, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"取得天氣預報失敗: {e}")
-        return None
+    return trim_forecast_data(_fetch_weather_data(params, endpoint="forecast"))
 
 
 def prepare_chart_data(forecast_data):
@@ -407,7 +840,7 @@ def prepare_chart_data(forecast_data):
     return {"labels": labels, "temps": temps, "pops": pops}
 
 
-@cache.memoize(timeout=3600)
+@stale_while_revalidate(soft_ttl=3600, hard_ttl=10800, normalize=snap_coords)
 def get_air_pollution(lat, lon):
     """
     根據經緯度取得空氣污染資料
@@ -421,16 +854,7 @@ def get_air_pollution(lat, lon):
         "lon": lon,
         "appid": api_key,
     }
-    base_url = "http://api.openweathermap.org/data/2.5/air_pollution"
-
-    try:
-        current_app.logger.debug(f"呼叫 OpenWeather Air Pollution API：{params}")
-        response = requests.get(base_url, params=params, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"取得空氣污染資料失敗: {e}")
-        return None
+    return _fetch_weather_data(params, endpoint="air_pollution")
 
 
 def datetimeformat(timestamp, fmt="%Y-%m-%d %H:%M:%S"):
@@ -0,0 +1,237 @@
+"""Persistent warm-cache snapshot
+
+部署或 worker 重啟後 process 內快取是空的，剛上線的幾分鐘會大量呼叫
+OpenWeather 與 CWA。暖快取快照將天氣相關的快取項目寫入本機 SQLite：
+
+- 每 WARM_CACHE_INTERVAL 秒與 worker 正常結束時寫入；多個 worker 寫入同一個
+  檔案時逐筆合併，同一個鍵保留到期時間較晚的版本，並刪除已過期的項目
+- create_app 時載回尚未過期的項目，TTL 為剩餘秒數；快取中已有的鍵不覆寫
+- 只保存 WARM_CACHE_GROUPS 中的群組（見 cache_backends.cache_group）
+- 快照檔預設為 instance 目錄下的 warm_cache.sqlite3（WARM_CACHE_PATH）
+- 值以 CacheSerializer 編碼；快取後端需提供 entries()（BoundedMemoryCache、
+  SharedMemoryCache），Redis 本身即可跨部署保留資料，不需要快照
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+from flask_weather import cache, metrics
+from flask_weather.cache_backends import cache_group
+from flask_weather.serialization import CacheSerializer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    grp TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    saved_at REAL NOT NULL
+)
+"""
+
+# 到期時間較晚者勝出；不會過期的項目（到期時間 0，例如世代號）以最後寫入者為準
+UPSERT = """
+INSERT INTO entries (key, grp, value, expires_at, saved_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    value = excluded.value,
+    expires_at = excluded.expires_at,
+    saved_at = excluded.saved_at
+WHERE excluded.expires_at = 0 OR excluded.expires_at >= entries.expires_at
+"""
+
+# 跨 worker 鎖與背景更新標記只在短時間內有意義，不保存
+TRANSIENT_SUFFIXES = (":lock", ":refresh")
+
+_serializer = CacheSerializer()
+
+
+def snapshot_path():
+    """快照檔路徑：WARM_CACHE_PATH，未設定時為 instance 目錄下的 warm_cache.sqlite3"""
+    return current_app.config.get("WARM_CACHE_PATH") or os.path.join(
+        current_app.instance_path, "warm_cache.sqlite3"
+    )
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=10)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(SCHEMA)
+    return db
+
+
+def save_snapshot():
+    """
+    將目前快取中要保存的群組寫入快照
+    :return: 寫入的筆數；快取後端無法列出項目時為 None
+    """
+    entries = getattr(cache.cache, "entries", None)
+    if entries is None:
+        return None
+
+    config = current_app.config
+    path = snapshot_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    now = time.time()
+    rows = [
+        (key, cache_group(key), _serializer.dumps(value), expires_at, now)
+        for key, value, expires_at in entries(set(config["WARM_CACHE_GROUPS"]))
+        if not key.endswith(TRANSIENT_SUFFIXES)
+    ]
+    db = _connect(path)
+    try:
+        with db:
+            db.executemany(UPSERT, rows)
+            db.execute(
+                "DELETE FROM entries WHERE expires_at != 0 AND expires_at <= ?",
+                (now,),
+            )
+    finally:
+        db.close()
+    metrics.incr("warm_cache.saved", len(rows))
+    return len(rows)
+
+
+def load_snapshot():
+    """
+    將快照中尚未過期的項目載入快取，保留剩餘的 TTL
+    :return: 載入的筆數
+    """
+    path = snapshot_path()
+    if not os.path.exists(path):
+        return 0
+
+    now = time.time()
+    db = _connect(path)
+    try:
+        rows = db.execute(
+            "SELECT key, value, expires_at FROM entries "
+            "WHERE expires_at = 0 OR expires_at > ?",
+            (now,),
+        ).fetchall()
+    finally:
+        db.close()
+
+    loaded = 0
+    for key, data, expires_at in rows:
+        value = _serializer.loads(data)
+        if value is None:
+            continue
+        timeout = 0 if not expires_at else max(1, int(expires_at - now))
+        if cache.add(key, value, timeout=timeout):
+            loaded += 1
+    metrics.incr("warm_cache.loaded", loaded)
+    return loaded
+
+
+def describe_snapshot(path):
+    """
+    快照內容摘要
+    :return: {"path", "size", "groups": {群組: {"entries", "bytes", "expired",
+             "saved_at", "expires_at"}}}；檔案不存在時為 None
+    """
+    if not os.path.exists(path):
+        return None
+
+    now = time.time()
+    db = _connect(path)
+    try:
+        rows = db.execute(
+            "SELECT grp, COUNT(*), SUM(LENGTH(value)),"
+            " SUM(expires_at != 0 AND expires_at <= ?),"
+            " MAX(saved_at), MAX(expires_at) "
+            "FROM entries GROUP BY grp ORDER BY grp",
+            (now,),
+        ).fetchall()
+    finally:
+        db.close()
+
+    groups = {
+        group: {
+            "entries": count,
+            "bytes": size,
+            "expired": expired,
+            "saved_at": saved_at,
+            "expires_at": expires_at,
+        }
+        for group, count, size, expired, saved_at, expires_at in rows
+    }
+    return {"path": path, "size": os.path.getsize(path), "groups": groups}
+
+
+def snapshot_keys(path, group=None):
+    """
+    快照中的鍵與剩餘秒數（不會過期的項目為 None，已過期為負數）
+    :param group: 只列出此群組
+    """
+    now = time.time()
+    query = "SELECT key, expires_at FROM entries"
+    params = ()
+    if group:
+        query += " WHERE grp = ?"
+        params = (group,)
+    db = _connect(path)
+    try:
+        rows = db.execute(query + " ORDER BY key", params).fetchall()
+    finally:
+        db.close()
+    return [
+        (key, int(expires_at - now) if expires_at else None) for key, expires_at in rows
+    ]
+
+
+class _Saver:
+    """每個 worker 一個定期寫入快照的背景執行緒，並在 process 結束時再寫一次"""
+
+    def __init__(self, app):
+        self.app = app
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            if self.app.config.get("WARM_CACHE_INTERVAL", 0) > 0:
+                threading.Thread(
+                    target=self._run, name="warm-cache", daemon=True
+                ).start()
+            atexit.register(self.save)
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config["WARM_CACHE_INTERVAL"])
+            self.save()
+
+    def save(self):
+        with self.app.app_context():
+            try:
+                save_snapshot()
+            except Exception as e:
+                current_app.logger.error(f"寫入暖快取快照失敗: {e}")
+
+
+def init_warm_cache(app):
+    """載入暖快取快照，並在第一個請求時啟動定期寫入"""
+    if not app.config.get("WARM_CACHE_ENABLED"):
+        return
+
+    with app.app_context():
+        try:
+            loaded = load_snapshot()
+            if loaded:
+                app.logger.info(f"已從暖快取快照載入 {loaded} 筆快取")
+        except Exception as e:
+            app.logger.error(f"載入暖快取快照失敗: {e}")
+
+    # gunicorn --preload 時 create_app 在 fork 前執行，背景執行緒需在 worker 中啟動
+    saver = _Saver(app)
+    app.before_request(saver.ensure_started)
@@ -0,0 +1,151 @@
+"""JSON weather API shared by the weather and main blueprints"""
+
+from flask import current_app, jsonify, request
+from flask_weather.caching import served_stale
+from flask_weather.http_cache import conditional_json, make_etag, to_http_date
+from flask_weather.utils import (
+    WIND_UNITS,
+    format_weather_data,
+    get_current_weather,
+    get_forecast,
+    get_forecast_view,
+    get_weather_by_coords,
+)
+
+# 可查詢的資料種類
+API_VIEWS = ("current", "forecast", "chart")
+
+
+def api_error(message, status):
+    return jsonify({"status": "error", "message": message}), status
+
+
+def _build_payload(view, data, meta, units):
+    if view == "current":
+        body = format_weather_data(data, units)
+    else:
+        body = get_forecast_view(data, units)[view]
+    return {"status": "ok", "stale": meta["stale"], "units": units, "data": body}
+
+
+def weather_json(city, view="current"):
+    """
+    以 JSON 回傳城市的當前天氣、預報或圖表資料，支援條件式 GET
+    ETag 由快取內容摘要、資料種類、單位制與是否過時組成；Last-Modified
+    為觀測時間（預報為取得時間）；max-age 為快取剩餘的新鮮秒數
+    :param view: current、forecast 或 chart
+    """
+    if not city:
+        return api_error("請提供 city 參數", 400)
+    if view not in API_VIEWS:
+        return api_error(f"view 必須是 {'、'.join(API_VIEWS)} 之一", 400)
+    units = request.args.get("units", "metric")
+    if units not in WIND_UNITS:
+        return api_error("units 必須是 metric 或 imperial", 400)
+
+    fetcher = get_current_weather if view == "current" else get_forecast
+    data, meta = fetcher.lookup(city)
+    if data is None or meta is None:
+        return api_error(f"無法取得 {city} 的天氣資訊", 404)
+
+    observed_at = data.get("dt") if view == "current" else None
+    etag = make_etag(view, units, meta["digest"], meta["stale"])
+    return conditional_json(
+        lambda: _build_payload(view, data, meta, units),
+        etag,
+        last_modified=to_http_date(observed_at or meta["fetched_at"]),
+        max_age=meta["expires_in"],
+    )
+
+
+def _parse_batch_item(item):
+    """
+    解析批次查詢的單一項目：城市名稱字串、{"city": ...} 或 {"lat": ..., "lon": ...}
+    :return: ("city", (名稱,)) 或 ("coords", (緯度, 經度))
+    :raises ValueError: 格式錯誤
+    """
+    if isinstance(item, str):
+        item = {"city": item}
+    if not isinstance(item, dict):
+        raise ValueError("項目必須是城市名稱或物件")
+
+    city = item.get("city")
+    if city is not None:
+        if not isinstance(city, str) or not city.strip():
+            raise ValueError("city 必須是非空字串")
+        return "city", (city.strip(),)
+
+    try:
+        lat, lon = float(item["lat"]), float(item["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("需提供 city 或 lat、lon") from None
+    if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        raise ValueError("經緯度超出範圍")
+    return "coords", (lat, lon)
+
+
+def _batch_items():
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get("items"), list):
+        return payload["items"]
+    return None
+
+
+def batch_cost():
+    """批次請求的限流權重：項目數（至少 1，最多 BATCH_MAX_ITEMS）"""
+    items = _batch_items() or []
+    return max(1, min(len(items), current_app.config.get("BATCH_MAX_ITEMS", 20)))
+
+
+def batch_weather_json():
+    """
+    一次查詢多個城市或座標的當前天氣
+    請求本文：{"items": ["Taipei", {"lat": 25.03, "lon": 121.56}], "units": "metric"}
+    相同的查詢只取得一次；快取以一次 get_many 讀取，未命中的以有上限的並行請求補齊
+    :return: {"status", "stale", "units", "results": [...]}，順序與 items 相同
+    """
+    items = _batch_items()
+    if not items:
+        return api_error("請提供非空的 items 陣列", 400)
+    max_items = current_app.config.get("BATCH_MAX_ITEMS", 20)
+    if len(items) > max_items:
+        return api_error(f"一次最多查詢 {max_items} 個項目", 400)
+    units = request.get_json().get("units", "metric")
+    if units not in WIND_UNITS:
+        return api_error("units 必須是 metric 或 imperial", 400)
+
+    parsed = []
+    for item in items:
+        try:
+            parsed.append(_parse_batch_item(item))
+        except ValueError as e:
+            parsed.append(("error", str(e)))
+
+    fetchers = {"city": get_current_weather, "coords": get_weather_by_coords}
+    fetched = {}
+    for kind, fetcher in fetchers.items():
+        args_list = [args for item_kind, args in parsed if item_kind == kind]
+        fetched[kind] = iter(fetcher.many(args_list))
+
+    results = []
+    for item, (kind, detail) in zip(items, parsed):
+        if kind == "error":
+            results.append({"query": item, "status": "error", "error": detail})
+            continue
+        data = next(fetched[kind])
+        if data is None:
+            results.append(
+                {"query": item, "status": "error", "error": "無法取得天氣資訊"}
+            )
+        else:
+            results.append(
+                {
+                    "query": item,
+                    "status": "ok",
+                    "data": format_weather_data(data, units),
+                }
+            )
+
+    return jsonify(
+        {"status": "ok", "stale": served_stale(), "units": units, "results": results}
+    )
@@ -1,18 +1,26 @@
-from flask import request, render_template, flash, redirect, url_for
+from flask import current_app, request, render_template, flash, redirect, url_for
 from . import weather_bp
+from .api import weather_json
 from .forms import SearchForm
 from flask_login import login_required, current_user
 from flask_weather import db, limiter
+from flask_weather.caching import served_stale
+from flask_weather.cities import canonical_city, cwa_city_code
+from flask_weather.concurrency import hedge, resolve
 from flask_weather.models import SavedCity
+from flask_weather.upstream import OPENWEATHER
 from flask_weather.utils import (
     get_current_weather,
+    get_cwa_current_weather,
+    hedge_delay,
     format_weather_data,
     get_weather_by_coords,
     get_forecast,
     get_forecast_by_coords,
-    format_forecast_data,
-    prepare_chart_data,
+    get_forecast_view,
     get_air_pollution,
+    get_cached_city_coords,
+    resolve_city_location,
 )
 
 
@@ -20,13 +28,7 @@ def _check_if_city_saved(city_name):
     """檢查城市是否已被當前使用者收藏"""
     if not current_user.is_authenticated:
         return False
-    return (
-        SavedCity.query.filter_by(
-            user_id=current_user.id,
-            city_name=city_name,
-        ).first()
-        is not None
-    )
+    return _get_user_saved_city(city_name) is not None
 
 
 def _render_weather_result(weather_data, forecast, city=None, pollution=None):
@@ -35,18 +37,18 @@ def _render_weather_result(weather_data, forecast, city=None, pollution=None):
         return None
 
     formatted_weather = format_weather_data(weather_data)
-    formatted_forecast = format_forecast_data(forecast)
-    chart_data = prepare_chart_data(formatted_forecast)
+    forecast_view = get_forecast_view(forecast)
     is_saved = _check_if_city_saved(formatted_weather["city"])
 
     return render_template(
         "weather.html",
         city=city,
         data=formatted_weather,
-        forecast=formatted_forecast,
-        chart_data=chart_data,
+        forecast=forecast_view["forecast"],
+        chart_data=forecast_view["chart"],
         is_saved=is_saved,
         pollution=pollution,
+        is_stale=served_stale(),
     )
 
 
@@ -69,6 +71,21 @@ def _validate_coordinates(lat, lon):
         return None
 
 
+def _hedged_current_weather(city, weather_future):
+    """
+    OpenWeather 與 CWA 都有資料的台灣縣市：OpenWeather 超過近期延遲百分位數
+    仍未回應時，改向 CWA 同時取得，先回應者勝出
+    """
+    city_code = cwa_city_code(city)
+    if not city_code or not current_app.config.get("HEDGE_ENABLED", True):
+        return weather_future.result()
+    return hedge(
+        weather_future,
+        lambda: get_cwa_current_weather(city_code),
+        hedge_delay(OPENWEATHER, "weather"),
+    )
+
+
 def _search_city_weather(city):
     """搜尋指定城市的天氣資訊
 
@@ -78,15 +95,21 @@ def _search_city_weather(city):
     Returns:
         Flask response 或 None
     """
-    weather_data = get_current_weather(city)
-    forecast = get_forecast(city)
-
-    # 從天氣資料中取得經緯度，並取得空氣污染資訊
-    pollution = None
-    if weather_data and "coord" in weather_data:
+    # 當前天氣與預報同時發出；空氣品質需要經緯度，
+    # 若先前查過此城市就直接使用快取的經緯度一併發出
+    weather_future = resolve(get_current_weather, city)
+    forecast_future = resolve(get_forecast, city)
+    coords = get_cached_city_coords(city)
+    pollution_future = resolve(get_air_pollution, *coords) if coords else None
+
+    weather_data = _hedged_current_weather(city, weather_future)
+    if pollution_future is None and weather_data and "coord" in weather_data:
         lat = weather_data["coord"]["lat"]
         lon = weather_data["coord"]["lon"]
-        pollution = get_air_pollution(lat, lon)
+        pollution_future = resolve(get_air_pollution, lat, lon)
+
+    forecast = forecast_future.result()
+    pollution = pollution_future.result() if pollution_future else None
 
     result = _render_weather_result(
         weather_data, forecast, city=city, pollution=pollution
@@ -122,16 +145,31 @@ def search():
 
 
 @weather_bp.route("", methods=["GET"])
+@limiter.limit("60 per minute")
 def get_weather():
-    """天氣查詢（查詢參數）"""
-    city = request.args.get("city", "未指定")
-    return {"status": "ok", "city": city, "message": f"{city} 的天氣資訊"}
+    """當前天氣 JSON（查詢參數）"""
+    return weather_json(request.args.get("city"))
 
 
 @weather_bp.route("/<city>", methods=["GET"])
+@limiter.limit("60 per minute")
 def weather_api(city):
-    """天氣查詢（路徑參數）"""
-    return {"status": "ok", "city": city, "message": f"{city} 的天氣資訊"}
+    """當前天氣 JSON（路徑參數）"""
+    return weather_json(city)
+
+
+@weather_bp.route("/<city>/forecast", methods=["GET"])
+@limiter.limit("60 per minute")
+def forecast_api(city):
+    """天氣預報 JSON"""
+    return weather_json(city, "forecast")
+
+
+@weather_bp.route("/<city>/chart", methods=["GET"])
+@limiter.limit("60 per minute")
+def chart_api(city):
+    """預報圖表資料 JSON"""
+    return weather_json(city, "chart")
 
 
 @weather_bp.route("/search/geo")
@@ -150,9 +188,12 @@ def search_by_geo():
         return redirect(url_for("main.index"))
 
     lat, lon = coords
-    weather_data = get_weather_by_coords(lat, lon)
-    forecast = get_forecast_by_coords(lat, lon)
-    pollution = get_air_pollution(lat, lon)
+    weather_future = resolve(get_weather_by_coords, lat, lon)
+    forecast_future = resolve(get_forecast_by_coords, lat, lon)
+    pollution_future = resolve(get_air_pollution, lat, lon)
+    weather_data = weather_future.result()
+    forecast = forecast_future.result()
+    pollution = pollution_future.result()
 
     result = _render_weather_result(weather_data, forecast, pollution=pollution)
     if result:
@@ -163,7 +204,7 @@ def search_by_geo():
 
 
 def _get_user_saved_city(city_name):
-    """取得使用者收藏的特定城市
+    """取得使用者收藏的特定城市（以正規化後的名稱比對，例如「台北」與「臺北市」）
 
     Args:
         city_name: 城市名稱
@@ -171,8 +212,8 @@ def _get_user_saved_city(city_name):
     Returns:
         SavedCity 物件或 None
     """
-    return SavedCity.query.filter_by(
-        user_id=current_user.id, city_name=city_name
+    return current_user.saved_cities.filter_by(
+        city_key=canonical_city(city_name)
     ).first()
 
 
@@ -183,7 +224,9 @@ def save_city(city):
     if _get_user_saved_city(city):
         flash(f"{city} 已經在您的收藏清單中了。", "info")
     else:
-        db.session.add(SavedCity(city_name=city, user=current_user))
+        saved_city = SavedCity(city_name=city, user=current_user)
+        saved_city.set_location(resolve_city_location(city))
+        db.session.add(saved_city)
         db.session.commit()
         flash(f"已將 {city} 加入收藏！", "success")
 
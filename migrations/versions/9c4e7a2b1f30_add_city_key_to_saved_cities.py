@@ -0,0 +1,47 @@
+"""add city key to saved cities
+
+Revision ID: 9c4e7a2b1f30
+Revises: 5b2f8c1d9e47
+Create Date: 2026-10-18 19:40:12.503114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from flask_weather.cities import canonical_city
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7a2b1f30'
+down_revision = '5b2f8c1d9e47'
+branch_labels = None
+depends_on = None
+
+saved_cities = sa.table(
+    'saved_cities',
+    sa.column('id', sa.Integer),
+    sa.column('city_name', sa.String),
+    sa.column('city_key', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('saved_cities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('city_key', sa.String(length=128), nullable=True))
+        batch_op.create_index('ix_saved_cities_user_id_city_key', ['user_id', 'city_key'], unique=False)
+
+    # 以與應用程式相同的 canonical_city 補上既有收藏的正規化名稱
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(saved_cities.c.id, saved_cities.c.city_name))
+    for row_id, city_name in rows.fetchall():
+        connection.execute(
+            saved_cities.update()
+            .where(saved_cities.c.id == row_id)
+            .values(city_key=canonical_city(city_name))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('saved_cities', schema=None) as batch_op:
+        batch_op.drop_index('ix_saved_cities_user_id_city_key')
+        batch_op.drop_column('city_key')
@@ -1,7 +1,10 @@
 import os
+from unittest.mock import MagicMock
+
 import pytest
 from flask_login import login_user
 from flask_weather import create_app, db
+from flask_weather.caching import stale_while_revalidate
 from flask_weather.config import TestingConfig
 from flask_weather.models import User
 
@@ -42,3 +45,23 @@ def client(app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def make_fetcher():
+    """
+    建立以 MagicMock 為上游、經 stale_while_revalidate 包裝的查詢函式
+    :return: factory(side_effect) -> (lookup, upstream)；side_effect 為上游依序
+             回傳的值或拋出的例外（list），或依參數產生結果的函式
+    """
+
+    def factory(side_effect):
+        upstream = MagicMock(side_effect=side_effect)
+
+        @stale_while_revalidate(soft_ttl=60, hard_ttl=600)
+        def lookup(city):
+            return upstream(city)
+
+        return lookup, upstream
+
+    return factory
@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+from flask_weather import limiter
+
+WEATHER = {
+    "name": "Taipei",
+    "sys": {"country": "TW", "sunrise": 1768341600, "sunset": 1768381200},
+    "main": {"temp": 22.8, "feels_like": 23.1, "humidity": 80, "pressure": 1012},
+    "wind": {"speed": 3.5},
+    "weather": [{"description": "多雲", "icon": "03d", "main": "Clouds"}],
+    "dt": 1768361391,
+}
+
+
+def test_batch_deduplicates_and_keeps_order(client):
+    with patch(
+        "flask_weather.utils._fetch_weather_data", return_value=WEATHER
+    ) as fetch:
+        response = client.post(
+            "/api/weather/batch",
+            json={
+                "items": [
+                    "Taipei",
+                    {"city": "taipei "},
+                    {"lat": 25.05, "lon": 121.53},
+                    {"lat": 95, "lon": 0},
+                ],
+                "units": "imperial",
+            },
+        )
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == ["ok", "ok", "ok", "error"]
+    assert results[0]["data"]["temp"] == 73.0
+    assert results[3]["error"] == "經緯度超出範圍"
+    assert fetch.call_count == 2  # 城市與座標各一次
+
+
+def test_batch_reports_failed_items(client):
+    with patch("flask_weather.utils._fetch_weather_data", return_value=None):
+        response = client.post("/api/weather/batch", json={"items": ["Nowhere", 42]})
+
+    results = response.get_json()["results"]
+    assert results[0]["error"] == "無法取得天氣資訊"
+    assert results[1]["error"] == "項目必須是城市名稱或物件"
+
+
+def test_batch_validates_request(app, client):
+    app.config["BATCH_MAX_ITEMS"] = 2
+
+    assert client.post("/api/weather/batch", json={}).status_code == 400
+    assert (
+        client.post("/api/weather/batch", json={"items": ["a", "b", "c"]}).status_code
+        == 400
+    )
+
+
+def test_batch_counts_each_item_against_limit(app, client):
+    limiter.reset()
+    with patch("flask_weather.utils._fetch_weather_data", return_value=WEATHER):
+        for _ in range(3):
+            response = client.post(
+                "/api/weather/batch", json={"items": [f"c{i}" for i in range(20)]}
+            )
+            assert response.status_code == 200
+        response = client.post("/api/weather/batch", json={"items": ["Taipei"]})
+
+    assert response.status_code == 429
+    limiter.reset()
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import pytest
+
+from flask_weather import cache
+from flask_weather.cache_backends import BoundedMemoryCache, cache_group
+
+FORECAST = {"list": [{"dt": i, "main": {"temp": 20.5}} for i in range(40)]}
+
+
+def test_cache_group():
+    assert cache_group("swr:get_forecast:abc") == "get_forecast"
+    assert cache_group("swr:get_forecast:abc:negative") == "get_forecast"
+    assert cache_group("cwa:1a2b:taipei") == "cwa"
+    assert cache_group("plain") == "plain"
+
+
+def test_group_budget_evicts_least_recently_used():
+    backend = BoundedMemoryCache(max_bytes=10**6, budgets={"get_forecast": 3500})
+    for i in range(3):
+        backend.set(f"swr:get_forecast:{i}", FORECAST)
+    backend.get("swr:get_forecast:0")
+    backend.set("swr:get_forecast:3", FORECAST)
+    backend.set("swr:get_air_pollution:0", {"aqi": 2})
+
+    assert backend.get("swr:get_forecast:0") == FORECAST
+    assert backend.get("swr:get_forecast:1") is None
+    report = backend.report()["groups"]
+    assert report["get_forecast"]["bytes"] <= 3500
+    assert report["get_forecast"]["evicted_budget"] >= 1
+    assert report["get_air_pollution"]["entries"] == 1
+
+
+def test_total_budget_evicts_across_groups():
+    backend = BoundedMemoryCache(max_bytes=2000)
+    backend.set("a:1", "x" * 800)
+    backend.set("b:1", "x" * 800)
+    backend.set("c:1", "x" * 800)
+
+    assert backend.get("a:1") is None
+    assert backend.report()["bytes"] <= 2000
+    assert backend.report()["groups"]["a"]["evicted_total"] == 1
+
+
+def test_oversized_values_are_rejected():
+    backend = BoundedMemoryCache(max_bytes=10**6, budgets={"view": 500})
+
+    assert not backend.set("view:forecast:1", FORECAST)
+    assert backend.report()["groups"]["view"]["rejected"] == 1
+
+
+def test_expiry_add_and_inc():
+    backend = BoundedMemoryCache()
+    backend.set("short", 1, timeout=10)
+    assert backend.add("lock", "a")
+    assert not backend.add("lock", "b")
+    assert backend.inc("counter") == 1
+    assert backend.inc("counter", 2) == 3
+
+    with patch("flask_weather.cache_backends.time.time", return_value=4e9):
+        assert backend.get("short") is None
+    assert backend.report()["groups"]["short"]["expired"] == 1
+
+
+def test_app_uses_bounded_cache_and_reports(app, client, runner):
+    with app.test_request_context():
+        cache.set("swr:get_forecast:abc", FORECAST)
+
+    response = client.get("/ops/cache")
+    assert response.json["backend"] == "BoundedMemoryCache"
+    assert response.json["groups"]["get_forecast"]["entries"] == 1
+    assert response.json["groups"]["get_forecast"]["budget"] == (
+        app.config["CACHE_GROUP_BUDGETS"]["get_forecast"]
+    )
+
+    result = runner.invoke(args=["cache-report"])
+    assert result.exit_code == 0
+    assert "get_forecast" in result.output
+
+
+def test_group_budgets_are_read_from_the_environment(monkeypatch):
+    from flask_weather import create_app
+    from flask_weather.config import ConfigError
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setenv("CACHE_GROUP_BUDGETS", '{"get_forecast": 4096}')
+    app = create_app()
+    assert app.config["CACHE_GROUP_BUDGETS"]["get_forecast"] == 4096
+    assert app.config["CACHE_GROUP_BUDGETS"]["cwa"] == 2 * 1024 * 1024
+
+    for value in ('{"get_forecast": "4MB"}', "[4096]", "{get_forecast: 1}"):
+        monkeypatch.setenv("CACHE_GROUP_BUDGETS", value)
+        with pytest.raises(ConfigError, match="CACHE_GROUP_BUDGETS"):
+            create_app()
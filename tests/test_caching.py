@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+from flask_weather.caching import served_stale, stale_while_revalidate
+
+
+def test_fresh_entry_is_served_from_cache(app, make_fetcher):
+    fetch, upstream = make_fetcher([{"temp": 20}])
+
+    with app.test_request_context():
+        assert fetch("Taipei") == {"temp": 20}
+        assert fetch("Taipei") == {"temp": 20}
+        assert not served_stale()
+
+    upstream.assert_called_once_with("Taipei")
+
+
+def test_soft_expired_entry_is_served_then_refreshed(app, make_fetcher):
+    fetch, upstream = make_fetcher([{"temp": 20}, {"temp": 22}])
+
+    with (
+        app.test_request_context(),
+        patch("flask_weather.caching.time.time") as now,
+        patch(
+            "flask_weather.caching.submit_background",
+            side_effect=lambda fn, *args: fn(*args),
+        ) as background,
+    ):
+        now.return_value = 1000
+        fetch("Taipei")
+
+        now.return_value = 1100  # 超過 soft TTL，仍在 hard TTL 內
+        assert fetch("Taipei") == {"temp": 20}
+        assert served_stale()
+        background.assert_called_once()
+
+        assert fetch("Taipei") == {"temp": 22}
+
+
+def test_failed_refresh_keeps_last_good_value(app, make_fetcher):
+    fetch, upstream = make_fetcher([{"temp": 20}, None, RuntimeError("timeout")])
+
+    with app.test_request_context():
+        fetch("Taipei")
+        assert fetch.refresh("Taipei") == {"temp": 20}
+        assert served_stale()
+        assert fetch.refresh("Taipei") == {"temp": 20}
+
+    assert upstream.call_count == 3
+
+
+def test_clear_invalidates_all_entries(app, make_fetcher):
+    fetch, upstream = make_fetcher([{"temp": 20}, {"temp": 18}])
+
+    with app.test_request_context():
+        fetch("Taipei")
+        assert fetch.clear()
+        assert fetch("Taipei") == {"temp": 18}
+
+
+def test_concurrent_misses_are_coalesced(app):
+    import threading
+    import time
+
+    from flask_weather import metrics
+
+    metrics.reset()
+    calls = []
+
+    @stale_while_revalidate(soft_ttl=60, hard_ttl=600)
+    def fetch(city):
+        calls.append(city)
+        time.sleep(0.2)
+        return {"temp": 20}
+
+    results = []
+
+    def worker():
+        with app.app_context():
+            results.append(fetch("Taipei"))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["Taipei"]
+    assert results == [{"temp": 20}] * 5
+    assert metrics.snapshot()["singleflight.coalesced_local"] == 4
+
+
+def test_waits_for_refresh_by_another_worker(app, client, make_fetcher):
+    import threading
+
+    from flask_weather import cache, metrics
+
+    metrics.reset()
+    fetch, upstream = make_fetcher([{"temp": 99}])
+    key = fetch.cache_key("Taipei")
+
+    # 模擬另一個 worker 持有鎖，並在稍後寫入結果
+    cache.add(f"{key}:lock", "other-worker", timeout=15)
+
+    def other_worker():
+        cache.set(key, fetch._entry({"temp": 21}, 0), timeout=600)
+        cache.delete(f"{key}:lock")
+
+    timer = threading.Timer(0.1, other_worker)
+    timer.start()
+    assert fetch("Taipei") == {"temp": 21}
+    timer.join()
+
+    upstream.assert_not_called()
+    counters = client.get("/ops/metrics").json["counters"]
+    assert counters["singleflight.coalesced_remote"] == 1
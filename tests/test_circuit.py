@@ -0,0 +1,112 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from flask_weather.circuit import CLOSED, HALF_OPEN, OPEN
+from flask_weather.upstream import OPENWEATHER, CircuitOpen, get_upstream
+
+
+@pytest.fixture
+def breaker(app):
+    app.config.update(CIRCUIT_MIN_CALLS=4, CIRCUIT_FAILURE_RATE=0.5)
+    breaker = get_upstream().breakers[OPENWEATHER]
+    breaker.reset()
+    return breaker
+
+
+def _response(status_code):
+    return MagicMock(status_code=status_code)
+
+
+def test_breaker_opens_after_failures_and_fails_fast(app, breaker):
+    client = get_upstream()
+    session = client.session(OPENWEATHER)
+
+    with patch.object(
+        session, "get", side_effect=requests.exceptions.ConnectionError
+    ) as mock_get:
+        for _ in range(4):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.get(OPENWEATHER, "https://example.com")
+
+        assert breaker.state() == OPEN
+        with pytest.raises(CircuitOpen):
+            client.get(OPENWEATHER, "https://example.com")
+
+    assert mock_get.call_count == 4
+
+
+def test_client_errors_do_not_trip_breaker(app, breaker):
+    client = get_upstream()
+
+    with patch.object(client.session(OPENWEATHER), "get", return_value=_response(404)):
+        for _ in range(6):
+            client.get(OPENWEATHER, "https://example.com")
+
+    assert breaker.state() == CLOSED
+
+
+def test_half_open_allows_single_probe(app, breaker):
+    with patch("flask_weather.circuit.time.time") as now:
+        now.return_value = 1000
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        assert breaker.state() == OPEN
+
+        now.return_value = 1000 + app.config["CIRCUIT_COOLDOWN"]
+        assert breaker.state() == HALF_OPEN
+        probe = breaker.allow()
+        assert probe
+        assert not breaker.allow()
+
+        breaker.record(True, 0.1, probe)
+        assert breaker.state() == CLOSED
+
+
+def test_in_flight_results_do_not_change_open_breaker(app, breaker):
+    with patch("flask_weather.circuit.time.time") as now:
+        now.return_value = 1000
+        for _ in range(4):
+            breaker.record(False, 0.1)
+
+        now.return_value = 1010
+        breaker.record(True, 0.1)
+        breaker.record(False, 0.1)
+        assert breaker.status() == {"state": OPEN, "opened_at": 1000}
+
+        now.return_value = 1000 + app.config["CIRCUIT_COOLDOWN"]
+        probe = breaker.allow()
+        breaker.record(True, 0.1)
+        assert breaker.state() == HALF_OPEN
+
+        breaker.record(False, 0.1, probe)
+        assert breaker.state() == OPEN
+
+
+def test_open_breaker_serves_stale_data(app, breaker):
+    from flask_weather.utils import get_current_weather
+
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"name": "Taipei"}
+    session = get_upstream().session(OPENWEATHER)
+
+    with app.test_request_context():
+        with patch.object(session, "get", return_value=response):
+            get_current_weather("Taipei")
+        for _ in range(4):
+            breaker.record(False, 0.1)
+
+        with patch.object(session, "get") as mock_get:
+            assert get_current_weather.refresh("Taipei") == {"name": "Taipei"}
+        mock_get.assert_not_called()
+
+
+def test_health_reports_breaker_state(app, client, breaker):
+    for _ in range(4):
+        breaker.record(False, 0.1)
+
+    data = client.get("/ops/health").get_json()
+    assert data["status"] == "degraded"
+    assert data["upstreams"]["openweather"]["state"] == OPEN
+    assert data["upstreams"]["cwa"]["state"] == CLOSED
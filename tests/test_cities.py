@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from flask_weather.cities import canonical_city, cwa_city_code, normalize_city_name
+
+
+def test_normalize_city_name():
+    assert normalize_city_name("  Ｔａｉｐｅｉ  ") == "taipei"
+    assert normalize_city_name("New   York") == "new york"
+    assert normalize_city_name("台中") == "臺中"
+
+
+def test_alias_index_maps_taiwan_counties():
+    for name in ["Taipei", "taipei ", "臺北", "台北市", "TAIPEI CITY"]:
+        assert canonical_city(name) == "Taipei"
+        assert cwa_city_code(name) == "taipei"
+
+    assert cwa_city_code("馬祖") == "lienchiang"
+    assert cwa_city_code("Tokyo") is None
+    assert canonical_city("Tokyo ") == "tokyo"
+
+
+def test_ambiguous_short_names_resolve_to_the_city():
+    for names, code in [
+        (["新竹", "Hsinchu", "新竹市", "Hsinchu City"], "hsinchu"),
+        (["嘉義", "Chiayi", "嘉義市", "Chiayi City"], "chiayi"),
+    ]:
+        assert {cwa_city_code(name) for name in names} == {code}
+
+    assert cwa_city_code("新竹縣") == "hsinchucounty"
+    assert cwa_city_code("Chiayi County") == "chiayicounty"
+    assert canonical_city("Taichung City") == "Taichung"
+    assert canonical_city("kaohsiung city") == "Kaohsiung"
+
+
+def test_equivalent_queries_share_one_upstream_call(app):
+    from flask_weather.utils import get_current_weather
+
+    with patch(
+        "flask_weather.utils._fetch_weather_data", return_value={"name": "Taipei"}
+    ) as fetch:
+        for name in ["Taipei", "taipei ", "臺北", "台北市"]:
+            assert get_current_weather(name) == {"name": "Taipei"}
+
+    fetch.assert_called_once()
+    assert fetch.call_args.args[0]["q"] == "Taipei"
+
+
+def test_saved_city_lookup_uses_canonical_name(client):
+    from flask_weather.models import SavedCity
+
+    with patch("flask_weather.weather.routes.resolve_city_location", return_value=None):
+        client.get("/weather/save/台北")
+        client.get("/weather/save/Taipei")
+        client.get("/weather/unsave/臺北市")
+
+    assert SavedCity.query.count() == 0
+
+
+def test_taiwan_route_accepts_aliases(client):
+    with patch(
+        "flask_weather.utils._read_cwa_cities",
+        return_value=(None, {"taichung": {"city": "臺中市"}}),
+    ):
+        response = client.get("/taiwan/weather/台中")
+
+    assert response.json["data"]["city"] == "臺中市"
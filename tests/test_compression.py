@@ -0,0 +1,54 @@
+import gzip
+from unittest.mock import patch
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from flask_weather import metrics
+from flask_weather.compression import choose_encoding
+
+
+def test_large_json_is_gzipped_with_weak_etag(client):
+    response = client.get("/taiwan/cities", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"].startswith('W/"')
+    assert b'"success":true' in gzip.decompress(response.data).replace(b" ", b"")
+
+    again = client.get(
+        "/taiwan/cities",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    assert again.headers["ETag"] == response.headers["ETag"]
+
+
+def test_compressed_bytes_are_reused_by_etag(client):
+    metrics.reset()
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/taiwan/cities", headers=headers)
+    with patch("flask_weather.compression.gzip.compress") as compress:
+        second = client.get("/taiwan/cities", headers=headers)
+
+    compress.assert_not_called()
+    assert second.data == first.data
+    assert metrics.snapshot()["compression.gzip.cache_hit"] == 1
+
+
+def test_small_or_unaccepted_responses_are_not_compressed(client):
+    small = client.get("/api/weather", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/taiwan/cities")
+
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"].startswith('"')
+
+
+def test_brotli_preferred_when_available():
+    accept = parse_accept_header("gzip, br", Accept)
+    with patch("flask_weather.compression.brotli", object()):
+        assert choose_encoding(accept) == "br"
+    with patch("flask_weather.compression.brotli", None):
+        assert choose_encoding(accept) == "gzip"
@@ -0,0 +1,103 @@
+import time
+from unittest.mock import patch
+
+from flask_weather.concurrency import resolve
+
+WEATHER = {
+    "coord": {"lon": 121.5, "lat": 25.0},
+    "weather": [{"main": "Clear", "description": "晴", "icon": "01d"}],
+    "main": {"temp": 25.0, "feels_like": 25.0, "pressure": 1012, "humidity": 60},
+    "wind": {"speed": 1.0},
+    "dt": 1768361391,
+    "sys": {"country": "TW", "sunrise": 1768344142, "sunset": 1768382967},
+    "name": "Taipei",
+}
+FORECAST = {"list": []}
+
+
+def test_resolve_cache_hit_skips_thread_pool(app):
+    from flask_weather.utils import get_air_pollution
+
+    with app.test_request_context():
+        with patch(
+            "flask_weather.utils._fetch_weather_data", return_value={"list": []}
+        ):
+            get_air_pollution(25.0, 121.5)
+
+        with patch("flask_weather.concurrency.submit") as mock_submit:
+            future = resolve(get_air_pollution, 25.0, 121.5)
+
+        assert future.result() == {"list": []}
+        mock_submit.assert_not_called()
+
+
+def test_search_fetches_run_concurrently(client):
+    def slow(value):
+        def fetch(*args):
+            time.sleep(0.2)
+            return value
+
+        return fetch
+
+    with (
+        patch("flask_weather.weather.routes.get_current_weather", slow(WEATHER)),
+        patch("flask_weather.weather.routes.get_forecast", slow(FORECAST)),
+        patch("flask_weather.weather.routes.get_air_pollution", slow(None)),
+        patch(
+            "flask_weather.weather.routes.get_cached_city_coords",
+            return_value=(25.0, 121.5),
+        ),
+    ):
+        start = time.perf_counter()
+        response = client.get("/weather/search?city=Taipei")
+        elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert elapsed < 0.5  # 三個 0.2 秒的呼叫並行，而非累加為 0.6 秒
+
+
+def test_get_current_weather_many_fetches_only_misses(app):
+    from flask_weather.utils import get_current_weather, get_current_weather_many
+
+    def fetch(params, endpoint="weather", timeout=None):
+        return None if params["q"] == "nowhere" else {**WEATHER, "name": params["q"]}
+
+    with app.test_request_context():
+        with patch("flask_weather.utils._fetch_weather_data", side_effect=fetch):
+            get_current_weather("Taipei")
+
+        with patch(
+            "flask_weather.utils._fetch_weather_data", side_effect=fetch
+        ) as mock_fetch:
+            results = get_current_weather_many(
+                ["Tainan", "Taipei", "Nowhere", "Tainan"]
+            )
+
+    assert [r and r["name"] for r in results] == ["Tainan", "Taipei", None, "Tainan"]
+    fetched = sorted(call.args[0]["q"] for call in mock_fetch.call_args_list)
+    assert fetched == ["Tainan", "nowhere"]
+
+
+def test_dashboard_degrades_per_city(client):
+    from flask_weather import db
+    from flask_weather.models import SavedCity, User
+
+    user = User.query.filter_by(username="testuser").first()
+    db.session.add_all(
+        [
+            SavedCity(city_name="Taipei", user=user),
+            SavedCity(city_name="Nowhere", user=user),
+        ]
+    )
+    db.session.commit()
+
+    with patch(
+        "flask_weather.main.routes.get_current_weather_many",
+        return_value=[WEATHER, None],
+    ):
+        response = client.get("/dashboard")
+
+    assert response.status_code == 200
+    assert "25.0°" in response.text
+    assert "Nowhere" in response.text
+    assert "暫時無法取得天氣資料" in response.text
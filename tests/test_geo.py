@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+from flask_weather.geo import decode_center, encode
+
+
+def test_geohash_encode_and_decode():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    lat, lon = decode_center("wsqqqm")
+    assert encode(lat, lon, 6) == "wsqqqm"
+
+
+def test_nearby_coordinates_share_cache_entry(app, client):
+    from flask_weather import metrics
+    from flask_weather.utils import get_weather_by_coords
+
+    metrics.reset()
+    with patch(
+        "flask_weather.utils._fetch_weather_data", return_value={"name": "Taipei"}
+    ) as fetch:
+        get_weather_by_coords(25.03301, 121.56541)
+        get_weather_by_coords(25.03352, 121.56602)  # 約 80 公尺外
+        get_weather_by_coords(22.62742, 120.30144)  # 高雄
+
+    assert fetch.call_count == 2
+    snapped = fetch.call_args_list[0].args[0]
+    assert encode(snapped["lat"], snapped["lon"], 6) == "wsqqqm"
+
+    rates = client.get("/ops/metrics").json["cache"]["get_weather_by_coords"]
+    assert (rates["hit"], rates["miss"]) == (1, 2)
+    assert rates["hit_rate"] == 0.3333
+
+
+def test_snapping_can_be_disabled(app):
+    from flask_weather.utils import get_air_pollution
+
+    app.config["COORD_CACHE_PRECISION"] = 0
+    with patch(
+        "flask_weather.utils._fetch_weather_data", return_value={"list": []}
+    ) as fetch:
+        get_air_pollution(25.03301, 121.56541)
+
+    assert fetch.call_args.args[0]["lat"] == 25.03301
@@ -0,0 +1,106 @@
+import time
+from unittest.mock import patch
+
+from flask_weather import metrics
+from flask_weather.concurrency import hedge, submit
+from flask_weather.latency import LatencyTracker
+from flask_weather.utils import _cwa_to_weather_data, format_weather_data
+
+CWA_TAIPEI = {
+    "city": "臺北市",
+    "cityCode": "taipei",
+    "updateTime": "",
+    "forecasts": [
+        {
+            "startTime": "2026-01-01 18:00:00",
+            "endTime": "2026-01-02 06:00:00",
+            "weather": "短暫陣雨",
+            "rain": "60%",
+            "minTemp": "18°C",
+            "maxTemp": "22°C",
+            "comfort": "稍有寒意",
+        }
+    ],
+}
+
+
+def _slow(value, seconds):
+    def fetch():
+        time.sleep(seconds)
+        return value
+
+    return fetch
+
+
+def test_fast_primary_is_not_hedged(app):
+    metrics.reset()
+
+    with app.test_request_context():
+        primary = submit(_slow({"name": "Taipei"}, 0))
+        fallback = _slow({"name": "臺北市"}, 0)
+        assert hedge(primary, fallback, 0.5) == {"name": "Taipei"}
+
+    assert "hedge.sent" not in metrics.snapshot()
+
+
+def test_slow_primary_is_hedged_and_fallback_wins(app):
+    metrics.reset()
+
+    with app.test_request_context():
+        primary = submit(_slow({"name": "Taipei"}, 0.5))
+        start = time.perf_counter()
+        assert hedge(primary, _slow({"name": "臺北市"}, 0), 0.05) == {"name": "臺北市"}
+        assert time.perf_counter() - start < 0.4
+
+    counters = metrics.snapshot()
+    assert counters["hedge.sent"] == 1
+    assert counters["hedge.won"] == 1
+
+
+def test_failed_primary_falls_back_immediately(app):
+    with app.test_request_context():
+        primary = submit(_slow(None, 0))
+        assert hedge(primary, _slow({"name": "臺北市"}, 0), 5) == {"name": "臺北市"}
+
+
+def test_cwa_forecast_maps_to_weather_format(app):
+    with app.test_request_context():
+        data = format_weather_data(_cwa_to_weather_data(CWA_TAIPEI), units="metric")
+
+    assert data["city"] == "臺北市"
+    assert data["temp"] == 20.0
+    assert data["condition"] == "Rain"
+    assert data["icon"] == "10d"
+    assert data["humidity"] is None
+    assert data["source"] == "cwa"
+
+
+def test_search_hedges_taiwan_city_to_cwa(client, app):
+    app.config.update(HEDGE_DEFAULT_DELAY=0.05)
+
+    def slow_weather(city):
+        time.sleep(0.5)
+        return None
+
+    with (
+        patch("flask_weather.weather.routes.get_current_weather", slow_weather),
+        patch("flask_weather.weather.routes.get_forecast", return_value={"list": []}),
+        patch(
+            "flask_weather.weather.routes.get_cwa_current_weather",
+            return_value=_cwa_to_weather_data(CWA_TAIPEI),
+        ),
+    ):
+        response = client.get("/weather/search?city=台北")
+
+    assert response.status_code == 200
+    assert "中央氣象署".encode() in response.data
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker()
+    for ms in range(1, 101):
+        tracker.record("openweather", ms / 1000, endpoint="weather")
+
+    assert 0.075 < tracker.percentile("openweather", 95) <= 0.1
+    assert tracker.percentile("openweather", 95, endpoint="forecast") is None
+    assert tracker.percentile("cwa", 95) is None
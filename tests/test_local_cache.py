@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+from flask_weather import cache, metrics
+from flask_weather.caching import hit_rates, tier_hit_rates
+from flask_weather.local_cache import InvalidationBus, LocalCache, init_local_cache
+
+
+def _enable_l1(app, size=16):
+    app.config.update(L1_CACHE_SIZE=size, L1_CACHE_TTL=5)
+    init_local_cache(app)
+    return app.extensions["local_cache"]
+
+
+def test_lru_evicts_oldest_and_expires():
+    local = LocalCache(maxsize=2, ttl=5)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+
+    assert local.get("b") is None
+    assert local.get("a") == 1
+    with patch("flask_weather.local_cache.time.monotonic", return_value=1e12):
+        assert local.get("c") is None
+
+
+def test_l1_hit_skips_shared_cache(app, make_fetcher):
+    metrics.reset()
+    _enable_l1(app)
+    lookup, upstream = make_fetcher(lambda city: {"name": city})
+
+    with app.test_request_context():
+        assert lookup("Taipei") == {"name": "Taipei"}
+        with patch.object(cache, "get_many") as get_many:
+            assert lookup("Taipei") == {"name": "Taipei"}
+            assert lookup.many([("Taipei",)]) == [{"name": "Taipei"}]
+        get_many.assert_not_called()
+
+    upstream.assert_called_once_with("Taipei")
+    tiers = hit_rates(metrics.snapshot())["lookup"]["tiers"]
+    assert tiers["l1"] == {"hit": 2, "miss": 1, "hit_rate": 0.6667}
+    assert tiers["l2"] == {"hit": 0, "miss": 1, "hit_rate": 0.0}
+
+
+def test_l2_hit_fills_l1(app, make_fetcher):
+    metrics.reset()
+    local = _enable_l1(app)
+    lookup, upstream = make_fetcher(lambda city: {"name": city})
+
+    with app.test_request_context():
+        lookup("Taipei")
+        local.clear()
+        lookup("Taipei")
+        lookup("Taipei")
+
+    upstream.assert_called_once()
+    assert tier_hit_rates(metrics.snapshot())["l2"]["hit"] == 1
+    assert tier_hit_rates(metrics.snapshot())["l1"]["hit"] == 1
+
+
+def test_clear_invalidates_l1_and_broadcasts(app, make_fetcher):
+    local = _enable_l1(app)
+    local.bus = MagicMock()
+    lookup, upstream = make_fetcher(lambda city: {"name": city})
+
+    with app.test_request_context():
+        lookup("Taipei")
+        key = lookup.cache_key("Taipei")
+        local.set("swr:other:1", {"value": 1})
+        assert lookup.clear()
+        assert local.get(key) is None
+        assert local.get("swr:other:1") is not None
+        lookup("Taipei")
+
+    local.bus.publish.assert_called_once_with("swr:lookup:")
+    assert upstream.call_count == 2
+
+
+def test_invalidation_message_clears_matching_keys():
+    local = LocalCache(maxsize=8, ttl=5)
+    bus = InvalidationBus(local, "redis://localhost:6379/0", "l1")
+    local.set("swr:get_forecast:1", 1)
+    local.set("swr:get_current_weather:1", 2)
+
+    bus.handle({"type": "subscribe", "data": 1})
+    bus.handle({"type": "message", "data": b"swr:get_forecast:"})
+
+    assert local.get("swr:get_forecast:1") is None
+    assert local.get("swr:get_current_weather:1") == 2
+
+
+def test_disabled_when_size_is_zero(app):
+    assert app.extensions["local_cache"] is None
+
+
+def test_default_size_requires_invalidation_bus(app):
+    app.config.update(L1_CACHE_SIZE=None, L1_CACHE_TTL=5, CACHE_REDIS_URL=None)
+    init_local_cache(app)
+    assert app.extensions["local_cache"] is None
+
+    app.config["CACHE_REDIS_URL"] = "redis://localhost:6379/0"
+    init_local_cache(app)
+    local = app.extensions["local_cache"]
+    assert local.maxsize == 256
+    assert isinstance(local.bus, InvalidationBus)
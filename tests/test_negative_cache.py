@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from flask_weather import metrics
+from flask_weather.caching import hit_rates
+from flask_weather.upstream import (
+    OPENWEATHER,
+    UpstreamNotFound,
+    UpstreamUnavailable,
+    get_upstream,
+)
+from flask_weather.utils import _fetch_weather_data
+
+
+def test_not_found_is_cached_separately(app, make_fetcher):
+    metrics.reset()
+    lookup, upstream = make_fetcher([UpstreamNotFound("404", 404)])
+
+    with app.test_request_context():
+        assert lookup("Nowhere") is None
+        assert lookup("Nowhere") is None
+        assert lookup.many([("Nowhere",)]) == [None]
+
+    upstream.assert_called_once_with("Nowhere")
+    rates = hit_rates(metrics.snapshot())["lookup"]
+    assert rates["negative_hit"] == 2
+    assert rates["miss"] == 1
+
+
+def test_upstream_errors_use_shorter_ttl(app, make_fetcher):
+    lookup, _ = make_fetcher([UpstreamUnavailable("503", 503), UpstreamNotFound("404")])
+
+    with (
+        app.test_request_context(),
+        patch("flask_weather.caching.cache.set") as cache_set,
+    ):
+        lookup("Taipei")
+        lookup("Tainan")
+
+    timeouts = [call.kwargs["timeout"] for call in cache_set.call_args_list]
+    assert timeouts == [
+        app.config["NEGATIVE_CACHE_ERROR_TTL"],
+        app.config["NEGATIVE_CACHE_NOT_FOUND_TTL"],
+    ]
+
+
+def test_success_clears_negative_entry(app, make_fetcher):
+    lookup, upstream = make_fetcher([UpstreamUnavailable("timeout"), {"temp": 20}])
+
+    with app.test_request_context():
+        assert lookup("Taipei") is None
+        assert lookup.refresh("Taipei") == {"temp": 20}
+        assert lookup("Taipei") == {"temp": 20}
+
+    assert upstream.call_count == 2
+
+
+def test_fetch_helper_raises_typed_errors(app):
+    response = MagicMock(status_code=404)
+    response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+        response=response
+    )
+    session = get_upstream().session(OPENWEATHER)
+
+    with (
+        app.test_request_context(),
+        patch.object(session, "get", return_value=response),
+        pytest.raises(UpstreamNotFound),
+    ):
+        _fetch_weather_data({"q": "Nowhere"})
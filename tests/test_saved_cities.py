@@ -0,0 +1,187 @@
+import time
+from unittest.mock import patch
+
+from flask_weather import db
+from flask_weather.models import SavedCity, User
+
+TAIPEI = {"id": 1668341, "name": "Taipei", "coord": {"lat": 25.05, "lon": 121.53}}
+TAICHUNG = {"id": 1668399, "name": "Taichung", "coord": {"lat": 24.15, "lon": 120.68}}
+
+
+def test_save_city_stores_provider_id(client):
+    with patch(
+        "flask_weather.weather.routes.resolve_city_location",
+        return_value={"id": 1668341, "lat": 25.05, "lon": 121.53},
+    ):
+        client.get("/weather/save/Taipei")
+
+    saved = SavedCity.query.filter_by(city_name="Taipei").one()
+    assert (saved.owm_city_id, saved.lat, saved.lon) == (1668341, 25.05, 121.53)
+    assert saved.city_key == "Taipei"
+
+
+def test_saved_city_is_found_by_city_key(client):
+    with patch("flask_weather.weather.routes.resolve_city_location", return_value=None):
+        client.get("/weather/save/台北市")
+        client.get("/weather/save/ 臺北 ")
+
+    saved = SavedCity.query.one()
+    assert (saved.city_name, saved.city_key) == ("台北市", "Taipei")
+
+
+def test_backfill_command(app, runner):
+    user = User.query.filter_by(username="testuser").first()
+    db.session.add_all(
+        [
+            SavedCity(city_name="Taipei", user=user),
+            SavedCity(city_name="Taipei", user=user),
+            SavedCity(city_name="Atlantis", user=user),
+        ]
+    )
+    db.session.commit()
+
+    def fetch(params, endpoint="weather", timeout=None):
+        return TAIPEI if params["q"] == "Taipei" else None
+
+    with patch(
+        "flask_weather.utils._fetch_weather_data", side_effect=fetch
+    ) as mock_fetch:
+        result = runner.invoke(args=["backfill-saved-cities"])
+
+    assert "已補齊 2/3" in result.output
+    assert mock_fetch.call_count == 2  # 同名城市只解析一次
+    ids = [saved.owm_city_id for saved in SavedCity.query.order_by(SavedCity.id)]
+    assert ids == [1668341, 1668341, None]
+
+
+def test_backfill_command_refreshes_stale_city_keys(app, runner):
+    user = User.query.filter_by(username="testuser").first()
+    saved = SavedCity(city_name="新竹", owm_city_id=1675151, user=user)
+    db.session.add(saved)
+    db.session.commit()
+    saved.city_key = "新竹"  # 別名表更新前寫入的舊值
+    db.session.commit()
+
+    result = runner.invoke(args=["backfill-saved-cities"])
+
+    assert "已更新 1 筆收藏城市的正規化名稱" in result.output
+    assert SavedCity.query.one().city_key == "Hsinchu"
+
+
+def test_group_fetch_uses_one_request_per_page(app):
+    from flask_weather.utils import get_current_weather_group
+
+    with app.test_request_context():
+        with patch(
+            "flask_weather.utils._fetch_weather_data",
+            return_value={"cnt": 2, "list": [TAICHUNG, TAIPEI]},
+        ) as mock_fetch:
+            results = get_current_weather_group([1668341, 1668399, 1668341])
+            cached = get_current_weather_group([1668399])
+
+    assert [r["name"] for r in results] == ["Taipei", "Taichung", "Taipei"]
+    assert cached == [TAICHUNG]
+    mock_fetch.assert_called_once()
+    assert mock_fetch.call_args.kwargs["endpoint"] == "group"
+    assert mock_fetch.call_args.args[0]["id"] == "1668341,1668399"
+
+
+def test_group_fetch_serves_stale_data_when_upstream_fails(app):
+    from flask_weather.upstream import UpstreamUnavailable
+    from flask_weather.utils import clear_weather_cache, get_current_weather_group
+
+    with app.test_request_context():
+        with patch(
+            "flask_weather.utils._fetch_weather_data",
+            return_value={"cnt": 1, "list": [TAIPEI]},
+        ):
+            get_current_weather_group([1668341])
+
+        with (
+            patch("flask_weather.caching.time.time", return_value=time.time() + 700),
+            patch(
+                "flask_weather.caching.submit_background",
+                side_effect=lambda fn, *args: fn(*args),
+            ) as background,
+            patch(
+                "flask_weather.utils._fetch_weather_data",
+                side_effect=UpstreamUnavailable("timeout"),
+            ),
+        ):
+            assert get_current_weather_group([1668341, 1668399]) == [TAIPEI, None]
+            background.assert_called_once()
+            assert get_current_weather_group([1668399]) == [None]  # 負面快取
+
+        assert clear_weather_cache()
+        with patch(
+            "flask_weather.utils._fetch_weather_data",
+            return_value={"cnt": 1, "list": []},
+        ) as mock_fetch:
+            assert get_current_weather_group([1668341]) == [None]
+        mock_fetch.assert_called_once()
+
+
+def test_stale_group_is_refreshed_with_one_request(app):
+    from flask_weather.utils import get_current_weather_group
+
+    group = {"cnt": 2, "list": [TAIPEI, TAICHUNG]}
+    with app.test_request_context():
+        with patch("flask_weather.utils._fetch_weather_data", return_value=group):
+            get_current_weather_group([1668341, 1668399])
+
+        with (
+            patch("flask_weather.caching.time.time", return_value=time.time() + 700),
+            patch(
+                "flask_weather.caching.submit_background",
+                side_effect=lambda fn, *args: fn(*args),
+            ) as background,
+            patch(
+                "flask_weather.utils._fetch_weather_data", return_value=group
+            ) as mock_fetch,
+        ):
+            assert get_current_weather_group([1668341, 1668399]) == [TAIPEI, TAICHUNG]
+
+    background.assert_called_once()
+    mock_fetch.assert_called_once()
+    assert mock_fetch.call_args.kwargs["endpoint"] == "group"
+
+
+def test_concurrent_group_misses_share_one_request(app):
+    import threading
+
+    from flask_weather.utils import get_current_weather_group
+
+    def fetch(params, endpoint="weather", timeout=None):
+        time.sleep(0.2)
+        return {"cnt": 2, "list": [TAIPEI, TAICHUNG]}
+
+    results = []
+
+    def worker():
+        with app.app_context():
+            results.append(get_current_weather_group([1668341, 1668399]))
+
+    with patch(
+        "flask_weather.utils._fetch_weather_data", side_effect=fetch
+    ) as mock_fetch:
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    mock_fetch.assert_called_once()
+    assert results == [[TAIPEI, TAICHUNG]] * 4
+
+
+def test_resolving_a_city_fills_the_weather_cache(app):
+    from flask_weather.utils import get_current_weather, resolve_city_location
+
+    with patch(
+        "flask_weather.utils._fetch_weather_data", return_value=TAIPEI
+    ) as mock_fetch:
+        location = resolve_city_location("台北")
+        assert get_current_weather("Taipei") == TAIPEI
+
+    assert location == {"id": 1668341, "lat": 25.05, "lon": 121.53}
+    mock_fetch.assert_called_once()
@@ -0,0 +1,105 @@
+import pickle
+
+import pytest
+
+from flask_weather.cache_backends import CompactRedisCache
+from flask_weather.serialization import FORMAT_VERSION, CacheSerializer
+
+FORECAST = {
+    "city": {"name": "臺北市", "coord": {"lat": 25.05, "lon": 121.53}},
+    "list": [
+        {"dt": 1768370400 + i * 10800, "main": {"temp": 20.5 + i}, "pop": 0.4}
+        for i in range(40)
+    ],
+    "view_key": "0123456789ab",
+}
+
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack", "pickle"])
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_round_trip(fmt, compression):
+    if fmt == "msgpack":
+        pytest.importorskip("msgpack")
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    serializer = CacheSerializer(fmt, compression, min_size=256)
+
+    for value in (FORECAST, "晴", 2.5, True, None, [1, "a"], b"\x1f\x8b"):
+        assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_compact_format_is_smaller_than_pickle():
+    serializer = CacheSerializer("json", "zlib", min_size=256)
+
+    dumped = serializer.dumps(FORECAST)
+
+    assert dumped[:2] == bytes((FORMAT_VERSION, 0x11))  # zlib + JSON
+    assert len(dumped) < len(pickle.dumps(FORECAST)) / 3
+
+
+def test_small_values_are_not_compressed():
+    serializer = CacheSerializer("json", "zlib", min_size=1024)
+
+    assert serializer.dumps({"temp": 20})[:2] == bytes((FORMAT_VERSION, 0x01))
+
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack"])
+def test_uncompressed_values_use_pickle_when_smaller(fmt):
+    if fmt == "msgpack":
+        pytest.importorskip("msgpack")
+    serializer = CacheSerializer(fmt, "none")
+
+    dumped = serializer.dumps(FORECAST)
+
+    assert dumped[1] == 0x03
+    assert len(dumped) == len(pickle.dumps(FORECAST, pickle.HIGHEST_PROTOCOL)) + 2
+    assert serializer.loads(dumped) == FORECAST
+    assert serializer.dumps({"temp": 20})[1] != 0x03
+
+
+def test_values_json_cannot_represent_fall_back_to_pickle():
+    serializer = CacheSerializer("json", "none")
+
+    for value in ((25.05, 121.53), {1: "a"}, {"coords": (1, 2)}):
+        dumped = serializer.dumps(value)
+        assert dumped[1] == 0x03
+        assert serializer.loads(dumped) == value
+
+
+def test_integers_stay_compatible_with_incr():
+    serializer = CacheSerializer("json", "none")
+
+    assert serializer.dumps(3) == b"3"
+    assert serializer.loads(b"-4") == -4
+
+
+def test_reads_legacy_pickle_and_rejects_unknown_versions():
+    serializer = CacheSerializer("json", "none")
+
+    assert serializer.loads(b"!" + pickle.dumps({"temp": 20})) == {"temp": 20}
+    assert serializer.loads(bytes((FORMAT_VERSION + 1, 0x01)) + b"{}") is None
+    assert serializer.loads(bytes((FORMAT_VERSION, 0x11)) + b"corrupt") is None
+    assert serializer.loads(None) is None
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        CacheSerializer("yaml")
+    with pytest.raises(ValueError):
+        CacheSerializer("json", "lz4")
+
+
+def test_redis_backend_uses_serializer_and_versioned_prefix():
+    config = {
+        "CACHE_KEY_PREFIX": "flask_cache_",
+        "CACHE_REDIS_URL": "redis://localhost:6379/0",
+        "CACHE_SERIALIZER": "json",
+        "CACHE_COMPRESSION": "zlib",
+        "CACHE_COMPRESSION_MIN_SIZE": 512,
+    }
+
+    backend = CompactRedisCache.factory(None, config, [], {})
+
+    assert backend.key_prefix == f"flask_cache_v{FORMAT_VERSION}:"
+    assert backend.serializer.fmt == "json"
+    assert backend.serializer.min_size == 512
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from unittest.mock import patch
+
+import pytest
+
+from flask_weather.cache_backends import SHM_WAYS, SharedMemoryCache
+
+
+@pytest.fixture
+def shm(tmp_path):
+    return SharedMemoryCache(path=str(tmp_path / "cache"), slots=64, slot_size=512)
+
+
+def test_set_get_delete(shm):
+    forecast = {"city": {"name": "臺北市"}, "list": [{"dt": 1, "pop": 0.4}]}
+
+    assert shm.set("swr:get_forecast:1", forecast)
+    assert shm.get("swr:get_forecast:1") == forecast
+    assert shm.has("swr:get_forecast:1")
+    assert shm.delete("swr:get_forecast:1")
+    assert shm.get("swr:get_forecast:1") is None
+
+
+def test_entries_expire(shm):
+    shm.set("short", "value", timeout=10)
+    shm.set("forever", "value", timeout=0)
+
+    with patch("flask_weather.cache_backends.time.time", return_value=4e9):
+        assert shm.get("short") is None
+        assert shm.get("forever") == "value"
+        assert shm.add("short", "again")
+
+
+def test_add_only_when_missing(shm):
+    assert shm.add("lock", "a")
+    assert not shm.add("lock", "b")
+    assert shm.get("lock") == "a"
+
+
+def test_values_larger_than_a_slot_are_skipped(shm):
+    assert not shm.set("big", os.urandom(1024))
+    assert shm.get("big") is None
+
+
+def test_workers_share_the_same_file(tmp_path):
+    first = SharedMemoryCache(path=str(tmp_path / "cache"), slots=64, slot_size=512)
+    second = SharedMemoryCache(path=str(tmp_path / "cache"), slots=64, slot_size=512)
+
+    first.set("swr:get_current_weather:1", {"name": "Taipei"})
+
+    assert second.get("swr:get_current_weather:1") == {"name": "Taipei"}
+    assert first.path == second.path
+
+
+def test_clock_keeps_recently_read_entries(tmp_path):
+    shm = SharedMemoryCache(path=str(tmp_path / "cache"), slots=SHM_WAYS)
+    for i in range(SHM_WAYS):
+        shm.set(f"k{i}", i)
+    # 第一次淘汰會清除所有參考位元，之後只有再被讀取的項目能留下
+    shm.set("new0", 0)
+    shm.get("k3")
+    for i in range(1, SHM_WAYS - 1):
+        shm.set(f"new{i}", i)
+
+    assert shm.get("k3") == 3
+    assert shm.report()["entries"] == SHM_WAYS
+
+
+def _increment(path, times):
+    shm = SharedMemoryCache(path=path, slots=64, slot_size=512)
+    for _ in range(times):
+        shm.inc("counter")
+
+
+def test_inc_is_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "cache")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_increment, args=(path, 200)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    shm = SharedMemoryCache(path=path, slots=64, slot_size=512)
+    assert shm.get("counter") == 800
+    assert shm.dec("counter", 5) == 795
+
+
+def test_clear(shm):
+    shm.set("a", 1)
+    shm.set("b", {"x": 1})
+
+    assert shm.clear()
+    assert shm.get("a") is None
+    assert shm.report()["entries"] == 0
+
+
+def test_factory_reads_config(tmp_path):
+    config = {
+        "CACHE_SHM_PATH": str(tmp_path / "cache"),
+        "CACHE_SHM_SLOTS": 128,
+        "CACHE_SHM_SLOT_SIZE": 1024,
+        "CACHE_SERIALIZER": "json",
+    }
+
+    shm = SharedMemoryCache.factory(None, config, [], {"default_timeout": 60})
+
+    assert shm.report()["slots"] == 128
+    assert shm.serializer.fmt == "json"
+    assert shm.default_timeout == 60
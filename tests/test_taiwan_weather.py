@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+
+def _location(name, weather="晴時多雲", min_temp="20", max_temp="26"):
+    def element(element_name, value):
+        return {
+            "elementName": element_name,
+            "time": [
+                {
+                    "startTime": "2026-10-18 18:00:00",
+                    "endTime": "2026-10-19 06:00:00",
+                    "parameter": {"parameterName": value},
+                }
+            ],
+        }
+
+    return {
+        "locationName": name,
+        "weatherElement": [
+            element("Wx", weather),
+            element("PoP", "10"),
+            element("MinT", min_temp),
+            element("CI", "舒適"),
+            element("MaxT", max_temp),
+        ],
+    }
+
+
+def _cwa_response(*locations):
+    return {
+        "success": "true",
+        "records": {
+            "datasetDescription": "三十六小時天氣預報",
+            "location": list(locations),
+        },
+    }
+
+
+BULK = _cwa_response(_location("臺北市"), _location("高雄市", max_temp="30"))
+
+
+def test_bulk_snapshot_serves_every_city_from_one_fetch(app):
+    from flask_weather.utils import get_cwa_weather
+
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=BULK) as mock_fetch:
+        taipei = get_cwa_weather("taipei")
+        kaohsiung = get_cwa_weather("Kaohsiung")
+        missing = get_cwa_weather("penghu")
+
+    mock_fetch.assert_called_once_with()
+    assert taipei["city"] == "臺北市"
+    assert kaohsiung["cityCode"] == "kaohsiung"
+    assert kaohsiung["forecasts"][0]["maxTemp"] == "30°C"
+    assert missing is None
+
+
+def test_taiwan_weather_route_reads_snapshot(client):
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=BULK):
+        response = client.get("/taiwan/weather/taipei")
+        unknown = client.get("/taiwan/weather/atlantis")
+
+    assert response.status_code == 200
+    assert response.json["data"]["forecasts"][0]["weather"] == "晴時多雲"
+    assert unknown.status_code == 404
+
+
+def test_overview_returns_all_counties_then_delta(client):
+    from flask_weather.utils import refresh_cwa_snapshot
+
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=BULK):
+        full = client.get("/taiwan/weather").json
+
+    assert full["full"] is True
+    assert sorted(full["data"]) == ["kaohsiung", "taipei"]
+
+    version = full["version"]
+    unchanged = client.get(f"/taiwan/weather?since={version}").json
+    assert unchanged["version"] == version
+    assert unchanged["data"] == {}
+
+    updated = _cwa_response(
+        _location("臺北市"), _location("高雄市", weather="陰短暫雨")
+    )
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=updated):
+        refresh_cwa_snapshot()
+
+    delta = client.get(f"/taiwan/weather?since={version}").json
+    assert delta["full"] is False
+    assert delta["version"] != version
+    assert list(delta["data"]) == ["kaohsiung"]
+    assert delta["data"]["kaohsiung"]["forecasts"][0]["weather"] == "陰短暫雨"
+
+    unknown = client.get("/taiwan/weather?since=deadbeef").json
+    assert unknown["full"] is True
+
+
+def test_cities_list_is_cacheable(client):
+    first = client.get("/taiwan/cities")
+    again = client.get(
+        "/taiwan/cities", headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    assert first.cache_control.max_age == 86400
+    assert len(first.json["data"]) == 22
+    assert again.status_code == 304
+
+
+def test_city_forecast_uses_precomputed_etag(client):
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=BULK):
+        first = client.get("/taiwan/weather/taipei")
+
+    etag = first.headers["ETag"]
+    assert 0 < first.cache_control.max_age <= 600
+    assert first.cache_control.stale_while_revalidate == 3000
+
+    with patch("flask_weather.utils._digest") as digest:
+        again = client.get("/taiwan/weather/taipei", headers={"If-None-Match": etag})
+        other = client.get("/taiwan/weather/kaohsiung", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.data == b""
+    assert other.status_code == 200
+    digest.assert_not_called()
+
+
+def test_overview_etag_follows_snapshot_version(client):
+    from flask_weather.utils import refresh_cwa_snapshot
+
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=BULK):
+        first = client.get("/taiwan/weather")
+
+    etag = first.headers["ETag"]
+    assert (
+        client.get("/taiwan/weather", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+
+    updated = _cwa_response(_location("臺北市", weather="陰"), _location("高雄市"))
+    with patch("flask_weather.utils._fetch_cwa_data", return_value=updated):
+        refresh_cwa_snapshot()
+
+    changed = client.get("/taiwan/weather", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from flask_weather.utils import format_forecast_data, format_weather_data
+
+RAW = {
+    "weather": [{"main": "Clear", "description": "晴", "icon": "01d"}],
+    "main": {"temp": 25.0, "feels_like": 26.0, "pressure": 1012, "humidity": 60},
+    "wind": {"speed": 2.0},
+    "dt": 1768361391,
+    "sys": {"country": "TW", "sunrise": 1768344142, "sunset": 1768382967},
+    "name": "Taipei",
+}
+
+
+def test_format_weather_data_converts_units(app):
+    metric = format_weather_data(RAW, units="metric")
+    imperial = format_weather_data(RAW, units="imperial")
+
+    assert (metric["temp"], metric["wind_speed"], metric["wind_unit"]) == (
+        25.0,
+        2.0,
+        "m/s",
+    )
+    assert (imperial["temp"], imperial["feels_like"]) == (77.0, 78.8)
+    assert (imperial["wind_speed"], imperial["wind_unit"]) == (4.47, "mph")
+
+
+def test_format_forecast_data_uses_session_units(app):
+    forecast = {"list": [{**RAW, "pop": 0.2}]}
+
+    with app.test_request_context():
+        from flask import session
+
+        session["units"] = "imperial"
+        (items,) = format_forecast_data(forecast).values()
+
+    assert items[0]["temp"] == 77.0
+
+
+def test_units_toggle_keeps_shared_cache(client):
+    from flask_weather.utils import get_current_weather
+
+    with patch("flask_weather.utils._fetch_weather_data", return_value=RAW) as fetch:
+        with client.application.test_request_context():
+            get_current_weather("Taipei")
+        client.get("/set_units/imperial")
+        with client.application.test_request_context():
+            get_current_weather("Taipei")
+
+    fetch.assert_called_once()
+    assert fetch.call_args.args[0]["units"] == "metric"
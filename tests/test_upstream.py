@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock, patch
+
+from flask_weather.upstream import CWA, OPENWEATHER, get_upstream
+
+
+def test_session_is_reused_per_provider(app):
+    client = get_upstream()
+
+    assert client.session(OPENWEATHER) is client.session(OPENWEATHER)
+    assert client.session(OPENWEATHER) is not client.session(CWA)
+
+
+def test_timeouts_and_retries_follow_config(app):
+    client = get_upstream()
+
+    assert client.timeout(OPENWEATHER) == (
+        app.config["UPSTREAM_CONNECT_TIMEOUT"],
+        app.config["OPENWEATHER_READ_TIMEOUT"],
+    )
+    assert client.timeout(CWA)[1] == app.config["CWA_READ_TIMEOUT"]
+
+    adapter = client.session(OPENWEATHER).get_adapter("https://")
+    assert adapter.max_retries.status_forcelist == (500, 502, 503, 504)
+    assert adapter.max_retries.total == app.config["UPSTREAM_MAX_RETRIES"]
+
+
+def test_fetch_helpers_use_pooled_session(app):
+    from flask_weather.utils import get_air_pollution
+
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"list": []}
+    session = get_upstream().session(OPENWEATHER)
+
+    with (
+        app.test_request_context(),
+        patch.object(session, "get", return_value=response) as mock_get,
+    ):
+        assert get_air_pollution.uncached(25.0, 121.5) == {"list": []}
+
+    url = mock_get.call_args.args[0]
+    assert url == "https://api.openweathermap.org/data/2.5/air_pollution"
+    assert mock_get.call_args.kwargs["timeout"] == get_upstream().timeout(
+        OPENWEATHER, "air_pollution"
+    )
+
+
+def test_read_timeout_adapts_to_observed_latency(app):
+    app.config.update(
+        ADAPTIVE_TIMEOUT_MIN_SAMPLES=10,
+        ADAPTIVE_TIMEOUT_MULTIPLIER=3,
+        ADAPTIVE_TIMEOUT_MIN=1,
+        ADAPTIVE_TIMEOUT_MAX=8,
+    )
+    client = get_upstream()
+    fixed = app.config["OPENWEATHER_READ_TIMEOUT"]
+
+    for _ in range(9):
+        client.latency.record(OPENWEATHER, 0.5, endpoint="forecast")
+    assert client.read_timeout(OPENWEATHER, "forecast") == fixed
+
+    client.latency.record(OPENWEATHER, 0.5, endpoint="forecast")
+    assert 1.2 < client.read_timeout(OPENWEATHER, "forecast") <= 1.8
+    assert client.read_timeout(OPENWEATHER, "weather") == fixed
+
+    # 上限為固定的讀取逾時，即使 ADAPTIVE_TIMEOUT_MAX 較大
+    for _ in range(10):
+        client.latency.record(OPENWEATHER, 20, endpoint="forecast")
+    assert client.read_timeout(OPENWEATHER, "forecast") == fixed
+
+    app.config["ADAPTIVE_TIMEOUT_MAX"] = 2
+    assert client.read_timeout(OPENWEATHER, "forecast") == 2
+
+
+def test_ops_timeouts_lists_endpoints(app, client):
+    get_upstream().latency.record(CWA, 0.3, endpoint="F-C0032-001")
+
+    data = client.get("/ops/timeouts").get_json()
+
+    assert data["endpoints"][0]["provider"] == CWA
+    assert data["endpoints"][0]["endpoint"] == "F-C0032-001"
+    assert data["endpoints"][0]["read_timeout"] == app.config["CWA_READ_TIMEOUT"]
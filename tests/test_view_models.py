@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+from flask_weather import cache, metrics
+from flask_weather.utils import (
+    get_forecast_view,
+    trim_forecast_data,
+    trim_weather_data,
+)
+
+RAW_FORECAST = {
+    "cod": "200",
+    "cnt": 1,
+    "list": [
+        {
+            "dt": 1768370400,
+            "main": {"temp": 21.5, "pressure": 1015, "temp_kf": 0.5},
+            "weather": [{"id": 500, "description": "小雨", "icon": "10d"}],
+            "clouds": {"all": 75},
+            "pop": 0.4,
+            "dt_txt": "2026-01-14 06:00:00",
+        }
+    ],
+    "city": {"id": 1668341, "name": "Taipei", "population": 7871900},
+}
+
+
+def test_trim_weather_keeps_needed_fields():
+    raw = {
+        "name": "Taipei",
+        "main": {"temp": 25, "humidity": 70, "temp_min": 24, "grnd_level": 1009},
+        "wind": {"speed": 3.6, "deg": 80},
+        "weather": [{"id": 800, "description": "晴", "icon": "01d", "main": "Clear"}],
+        "clouds": {"all": 0},
+        "base": "stations",
+    }
+
+    assert trim_weather_data(raw) == {
+        "name": "Taipei",
+        "main": {"temp": 25, "humidity": 70},
+        "wind": {"speed": 3.6},
+        "weather": [{"description": "晴", "icon": "01d", "main": "Clear"}],
+    }
+    assert trim_weather_data(None) is None
+
+
+def test_trim_forecast_adds_view_key():
+    trimmed = trim_forecast_data(RAW_FORECAST)
+
+    assert trimmed["list"] == [
+        {
+            "dt": 1768370400,
+            "main": {"temp": 21.5},
+            "weather": [{"description": "小雨", "icon": "10d"}],
+            "pop": 0.4,
+        }
+    ]
+    assert trimmed["city"] == {"id": 1668341, "name": "Taipei"}
+    assert trimmed["view_key"] == trim_forecast_data(RAW_FORECAST)["view_key"]
+
+
+def test_forecast_view_is_cached_per_units(app):
+    metrics.reset()
+    trimmed = trim_forecast_data(RAW_FORECAST)
+
+    with app.test_request_context():
+        cache.clear()
+        first = get_forecast_view(trimmed, "metric")
+        with patch("flask_weather.utils.format_forecast_data") as fmt:
+            assert get_forecast_view(trimmed, "metric") == first
+        fmt.assert_not_called()
+        imperial = get_forecast_view(trimmed, "imperial")
+
+    day = next(iter(imperial["forecast"].values()))
+    assert day[0]["temp"] == 70.7
+    assert first["chart"]["temps"]
+    counters = metrics.snapshot()
+    assert counters["view.forecast.hit"] == 1
+    assert counters["view.forecast.miss"] == 2
+
+
+def test_forecast_view_without_key_is_not_cached(app):
+    metrics.reset()
+
+    with app.test_request_context():
+        view = get_forecast_view(RAW_FORECAST, "metric")
+
+    assert view["forecast"]
+    assert "view.forecast.miss" not in metrics.snapshot()
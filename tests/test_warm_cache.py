@@ -0,0 +1,103 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from flask_weather import cache
+from flask_weather.warm_cache import (
+    describe_snapshot,
+    init_warm_cache,
+    load_snapshot,
+    save_snapshot,
+    snapshot_path,
+)
+
+ENTRY = {"value": {"name": "Taipei"}, "fetched_at": 1.0, "generation": 0}
+
+
+@pytest.fixture
+def snapshot_app(app, tmp_path):
+    app.config.update(
+        WARM_CACHE_ENABLED=True, WARM_CACHE_PATH=str(tmp_path / "warm.sqlite3")
+    )
+    return app
+
+
+def test_save_and_load_keep_remaining_ttl(snapshot_app):
+    with snapshot_app.app_context():
+        cache.set("swr:get_current_weather:a", ENTRY, timeout=600)
+        cache.set("swr:get_current_weather:generation", 2, timeout=0)
+        cache.set("swr:get_current_weather:a:lock", "token", timeout=15)
+        cache.set("view:forecast:1:metric", {"chart": {}}, timeout=600)
+        assert save_snapshot() == 2
+
+        cache.clear()
+        assert load_snapshot() == 2
+        assert cache.get("swr:get_current_weather:a") == ENTRY
+        assert cache.get("swr:get_current_weather:generation") == 2
+        assert cache.get("swr:get_current_weather:a:lock") is None
+        assert cache.get("view:forecast:1:metric") is None
+
+        with patch(
+            "flask_weather.cache_backends.time.time", return_value=time.time() + 601
+        ):
+            assert cache.get("swr:get_current_weather:a") is None
+            assert cache.get("swr:get_current_weather:generation") == 2
+
+
+def test_load_does_not_overwrite_or_restore_expired(snapshot_app):
+    with snapshot_app.app_context():
+        cache.set("swr:get_forecast:a", {"value": "old"}, timeout=600)
+        cache.set("cwa:v1:taipei", {"city": "臺北市"}, timeout=5)
+        save_snapshot()
+        cache.clear()
+        cache.set("swr:get_forecast:a", {"value": "new"}, timeout=600)
+
+        with patch("flask_weather.warm_cache.time.time", return_value=time.time() + 10):
+            assert load_snapshot() == 0
+        assert cache.get("swr:get_forecast:a") == {"value": "new"}
+
+
+def test_workers_merge_keeping_later_expiry(snapshot_app):
+    with snapshot_app.app_context():
+        cache.set("swr:get_forecast:a", {"value": "newer"}, timeout=600)
+        save_snapshot()
+        cache.set("swr:get_forecast:a", {"value": "older"}, timeout=60)
+        save_snapshot()
+        cache.clear()
+        load_snapshot()
+
+        assert cache.get("swr:get_forecast:a") == {"value": "newer"}
+
+
+def test_create_app_loads_snapshot(snapshot_app):
+    with snapshot_app.app_context():
+        cache.set("swr:get_forecast:a", ENTRY, timeout=600)
+        save_snapshot()
+        cache.clear()
+
+    init_warm_cache(snapshot_app)
+
+    with snapshot_app.app_context():
+        assert cache.get("swr:get_forecast:a") == ENTRY
+
+
+def test_default_path_is_in_instance_folder(app):
+    assert snapshot_path() == os.path.join(app.instance_path, "warm_cache.sqlite3")
+
+
+def test_cli_describes_snapshot(snapshot_app, runner):
+    with snapshot_app.app_context():
+        cache.set("swr:get_forecast:a", ENTRY, timeout=600)
+        cache.set("cwa:v1:taipei", {"city": "臺北市"}, timeout=600)
+        save_snapshot()
+    summary = describe_snapshot(snapshot_app.config["WARM_CACHE_PATH"])
+
+    result = runner.invoke(args=["warm-cache", "--group", "cwa"])
+
+    assert summary["groups"]["get_forecast"]["entries"] == 1
+    assert result.exit_code == 0
+    assert "get_forecast" in result.output
+    assert "cwa:v1:taipei" in result.output
+    assert "swr:get_forecast:a" not in result.output
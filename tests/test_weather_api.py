@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+WEATHER = {
+    "name": "Taipei",
+    "sys": {"country": "TW", "sunrise": 1768341600, "sunset": 1768381200},
+    "main": {"temp": 22.8, "feels_like": 23.1, "humidity": 80, "pressure": 1012},
+    "wind": {"speed": 3.5},
+    "weather": [{"description": "多雲", "icon": "03d", "main": "Clouds"}],
+    "dt": 1768361391,
+    "coord": {"lat": 25.05, "lon": 121.53},
+}
+
+FORECAST = {
+    "list": [
+        {
+            "dt": 1768370400,
+            "main": {"temp": 21.0},
+            "weather": [{"description": "小雨", "icon": "10d"}],
+            "pop": 0.4,
+        }
+    ]
+}
+
+
+def _patch_fetch():
+    def fetch(params, endpoint="weather", timeout=None):
+        return FORECAST if endpoint == "forecast" else WEATHER
+
+    return patch("flask_weather.utils._fetch_weather_data", side_effect=fetch)
+
+
+def test_current_weather_json_has_cache_headers(client):
+    with _patch_fetch():
+        response = client.get("/weather/Taipei?units=imperial")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["data"]["temp"] == 73.0
+    assert data["data"]["wind_unit"] == "mph"
+    assert response.headers["ETag"].startswith('"')
+    assert response.headers["Last-Modified"] == "Wed, 14 Jan 2026 03:29:51 GMT"
+    assert response.cache_control.public
+    assert 0 < response.cache_control.max_age <= 600
+
+
+def test_uncacheable_value_is_still_served(client):
+    # 快取後端拒絕寫入（例如超過群組預算）時仍回傳本次取得的資料
+    with _patch_fetch(), patch("flask_weather.caching.CachedFetcher._store"):
+        response = client.get("/weather/Taipei")
+
+    assert response.status_code == 200
+    assert response.get_json()["data"]["temp"] == 22.8
+    assert response.headers["ETag"].startswith('"')
+
+
+def test_if_none_match_returns_304_without_body(client):
+    with _patch_fetch() as fetch:
+        first = client.get("/weather/Taipei")
+        with patch("flask_weather.weather.api._build_payload") as build:
+            second = client.get(
+                "/weather/Taipei", headers={"If-None-Match": first.headers["ETag"]}
+            )
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    build.assert_not_called()
+    fetch.assert_called_once()
+
+
+def test_etag_depends_on_units(client):
+    with _patch_fetch():
+        metric = client.get("/weather/Taipei")
+        imperial = client.get("/weather/Taipei?units=imperial")
+
+    assert metric.headers["ETag"] != imperial.headers["ETag"]
+
+
+def test_forecast_and_chart_endpoints(client):
+    with _patch_fetch():
+        forecast = client.get("/weather/Taipei/forecast").get_json()
+        chart = client.get("/api/weather?city=Taipei&view=chart").get_json()
+
+    (items,) = forecast["data"].values()
+    assert items[0]["pop"] == 40
+    assert chart["data"]["temps"] == [21.0]
+
+
+def test_api_errors(client):
+    with patch("flask_weather.utils._fetch_weather_data", return_value=None):
+        assert client.get("/api/weather").status_code == 400
+        assert client.get("/weather/Taipei?units=kelvin").status_code == 400
+        assert client.get("/weather/Nowhere").status_code == 404